@@ -3,9 +3,14 @@
 # clear our current semester terms from course list taxonomies
 # add new terms to the taxonomies
 import argparse
+import atexit
 import json
+import os
+import signal
+import time
 
-from lib import *
+from config import logger
+from lib import add_metrics_argument, add_profile_argument, parse_depts, PER_TAXONOMY
 
 parser = argparse.ArgumentParser(
     description="Create VAULT taxonomies from JSON course data."
@@ -37,35 +42,203 @@ parser.add_argument(
     default=False,
     help="download fresh taxonomies from VAULT (do not use JSON list in /data dir)",
 )
+parser.add_argument(
+    "-p",
+    "--parallel",
+    type=int,
+    default=0,
+    metavar="N",
+    help="create terms for all courses at once with N workers, each term starting as soon as its parent exists (at most {} requests per taxonomy)".format(
+        PER_TAXONOMY
+    ),
+)
+parser.add_argument(
+    "--trace",
+    action="store_true",
+    default=False,
+    help="record a span for every HTTP request, write JSONL & Chrome trace files to the data dir and log latency per endpoint",
+)
+parser.add_argument(
+    "--dept",
+    type=parse_depts,
+    action="extend",
+    metavar="CODE[,CODE]",
+    help="only update these departments' taxonomies & their terms in the SYLLABUS and ARCH DIV course lists, deleting only their part of the semester",
+)
+parser.add_argument(
+    "--bloom",
+    action="store_true",
+    default=False,
+    help="keep Bloom filters of the terms in the flat taxonomies (sections, names, titles, faculty) in data/bloom so terms that are definitely new are POSTed right away & others are confirmed with a search",
+)
+parser.add_argument(
+    "-w",
+    "--watch",
+    action="store_true",
+    default=False,
+    help="keep running, apply the file each time it changes (only the courses that changed after the first time), file can be a glob pattern like 'data/*-courses.json' to use the newest match",
+)
+parser.add_argument(
+    "--interval",
+    type=float,
+    default=60,
+    metavar="SECONDS",
+    help="with --watch, how often to check for a new file (default: %(default)s)",
+)
+parser.add_argument(
+    "--status-port",
+    type=int,
+    default=8765,
+    metavar="PORT",
+    help="with --watch, serve status JSON at http://127.0.0.1:PORT/status & metrics at /metrics, 0 to turn off (default: %(default)s)",
+)
+add_metrics_argument(parser)
+add_profile_argument(parser)
 parser.add_argument("file", nargs=1, help="course list JSON file")
 
 args = parser.parse_args()
+if args.watch and args.clear:
+    parser.error("--clear cannot be used with --watch")
+if args.watch and args.dept:
+    parser.error("--dept cannot be used with --watch")
+
+# the HTTP & scheduling code is only loaded once the arguments are valid
+from lib import (
+    add_to_taxos,
+    Course,
+    course_sort,
+    CourseDaemon,
+    COURSES,
+    DeptIndex,
+    get_depts,
+    load_taxos_in_background,
+    Profiler,
+    report_hedges,
+    TaxonomyRoutes,
+    TermScheduler,
+    TextfileWriter,
+    tracer,
+)
+
+
+def write_trace():
+    stem = os.path.join("data", time.strftime("%Y-%m-%d_%H%M%S") + "-trace")
+    tracer.write_jsonl(stem + ".jsonl")
+    tracer.write_chrome_trace(stem + ".json")
+    logger.info(f"Wrote HTTP trace to {stem}.jsonl and {stem}.json")
+    if tracer.dropped:
+        logger.warning(
+            "The trace only has the last %s spans, %s earlier ones were dropped",
+            len(tracer.spans),
+            tracer.dropped,
+        )
+    logger.info("HTTP latency by endpoint:\n" + tracer.format_summary())
+
+
+if args.profile:
+    profiler = Profiler("app").start()
+    atexit.register(profiler.stop)
+
+if args.trace:
+    tracer.enable()
+    # runs on exit(0) after --clear & if a request raises an error
+    atexit.register(write_trace)
+
+if args.metrics:
+    metrics_writer = TextfileWriter(args.metrics, "app").start()
+    atexit.register(metrics_writer.stop)
+
+# log how many slow GETs were sent twice, see lib/hedging.py
+atexit.register(report_hedges)
+
+# read (or, if stale, download) taxonomies while we parse the course JSON
+taxos_future = load_taxos_in_background(args.downloadtaxos)
+
+if args.watch:
+    routes = TaxonomyRoutes(taxos_future.result())
+    if args.bloom:
+        routes.use_bloom()
+        atexit.register(routes.save_blooms)
+    daemon = CourseDaemon(
+        args.file[0],
+        routes,
+        interval=args.interval,
+        only_course_lists=args.course_lists,
+        delete=not args.no_delete,
+        workers=args.parallel,
+    )
+    if args.status_port:
+        daemon.serve_status(args.status_port)
+    # stop cleanly (running the atexit handlers) when cron or systemd asks
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    daemon.stop()
+    exit(0)
 
 with open(args.file[0], "r") as file:
     data = json.load(file)
     courses = [Course(**c) for c in data]
+COURSES.set(len(courses), state="parsed")
+COURSES.set(len([c for c in courses if c.on_portal]), state="on_portal")
 
-if args.downloadtaxos:
-    taxos = download_taxos()
+# (course, departments) pairs to add, departments of None means all of them
+if args.dept:
+    index = DeptIndex(courses)
+    unknown = index.unknown(args.dept)
+    if unknown:
+        logger.warning("No Portal courses for departments: %s", ", ".join(unknown))
+    selected = index.select(args.dept)
 else:
-    taxos = get_taxos()
+    selected = [(c, None) for c in sorted(courses, key=course_sort) if c.on_portal]
+
+taxos = taxos_future.result()
+# map each department straight to its taxonomies, if a course needs a
+# taxonomy we don't know about this refreshes the list & reports it now
+# rather than partway through adding terms
+routes = TaxonomyRoutes(taxos)
+if args.bloom:
+    routes.use_bloom()
+    # written once, even if adding terms fails partway through
+    atexit.register(routes.save_blooms)
+routes.check(
+    (dept for c, depts in selected for dept in depts or get_depts(c)),
+    args.course_lists,
+)
 
 course_lists = [t for t in taxos if "course list" in t.name.lower()]
 
 if not args.no_delete:
     # semester is the same for all courses so we just grab it from first one
     current_semester = courses[0].semester
-    logger.info(
-        f'Deleting current semester "{current_semester}" from all course list taxonomies'
-    )
-    for taxo in course_lists:
-        taxo.remove(current_semester)
+    if args.dept:
+        logger.info(
+            'Deleting current semester "%s" terms for %s from their course lists',
+            current_semester,
+            ", ".join(args.dept),
+        )
+        for taxo, path in index.semester_terms(args.dept, routes, current_semester):
+            taxo.remove(path)
+    else:
+        logger.info(
+            f'Deleting current semester "{current_semester}" from all course list taxonomies'
+        )
+        for taxo in course_lists:
+            taxo.remove(current_semester)
 
 # we're done if we were only clearing semester terms from course lists
 if args.clear:
     exit(0)
 
-logger.info(f"Adding {len(courses)} courses to VAULT taxonomies")
-for course in sorted(courses, key=course_sort):
-    if course.on_portal:
-        add_to_taxos(course, taxos, args.course_lists)
+logger.info(f"Adding {len(selected)} courses to VAULT taxonomies")
+if args.parallel:
+    scheduler = TermScheduler(workers=args.parallel)
+    for course, depts in selected:
+        scheduler.add_course(course, routes, args.course_lists, depts)
+    with tracer.span("schedule", terms=len(scheduler)):
+        scheduler.run()
+else:
+    for course, depts in selected:
+        add_to_taxos(course, routes, args.course_lists, depts)
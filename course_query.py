@@ -0,0 +1,79 @@
+""" answer questions about Workday course data from a local SQLite copy of it:
+which sections an instructor teaches, what is colocated with a section, what
+a department offers in a semester or which courses have a word in their
+title. Load one or more course JSON files first, loading them again later
+only writes the courses that changed.
+
+usage: python course_query.py load data/data.json [...]
+       python course_query.py instructor USERNAME [-s SEMESTER]
+       python course_query.py colocated SECTION
+       python course_query.py dept CODE [-s SEMESTER]
+       python course_query.py search TEXT [-s SEMESTER]
+"""
+
+import argparse
+import sys
+import time
+
+from lib.course_db import CourseDB, format_course
+
+
+def main(args) -> None:
+    with CourseDB(args.db) as db:
+        if args.command == "load":
+            for file in args.files:
+                counts = db.load(file)
+                if counts.get("skipped"):
+                    print(f"{file}: unchanged since it was last loaded")
+                else:
+                    print(
+                        f"{file}: {counts['added']} added, {counts['updated']} updated, "
+                        f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+                    )
+            return
+
+        start: float = time.perf_counter()
+        if args.command == "instructor":
+            rows = db.by_instructor(args.username, args.semester)
+        elif args.command == "colocated":
+            rows = db.colocated(args.section)
+        elif args.command == "dept":
+            rows = db.by_department(args.code, args.semester)
+        else:
+            rows = db.search(" ".join(args.text), args.semester)
+        ms: float = (time.perf_counter() - start) * 1000
+        for row in rows:
+            print(format_course(row))
+        # to stderr so the results can be piped
+        print(f"{len(rows)} courses ({ms:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query a local SQLite copy of Workday JSON course data."
+    )
+    parser.add_argument(
+        "--db",
+        default="data/courses.sqlite",
+        help="SQLite database file (default: %(default)s)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="load or refresh course JSON files")
+    load.add_argument("files", nargs="+", help="course list JSON file")
+    instructor = commands.add_parser(
+        "instructor", help="sections an instructor teaches"
+    )
+    instructor.add_argument("username")
+    colocated = commands.add_parser(
+        "colocated", help="sections colocated or cross-listed with a section"
+    )
+    colocated.add_argument("section", help="section code e.g. ANIMA-1000-1")
+    dept = commands.add_parser("dept", help="sections a department offers")
+    dept.add_argument("code", help="department code e.g. ANIMA")
+    search = commands.add_parser("search", help="full-text search of titles")
+    search.add_argument("text", nargs="+")
+    for command in (instructor, dept, search):
+        command.add_argument(
+            "-s", "--semester", help='only this semester e.g. "Fall 2023"'
+        )
+    main(parser.parse_args())
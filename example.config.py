@@ -1,24 +1,114 @@
+import atexit
+from collections import Counter
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import threading
 import time
 
 api_root = "https://vault.cca.edu/api"
 token = "123a4567-abcd-9876-edcb-4321fedc1234"
+# seconds before the cached taxonomy & group lists in data/ are downloaded again
+cache_ttl = 60 * 60 * 24 * 7
+# (connect, read) timeouts in seconds by endpoint template, these override
+# the defaults in lib/hedging.py e.g. {"GET /taxonomy/{uuid}/term": (5, 300)}
+timeouts = {}
+# send a second copy of GETs that are slower than their endpoint's p95 latency
+hedging = True
 
 # copied from syllabus-notifications, log to both (dated) file & console
 format = '%(asctime)s %(name)s %(levelname)s %(message)s'
 level = logging.INFO
 # DEBUG level is pretty verbose
 # https://docs.python.org/3/library/logging.html#levels
-logging.basicConfig(
-    level=level,
-    datefmt='%Y-%m-%d %H:%M:%S',
-    format=format,
-    filename='data/{today}.log'.format(today=time.strftime('%Y-%m-%d')),
+# the console can be quieter than the log file, e.g. logging.WARNING
+console_level = level
+
+
+class LevelFilter(logging.Filter):
+    # lets records at `level` & above through, counts the ones it suppresses
+    def __init__(self, level):
+        super().__init__()
+        self.level = level
+        self.suppressed = Counter()
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        self.suppressed[record.levelname] += 1
+        return False
+
+
+class LazyQueueHandler(QueueHandler):
+    # the default prepare() formats the message on the calling thread, we
+    # hand the record over as-is so the listener thread does the formatting
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if not listener_started:
+            start_logging()
+        # don't block the caller for info or debug records that don't fit,
+        # count them instead, but never lose a warning or error
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.dropped += 1
+
+
+# records are queued by the thread that logs them & written to the file and
+# console by a background thread, neither the thread nor the file exist until
+# something is logged so importing config has no side effects
+file_handler = logging.FileHandler(
+    'data/{today}.log'.format(today=time.strftime('%Y-%m-%d')), delay=True
 )
+file_handler.setFormatter(logging.Formatter(format, datefmt='%Y-%m-%d %H:%M:%S'))
+file_handler.addFilter(LevelFilter(level))
 formatter = logging.Formatter(format)
-logger = logging.getLogger()
-# add 2nd handler for console
 console = logging.StreamHandler()
-console.setLevel(level)
 console.setFormatter(formatter)
-logger.addHandler(console)
+console.addFilter(LevelFilter(console_level))
+
+queue_handler = LazyQueueHandler(queue.Queue(maxsize=10000))
+listener = QueueListener(queue_handler.queue, file_handler, console)
+logger = logging.getLogger()
+logger.setLevel(min(level, console_level))
+logger.addHandler(queue_handler)
+listener_started = False
+listener_lock = threading.Lock()
+
+
+def start_logging():
+    global listener_started
+    with listener_lock:
+        if not listener_started:
+            listener.start()
+            atexit.register(stop_logging)
+            listener_started = True
+
+
+def stop_logging():
+    # write everything still queued then log directly, noting what we dropped
+    listener.stop()
+    logger.removeHandler(queue_handler)
+    logger.addHandler(file_handler)
+    logger.addHandler(console)
+    for name, handler in (("log file", file_handler), ("console", console)):
+        suppressed = handler.filters[0].suppressed
+        if suppressed:
+            logger.info(
+                "Suppressed %s records from the %s",
+                ", ".join("{} {}".format(n, lvl) for lvl, n in suppressed.items()),
+                name,
+            )
+    if queue_handler.dropped:
+        logger.warning(
+            "Dropped %s log records because the log queue was full",
+            queue_handler.dropped,
+        )
+
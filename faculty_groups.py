@@ -1,32 +1,74 @@
 """ given Workday Student JSON data, update EQUELLA groups to reflect who is
-teaching in what programs. Right now the script only writes out a series of .txt
-files named after LDAP groups; these are lists of users to be sent to the Help
-Desk so they can update all the LDAP groups. I want to add functionality such
-that it also updates the VAULT faculty groups for each department.
+teaching in what programs. The script writes out a series of .txt files named
+after LDAP groups; these are lists of users to be sent to the Help Desk so they
+can update all the LDAP groups; data/ldap-changes.txt accumulates who was added
+to or removed from each group until it is deleted. --dry-run writes no files. With --sync it also updates
+the VAULT faculty groups for each department, sending one request per group
+that changed.
 
-usage: python faculty_groups.py data/data.json
+usage: python faculty_groups.py [--dry-run | --sync] [--remove-members] data/data.json
 """
+import argparse
+from contextlib import nullcontext
 import json
-import sys
-
-from lib import Course, map
-
-with open(sys.argv[1], 'r') as file:
-    data = json.load(file)
-    courses = [Course(**d) for d in data]
-
-# dict of dept code to list of faculty usernames e.g. "LIBRA": ["ephetteplace"]
-teaching = {}
-for course in courses:
-    # initialize department set if it doesn't exist yet
-    if teaching.get(course.owner) == None:
-        teaching[course.owner] = set([i["username"] for i in course.instructors])
-    else:
-        teaching[course.owner].update([i["username"] for i in course.instructors])
-
-# write LDAP text files
-for dept, instructors in teaching.items():
-    ldap = map[dept]["ldap"]
-    if ldap is not None:
-        with open('data/{}.txt'.format(ldap), 'a') as file:
-            file.write('\n'.join(list(instructors)))
+
+from lib import Course, load_groups_in_background
+from lib.group_sync import apply_sync, desired_membership, format_report, plan_sync
+from lib.ldap_export import export_ldap, format_changes, ldap_membership
+from lib.profiling import Profiler, add_profile_argument
+
+
+def main(file, sync=False, dry_run=False, remove_members=False):
+    # read (or, if stale, download) the groups while we parse the course JSON
+    groups_future = load_groups_in_background() if sync or dry_run else None
+    with open(file, 'r') as fh:
+        data = json.load(fh)
+        courses = [Course(**d) for d in data]
+
+    # dict of dept code to set of faculty usernames e.g. "LIBRA": {"ephetteplace"}
+    teaching = {}
+    for course in courses:
+        teaching.setdefault(course.owner, set()).update(
+            [i["username"] for i in course.instructors]
+        )
+
+    # write LDAP text files, one per group & only what changed since last run
+    changes = export_ldap(ldap_membership(teaching), dry_run=dry_run)
+    print(format_changes(changes), end="")
+
+    # update VAULT faculty groups
+    if sync or dry_run:
+        desired = desired_membership(teaching, groups_future.result())
+        changes = plan_sync(desired, remove=remove_members)
+        print(format_report(changes))
+        if sync and not dry_run:
+            apply_sync(changes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write lists of faculty usernames per LDAP group from Workday JSON course data."
+    )
+    parser.add_argument("file", help="course list JSON file")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        default=False,
+        help="also update VAULT faculty groups to match who is teaching",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="print the users that --sync would add to (& with --remove-members remove from) each VAULT group without changing anything",
+    )
+    parser.add_argument(
+        "--remove-members",
+        action="store_true",
+        default=False,
+        help="when syncing, also remove group members who aren't teaching this run, including manually added staff",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    with Profiler("faculty_groups") if args.profile else nullcontext():
+        main(args.file, args.sync, args.dry_run, args.remove_members)
@@ -1,8 +1,116 @@
-# import everything from all sub-modules
-from .add_to_taxos import *
-from .course import *
-from .get_groups import *
-from .get_taxos import *
-from .group import *
-from .taxonomy import *
-from .utilities import *
+"""
+Everything defined in the lib sub-modules can be used straight from `lib`
+(`from lib import Course` or `from lib import *`) but a sub-module is only
+imported the first time one of its names is used. Scripts that only need
+e.g. Course & the routing rules don't pay for the taxonomy, group & HTTP
+code.
+
+Add new public names to _modules below.
+"""
+
+import importlib
+import sys
+import types
+
+# sub-module => the public names it defines
+_modules = {
+    "add_to_taxos": [
+        "add_term", "add_to_taxos", "course_list_term", "course_terms", "create_term",
+        "DEPT_LAYER_TAXOS", "get_depts", "has_dept_layer",
+    ],
+    "bloom": ["BloomFilter"],
+    "cache": ["TTLCache"],
+    "course": ["Course"],
+    "course_db": [
+        "course_hash", "CourseDB", "format_course", "fts_query", "semester_sort",
+    ],
+    "csv_sink": ["CsvSink", "open_output"],
+    "daemon": [
+        "course_key", "course_signature", "CourseDaemon", "diff_snapshots",
+        "load_snapshot", "remove_course", "SnapshotDiff", "StatusHandler",
+    ],
+    "dept_index": ["DeptIndex", "parse_depts"],
+    "downloads": [
+        "BUCKET", "CourseDownloader", "DownloadError", "file_md5", "run", "term_uri",
+    ],
+    "get_groups": [
+        "download_groups", "get_groups", "groups_file", "iter_groups",
+        "load_groups_in_background", "refresh_groups",
+    ],
+    "get_taxos": [
+        "allow_refresh", "cache_ttl", "download_taxos", "get_taxos", "iter_taxos",
+        "load_taxos_in_background", "refresh_taxos", "taxos_file",
+    ],
+    "group": [
+        "Group", "group_index", "map", "members_cache", "prefetch_users",
+        "reverse_index",
+    ],
+    "group_sync": [
+        "apply_sync", "desired_membership", "format_report", "GroupChange", "plan_sync",
+    ],
+    "hedging": [
+        "DEFAULT_TIMEOUT", "format_hedges", "HedgedSession", "latencies",
+        "LatencyWindow", "report_hedges", "request_limit", "timeout_for", "TIMEOUTS",
+    ],
+    "ldap_export": [
+        "export_ldap", "format_changes", "ldap_membership", "LdapChange",
+        "read_ldap_file",
+    ],
+    "metrics": [
+        "add_metrics_argument", "BLOOM", "Counter", "COURSES", "FINISHED", "format_labels",
+        "format_value", "Gauge", "HEDGES", "Histogram", "HTTP_LATENCY", "HTTP_REQUESTS",
+        "LAST_UPDATE", "Metric", "observe_response", "Registry", "registry", "ROWS",
+        "RUN_SECONDS", "TERMS", "TextfileWriter",
+    ],
+    "paging": ["CacheFileWriter", "get_page", "iter_results"],
+    "profiling": [
+        "add_profile_argument", "allocations_by_function", "frame_name", "function_at",
+        "Profiler", "StackSampler",
+    ],
+    "routes": ["FLAT_KINDS", "KINDS", "Route", "routes_for", "TaxonomyRoutes"],
+    "rules": [
+        "ANY", "ARCH_DIV", "compile_rules", "CourseRoute", "lookup_route", "OWNER",
+        "route_course", "Rule", "RULES",
+    ],
+    "scheduler": ["TermNode", "TermScheduler"],
+    "taxonomy": ["bloom_directory", "PER_TAXONOMY", "search_cache", "Taxonomy", "Term"],
+    "term_tree": ["TermTree"],
+    "tracing": [
+        "endpoint_template", "MAX_SPANS", "percentile", "resource_uuid", "Span",
+        "Tracer", "tracer", "UUID_RE",
+    ],
+    "utilities": [
+        "atomic_write", "course_sort", "PORTAL_STATUSES", "read_cache",
+        "request_wrapper", "strip_prefix",
+    ],
+}
+_exports = {name: module for module, names in _modules.items() for name in names}
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _LazyModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing a sub-module sets it as an attribute of the package, for
+        # get_taxos, get_groups & add_to_taxos that would hide the function of
+        # the same name so we keep looking those up in the sub-module instead
+        if isinstance(value, types.ModuleType) and name in _exports:
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -49,43 +49,74 @@ lists.
 """
 
 from .course import Course
+from .routes import KINDS, routes_for
+from .rules import route_course
 from .taxonomy import Term
+from .tracing import tracer
 from config import logger
 
 
-def get_depts(course) -> set:
+def get_depts(course) -> frozenset:
     """
     Determine what departments a course should be filed under in VAULT
-    taxonomies.
+    taxonomies. The exceptions (Archt division, Fine Arts critique, etc.) are
+    rules in lib/rules.py shared with make_informer_csv.py.
 
     args:
         course (Course)
     returns:
-        departments (set|None): set of department code strings e.g.
-        {"SYLLABUS", "ANIMA"} or None if there are no departments
+        departments (frozenset): set of department code strings e.g.
+        {"SYLLABUS", "ANIMA"}, empty if the course is skipped
     """
-    arch_div = ["ARCHT", "BARCH", "INTER", "MARCH"]
-    # find out what departmental taxos a course needs to be added to
-    # everything will at least be added to Syllabus Collection taxos
-    depts = set(["SYLLABUS"])
-    if course.owner in arch_div:
-        depts.add("ARCH DIV")
-    elif course.owner == "TESTS":
-        # don't add test courses to syllabus collection
-        return set(["TESTS"])
-    elif course.owner == "CCA":
-        # international exchange & other exceptions, skip them
-        return set()
-    elif course.owner == "FA":
-        # file Interdisciplinary Critique under UDIST
-        if course.subject == "CRITI":
-            depts.add("UDIST")
-        # ignore Fine Arts internship courses
-        elif course.subject == "FNART":
-            return set()
-    else:
-        depts.add(course.owner)
-    return depts
+    return route_course(course).depts
+
+
+def course_terms(course, dept_layer=False) -> list[Term]:
+    """
+    Split a course into the chain of nested course list Terms, e.g.
+    Spring 2020 > Animation 1 > John Doe > ANIMA-1000-1. Nothing has been
+    added to a Taxo yet, each term only points to its parent so its full path
+    is known before it's created. The root's children list holds the rest of
+    the chain.
+
+    args:
+        course (Course)
+        dept_layer (bool): include a term for the department, see
+        course_list_term
+    returns:
+        terms (list): Terms from the root (semester) down to the section
+    """
+    # we need to create the root (semester-level) taxonomy term
+    root = Term({"term": course.semester})
+    children = []
+    if dept_layer:
+        children.append(Term({"term": course.owner}))
+    children.append(Term({"term": course.section_title}))
+    children.append(Term({"term": course.instructor_names}))
+    # final child contains additional data nodes
+    children.append(
+        Term(
+            {
+                "data": {
+                    "CrsName": course.course_code,
+                    "facultyID": course.instructor_usernames,
+                    # additional Workday data we may be interested in
+                    "acad_level": course.acad_level,
+                    "delivery_mode": course.delivery_mode,
+                    "instructional_format": course.instructional_format,
+                    "section_def_refid": course.section_def_refid,  # true identifier
+                    "subject_name": course.subject_name,
+                },
+                "term": course.section_code,
+            }
+        )
+    )
+    parent = root
+    for child in children:
+        child.parent = parent
+        parent = child
+    root.children = children
+    return [root] + children
 
 
 def course_list_term(term, taxo, dept_layer=False) -> None:
@@ -110,65 +141,10 @@ def course_list_term(term, taxo, dept_layer=False) -> None:
     """
     if type(term) == Course:
         logger.debug(
-            "Course {} passed as taxonomy term, breaking it into nested terms.".format(
-                term
-            )
+            "Course %s passed as taxonomy term, breaking it into nested terms.", term
         )
         # term is actually a course object
-        course = term
-        # we need to create the root (semester-level) taxonomy term
-        term = Term({"term": course.semester})
-        # We build a tree of nested Terms inside the current Term's list of
-        # children. Each term outlined in the sections below (nothing has been
-        # added to the Taxo yet) has a parents list equal to the course itself
-        # & its children that we are creating along the way, not to be completed
-        # until we reach the final one (section code). We use makeParentsList to
-        # pass _values_ not a reference or every Term.parents => the whole tree.
-        makeParentsList = lambda t: [t] + [c for c in t.children]
-
-        if dept_layer:
-            dept = Term(
-                {
-                    "term": course.owner,
-                    "parents": makeParentsList(term),
-                }
-            )
-            term.children.append(dept)
-
-        title = Term(
-            {
-                "term": course.section_title,
-                "parents": makeParentsList(term),
-            }
-        )
-        term.children.append(title)
-
-        instructors = Term(
-            {
-                "term": course.instructor_names,
-                "parents": makeParentsList(term),
-            }
-        )
-        term.children.append(instructors)
-
-        # final child contains additional data nodes
-        section = Term(
-            {
-                "data": {
-                    "CrsName": course.course_code,
-                    "facultyID": course.instructor_usernames,
-                    # additional Workday data we may be interested in
-                    "acad_level": course.acad_level,
-                    "delivery_mode": course.delivery_mode,
-                    "instructional_format": course.instructional_format,
-                    "section_def_refid": course.section_def_refid,  # true identifier
-                    "subject_name": course.subject_name,
-                },
-                "parents": makeParentsList(term),
-                "term": course.section_code,
-            }
-        )
-        term.children.append(section)
+        term = course_terms(term, dept_layer)[0]
 
     term.uuid = taxo.add(term)
 
@@ -180,6 +156,29 @@ def course_list_term(term, taxo, dept_layer=False) -> None:
         course_list_term(next_term, taxo)
 
 
+# course lists with an additional layer in hierarchy for department
+DEPT_LAYER_TAXOS = ("SYLLABUS", "ARCH DIV")
+
+
+def has_dept_layer(taxo) -> bool:
+    return any(name in taxo.name for name in DEPT_LAYER_TAXOS)
+
+
+def add_term(term, taxo):
+    """
+    Add a string or Course term to a Taxonomy we have already found, see
+    create_term for the args & return value.
+    """
+    if type(term) == str:
+        if len(term) == 0 or term.isspace():
+            logger.debug("No term to be added to %s taxonomy", taxo)
+            return None
+        return taxo.add(Term({"term": term}))
+
+    # term is an object so it's a course list term
+    return course_list_term(term, taxo, dept_layer=has_dept_layer(taxo))
+
+
 # term can be either a Course object or a string
 def create_term(term, taxo_name, taxos):
     """
@@ -194,8 +193,8 @@ def create_term(term, taxo_name, taxos):
 
         taxo_name (str): name of the Taxonomy to add the Term to
 
-        taxos (list): the set of all taxonomies which we will find `taxo_name`
-        in
+        taxos (list|TaxonomyRoutes): the set of all taxonomies which we will
+        find `taxo_name` in
 
     returns:
         essentially nothing, do not use the output of this function
@@ -206,45 +205,53 @@ def create_term(term, taxo_name, taxos):
         return the final term's UUID)
     """
     # find the appropriate named taxonomy, do a check in case we don't find one
-    taxo = next((t for t in taxos if t.name.lower() == taxo_name.lower()), None)
+    # (the routing table refreshes our cached list once per run if we don't)
+    taxo = routes_for(taxos).taxonomy(taxo_name)
     if not taxo:
-        logger.error("Unable to find {} in list of taxonomies.".format(taxo_name))
+        logger.error("Unable to find %s in list of taxonomies.", taxo_name)
         return None
+    return add_term(term, taxo)
 
-    if type(term) == str:
-        if len(term) == 0 or term.isspace():
-            logger.debug("No term to be added to {} taxonomy".format(taxo))
-            return None
-        return taxo.add(Term({"term": term}))
 
-    # term is an object so it's a course list term
-    # 2 course lists have an additional layer in hierarchy for department
-    has_dept_layer = "SYLLABUS" in taxo_name or "ARCH DIV" in taxo_name
-    return course_list_term(term, taxo, dept_layer=has_dept_layer)
-
-
-def add_to_taxos(course, taxos, only_course_lists=False) -> None:
+def add_to_taxos(course, taxos, only_course_lists=False, depts=None) -> None:
     """
     Create all the related taxonomy terms for a given course.
 
     args:
         course (Course)
 
-        taxos (list): list of _all_ VAULT taxonomies
+        taxos (list|TaxonomyRoutes): list of _all_ VAULT taxonomies or a
+        routing table built from them, pass the routing table when adding
+        many courses so it is only built once
 
         only_course_lists (bool): whether to only add terms to course lists
         as opposed to all taxonomies (e.g. course sections, faculty names).
         The initial data population should be all taxonomies but repeat runs
         use `only_course_lists=True`
 
+        depts (iterable): only add terms to these departments' taxonomies,
+        see DeptIndex.depts_for, default is all of get_depts(course)
+
     returns:
         nothing
     """
-    logger.debug("Processing taxonomies for course {}".format(course))
-    for dept in get_depts(course):
-        create_term(course, dept + " - COURSE LIST", taxos)
-        if not only_course_lists:
-            create_term(course.section_code, dept + " - course sections", taxos)
-            create_term(course.course_refid, dept + " - course names", taxos)
-            create_term(course.section_title, dept + " - course titles", taxos)
-            create_term(course.instructor_names, dept + " - faculty", taxos)
+    logger.debug("Processing taxonomies for course %s", course)
+    routes = routes_for(taxos)
+    with tracer.span("course", course=str(course)):
+        for dept in get_depts(course) if depts is None else depts:
+            route = routes.route(dept)
+            steps = [(course, "course_list")]
+            if not only_course_lists:
+                steps += [
+                    (course.section_code, "sections"),
+                    (course.course_refid, "names"),
+                    (course.section_title, "titles"),
+                    (course.instructor_names, "faculty"),
+                ]
+            for term, kind in steps:
+                taxo = getattr(route, kind)
+                if not taxo:
+                    routes.report(["{} - {}".format(dept, KINDS[kind])])
+                    continue
+                with tracer.span("add_to_taxos", step=taxo.name):
+                    add_term(term, taxo)
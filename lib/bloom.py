@@ -0,0 +1,111 @@
+"""
+A small Bloom filter: a fixed-size set of bits that can say a value was
+definitely never added or was probably added, with false positives at about
+`error_rate` once `capacity` values have been added. We keep one per flat
+taxonomy (faculty, course titles, course sections, course names) so that we
+know which terms are definitely new without loading every term, see
+Taxonomy.use_bloom.
+
+Filters are saved as JSON (the bits are base64) so they survive between
+runs. Rewriting the file costs as much as the whole filter, so adding marks
+a filter `dirty` & its owner saves it once at the end of a run. A filter
+can't forget a value, a deleted term stays "probably present".
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+
+from .utilities import atomic_write
+
+
+class BloomFilter:
+    def __init__(self, capacity=10000, error_rate=0.01):
+        """
+        args:
+            capacity (int): number of values the filter is sized for
+            error_rate (float): false positive rate at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # optimal size & number of hashes for the capacity & error rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        # added to since it was last saved or loaded
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "BloomFilter({} of {} values)".format(self.count, self.capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, value):
+        # double hashing, two 64-bit halves of one digest make every position
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, value) -> bool:
+        """returns: True if the value was (probably) not in the filter yet"""
+        new = False
+        with self._lock:
+            for position in self._positions(value):
+                byte, bit = divmod(position, 8)
+                if not self.bits[byte] & (1 << bit):
+                    self.bits[byte] |= 1 << bit
+                    new = True
+            if new:
+                self.count += 1
+                self.dirty = True
+        return new
+
+    def update(self, values) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value):
+        for position in self._positions(value):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    @property
+    def full(self) -> bool:
+        """past capacity false positives get more likely, time to rebuild"""
+        return self.count > self.capacity
+
+    def save(self, path) -> None:
+        with self._lock:
+            data = {
+                "capacity": self.capacity,
+                "error_rate": self.error_rate,
+                "count": self.count,
+                "bits": base64.b64encode(self.bits).decode(),
+            }
+            self.dirty = False
+        atomic_write(path, json.dumps(data))
+
+    @classmethod
+    def load(cls, path):
+        """returns: the filter saved at path or None if there isn't one"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            data = json.load(fh)
+        bloom = cls(data["capacity"], data["error_rate"])
+        bits = base64.b64decode(data["bits"])
+        if len(bits) != len(bloom.bits):
+            # saved by a different version of this code
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.count = data["count"]
+        return bloom
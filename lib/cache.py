@@ -0,0 +1,90 @@
+"""
+A small thread-safe in-memory cache with a time to live & least recently
+used eviction, used to avoid repeating identical API requests within a run.
+Keys are tuples whose first item is the UUID of the taxonomy (or group) the
+value came from so everything cached for it can be invalidated at once when
+we change it.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        """
+        args:
+            maxsize (int): most entries to keep, least recently used entries
+            are evicted past this
+            ttl (float): seconds an entry stays valid
+            clock (callable): returns the current time in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key => (expiry time, value), ordered least => most recently used
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > self.clock()
+
+    def __repr__(self):
+        return "<TTLCache {} entries, {} hits, {} misses>".format(
+            len(self), self.hits, self.misses
+        )
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, uuid) -> int:
+        """
+        Drop every entry whose key starts with `uuid`.
+
+        returns:
+            number of entries dropped
+        """
+        with self._lock:
+            keys = [k for k in self._data if k[0] == uuid]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,303 @@
+"""
+A local SQLite copy of Workday course snapshots for answering questions like
+which sections an instructor teaches, what is colocated with a section or
+what a department offers this semester without running jq over the whole
+JSON file. Courses are parsed with the Course model so the fields match what
+the other scripts see (department codes, semesters, unescaped titles).
+
+    db = CourseDB("data/courses.sqlite")
+    db.load("data/data.json")
+    db.by_instructor("ephetteplace")
+    db.search("ceramics")
+
+Loading a snapshot only writes the courses that changed since the last one,
+removes courses that are no longer in their semester's snapshot & skips a
+file that hasn't changed at all. Instructor usernames, departments & section
+codes are indexed and titles are searchable with SQLite's FTS5 extension.
+"""
+
+import hashlib
+import json
+import sqlite3
+
+from .course import Course
+from .downloads import file_md5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    section_def_refid TEXT PRIMARY KEY,
+    semester TEXT NOT NULL,
+    section_code TEXT NOT NULL,
+    course_code TEXT,
+    section_title TEXT,
+    course_title TEXT,
+    owner TEXT,
+    instructor_names TEXT,
+    on_portal INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS courses_section_code ON courses (section_code);
+CREATE INDEX IF NOT EXISTS courses_owner ON courses (owner, semester);
+CREATE INDEX IF NOT EXISTS courses_semester ON courses (semester);
+CREATE TABLE IF NOT EXISTS instructors (
+    section_def_refid TEXT NOT NULL,
+    username TEXT NOT NULL,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS instructors_username ON instructors (username);
+CREATE INDEX IF NOT EXISTS instructors_section ON instructors (section_def_refid);
+CREATE TABLE IF NOT EXISTS colocations (
+    section_def_refid TEXT NOT NULL,
+    colocated_refid TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS colocations_section ON colocations (section_def_refid);
+CREATE INDEX IF NOT EXISTS colocations_colocated ON colocations (colocated_refid);
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT PRIMARY KEY,
+    md5 TEXT NOT NULL,
+    loaded TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+-- the titles index reads from the courses table, the triggers keep it in sync
+CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(
+    section_title, course_title, content='courses', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS courses_insert AFTER INSERT ON courses BEGIN
+    INSERT INTO titles (rowid, section_title, course_title)
+    VALUES (new.rowid, new.section_title, new.course_title);
+END;
+CREATE TRIGGER IF NOT EXISTS courses_delete AFTER DELETE ON courses BEGIN
+    INSERT INTO titles (titles, rowid, section_title, course_title)
+    VALUES ('delete', old.rowid, old.section_title, old.course_title);
+END;
+CREATE TRIGGER IF NOT EXISTS courses_update AFTER UPDATE ON courses BEGIN
+    INSERT INTO titles (titles, rowid, section_title, course_title)
+    VALUES ('delete', old.rowid, old.section_title, old.course_title);
+    INSERT INTO titles (rowid, section_title, course_title)
+    VALUES (new.rowid, new.section_title, new.course_title);
+END;
+"""
+
+COLUMNS = (
+    "section_def_refid",
+    "semester",
+    "section_code",
+    "course_code",
+    "section_title",
+    "course_title",
+    "owner",
+    "instructor_names",
+    "on_portal",
+    "hash",
+    "json",
+)
+
+
+def course_hash(data) -> str:
+    """hash of a course's JSON, so we can tell which courses changed"""
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def fts_query(text) -> str:
+    """
+    Quote each word of a search so FTS5 syntax characters (e.g. "-" in
+    "3-D") are taken literally, the last word matches as a prefix.
+    """
+    words = ['"{}"'.format(w.replace('"', '""')) for w in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+def format_course(row) -> str:
+    return "{}\t{}\t{}\t{}".format(
+        row["semester"],
+        row["section_code"],
+        row["section_title"],
+        row["instructor_names"],
+    )
+
+
+class CourseDB:
+    def __init__(self, path="data/courses.sqlite"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM courses").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def load(self, path) -> dict:
+        """
+        Load a Workday JSON snapshot, only writing what changed since the
+        courses were last loaded. Courses of the snapshot's semesters that
+        aren't in it are deleted, other semesters are left alone.
+
+        args:
+            path (str): course JSON file
+        returns:
+            counts (dict): added, updated, deleted & unchanged courses, or
+            {"skipped": True} if the file is the same as last time
+        """
+        md5 = file_md5(path)
+        row = self.connection.execute(
+            "SELECT md5 FROM snapshots WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row["md5"] == md5:
+            return {"skipped": True}
+
+        with open(path, "r") as file:
+            data = json.load(file)
+        courses = {}
+        for d in data:
+            course = Course(**d)
+            courses[course.section_def_refid] = (course, d)
+        semesters = sorted({c.semester for c, d in courses.values()})
+
+        counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        # one transaction, readers see the old or the new snapshot
+        with self.connection:
+            existing = dict(
+                self.connection.execute(
+                    "SELECT section_def_refid, hash FROM courses WHERE semester IN ({})".format(
+                        ", ".join("?" * len(semesters))
+                    ),
+                    semesters,
+                ).fetchall()
+            )
+            gone = [refid for refid in existing if refid not in courses]
+            self.delete(gone)
+            counts["deleted"] = len(gone)
+            for refid, (course, d) in courses.items():
+                if existing.get(refid) == course_hash(d):
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated" if refid in existing else "added"] += 1
+                self.write(course, d)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO snapshots (path, md5) VALUES (?, ?)",
+                (path, md5),
+            )
+        return counts
+
+    def delete(self, refids) -> None:
+        for refid in refids:
+            for table in ("instructors", "colocations", "courses"):
+                self.connection.execute(
+                    "DELETE FROM {} WHERE section_def_refid = ?".format(table),
+                    (refid,),
+                )
+
+    def write(self, course, data) -> None:
+        """insert or update a course from its Course object & its JSON"""
+        refid = course.section_def_refid
+        row = (
+            refid,
+            course.semester,
+            course.section_code,
+            course.course_code,
+            course.section_title,
+            course.course_title,
+            course.owner,
+            course.instructor_names,
+            int(course.on_portal),
+            course_hash(data),
+            json.dumps(data),
+        )
+        # an upsert keeps the rowid so the titles index is updated in place
+        self.connection.execute(
+            "INSERT INTO courses ({}) VALUES ({}) ON CONFLICT (section_def_refid) DO UPDATE SET {}".format(
+                ", ".join(COLUMNS),
+                ", ".join("?" * len(COLUMNS)),
+                ", ".join("{0} = excluded.{0}".format(c) for c in COLUMNS[1:]),
+            ),
+            row,
+        )
+        for table in ("instructors", "colocations"):
+            self.connection.execute(
+                "DELETE FROM {} WHERE section_def_refid = ?".format(table), (refid,)
+            )
+        self.connection.executemany(
+            "INSERT INTO instructors VALUES (?, ?, ?)",
+            [
+                (refid, i["username"], "{} {}".format(i["first_name"], i["last_name"]))
+                for i in course.instructors
+            ],
+        )
+        self.connection.executemany(
+            "INSERT INTO colocations VALUES (?, ?)",
+            [(refid, colo) for colo in course.colocated_sections or []],
+        )
+
+    def query(self, sql, params=()) -> list[sqlite3.Row]:
+        return self.connection.execute(sql, params).fetchall()
+
+    def course(self, section) -> sqlite3.Row:
+        """
+        args:
+            section (str): section code (e.g. "ANIMA-1000-1") or section_def_refid
+        returns:
+            the course row, the latest semester's if a section code repeats, or None
+        """
+        rows = self.query(
+            "SELECT * FROM courses WHERE section_def_refid = ? OR section_code = ?",
+            (section, section),
+        )
+        # section codes repeat every semester
+        return max(rows, key=lambda r: semester_sort(r["semester"]), default=None)
+
+    def by_instructor(self, username, semester=None) -> list[sqlite3.Row]:
+        sql = "SELECT courses.* FROM instructors JOIN courses USING (section_def_refid) WHERE username = ?"
+        return self.query(*self.in_semester(sql, [username], semester))
+
+    def by_department(self, owner, semester=None) -> list[sqlite3.Row]:
+        sql = "SELECT * FROM courses WHERE owner = ?"
+        return self.query(*self.in_semester(sql, [owner.upper()], semester))
+
+    def colocated(self, section) -> list[sqlite3.Row]:
+        """sections colocated or cross-listed with a section, in either direction"""
+        course = self.course(section)
+        if course is None:
+            return []
+        return self.query(
+            """SELECT * FROM courses WHERE section_def_refid IN (
+                SELECT colocated_refid FROM colocations WHERE section_def_refid = :refid
+                UNION
+                SELECT section_def_refid FROM colocations WHERE colocated_refid = :refid
+            ) AND section_def_refid != :refid ORDER BY section_code""",
+            {"refid": course["section_def_refid"]},
+        )
+
+    def search(self, text, semester=None) -> list[sqlite3.Row]:
+        """full-text search of section & course titles, best matches first"""
+        sql = "SELECT courses.* FROM titles JOIN courses ON courses.rowid = titles.rowid WHERE titles MATCH ?"
+        sql, params = self.in_semester(sql, [fts_query(text)], semester, order=False)
+        return self.query(sql + " ORDER BY titles.rank", params)
+
+    @staticmethod
+    def in_semester(sql, params, semester, order=True) -> tuple[str, list]:
+        if semester:
+            # accept Workday's "Fall_2023" as well as "Fall 2023"
+            sql += " AND semester = ?"
+            params.append(semester.replace("_", " "))
+        if order:
+            sql += " ORDER BY semester, section_code"
+        return sql, params
+
+
+def semester_sort(semester) -> tuple:
+    """sort key for "Spring 2020" style semesters, by year then season"""
+    season, _, year = semester.rpartition(" ")
+    seasons = ["Spring", "Summer", "Fall"]
+    return (year, seasons.index(season) if season in seasons else -1)
@@ -0,0 +1,84 @@
+"""
+Buffered CSV output to one or more destinations at once. A destination is a
+file path, "-" for stdout or a path ending in ".gz" for a gzipped file. Rows
+are formatted once into an in-memory buffer which is written to every
+destination each `buffer_rows` rows, so rows can be streamed from a generator
+without keeping them all in memory.
+
+    with CsvSink(["_informer.csv", "-"]) as sink:
+        sink.writerow(HEADER)
+        sink.writerows(rows)
+"""
+
+import csv
+import gzip
+import io
+import sys
+
+
+def open_output(path):
+    """open a CSV destination for writing, "-" is stdout"""
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", newline="")
+    return open(path, "w", newline="")
+
+
+class CsvSink:
+    def __init__(self, paths, buffer_rows=1000):
+        """
+        args:
+            paths (list): destinations, see open_output
+            buffer_rows (int): rows formatted before they're written out
+        """
+        self.paths = list(paths)
+        self.buffer_rows = buffer_rows
+        self.rows = 0
+        self.files = []
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = 0
+
+    def __enter__(self):
+        try:
+            for path in self.paths:
+                self.files.append(open_output(path))
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.flush()
+        finally:
+            self.close()
+
+    def writerow(self, row) -> None:
+        self._writer.writerow(row)
+        self.rows += 1
+        self._pending += 1
+        if self._pending >= self.buffer_rows:
+            self.flush()
+
+    def writerows(self, rows) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        text = self._buffer.getvalue()
+        if text:
+            for fh in self.files:
+                fh.write(text)
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._pending = 0
+
+    def close(self) -> None:
+        for fh in self.files:
+            if fh is sys.stdout:
+                fh.flush()
+            else:
+                fh.close()
+        self.files = []
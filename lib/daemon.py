@@ -0,0 +1,360 @@
+"""
+Keep app.py running between Workday snapshots instead of starting cold from
+cron. The taxonomies, their term trees (every term we create or find is
+remembered, see TermTree) & the last snapshot we applied stay in memory. A
+course file, or the newest file matching a glob pattern, is polled for
+changes & each new snapshot is compared with the last one so only courses
+that were added, removed or changed in a way that affects their terms cost
+any requests.
+
+    daemon = CourseDaemon("data/data.json", routes, interval=60)
+    daemon.serve_status(8765)  # GET http://127.0.0.1:8765/status
+    daemon.run()
+
+The first snapshot is applied like a normal run: the semester is deleted from
+the course lists (unless `delete` is False) & every course is added. So is
+a snapshot for a different semester than the last one. Removing a course
+deletes its section term from the course lists along with any of its parent
+terms no other course uses, terms in the flat taxonomies (sections, names,
+titles, faculty) are left alone like they are by app.py.
+"""
+
+from collections import namedtuple
+import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+
+from .add_to_taxos import add_to_taxos, course_terms, get_depts, has_dept_layer
+from .course import Course
+from .get_taxos import allow_refresh
+from .metrics import COURSES, registry
+from .scheduler import TermScheduler
+from .utilities import course_sort
+from config import logger
+
+SnapshotDiff = namedtuple("SnapshotDiff", ["added", "removed", "changed"])
+
+
+def course_key(course) -> str:
+    return course.section_def_refid
+
+
+def course_signature(course) -> tuple:
+    """everything about a course that ends up in one of its taxonomy terms"""
+    return (
+        course.semester,
+        tuple(sorted(get_depts(course))),
+        course.section_title,
+        course.instructor_names,
+        course.instructor_usernames,
+        course.section_code,
+        course.course_code,
+        course.course_refid,
+        course.acad_level,
+        course.delivery_mode,
+        course.instructional_format,
+        course.subject_name,
+    )
+
+
+def diff_snapshots(old, new) -> SnapshotDiff:
+    """
+    args:
+        old (dict): course_key => Course from the last snapshot
+        new (dict): course_key => Course from this one
+    returns:
+        SnapshotDiff of lists of Courses, `changed` holds (old, new) pairs
+    """
+    added = [c for k, c in new.items() if k not in old]
+    removed = [c for k, c in old.items() if k not in new]
+    changed = [
+        (old[k], c)
+        for k, c in new.items()
+        if k in old and course_signature(old[k]) != course_signature(c)
+    ]
+    return SnapshotDiff(added, removed, changed)
+
+
+def remove_course(course, routes, confirm=False) -> int:
+    """
+    Delete a course's terms from its course list taxonomies: the section
+    term & every parent term (below the semester) that only it uses. Only
+    terms in the in-memory term trees can be found.
+
+    args:
+        course (Course)
+        routes (TaxonomyRoutes)
+        confirm (bool): also ask VAULT that a parent has no other children
+        before deleting it, needed when the semester wasn't deleted first
+        since the term trees then lack the terms VAULT already had
+    returns:
+        removed (int): number of terms deleted
+    """
+    removed = 0
+    for dept in sorted(get_depts(course)):
+        taxo = routes.route(dept).course_list
+        if not taxo:
+            continue
+        chain = course_terms(course, has_dept_layer(taxo))
+        if not taxo.terms.get_path(chain[-1].fullTerm):
+            logger.warning(
+                'Cannot remove course %s from "%s", its term is not known',
+                course,
+                taxo,
+            )
+            continue
+        # the highest term whose subtree is just this course's terms, walking
+        # up from the section term
+        top = len(chain) - 1
+        for depth in range(len(chain) - 2, 0, -1):
+            term = taxo.terms.get_path(chain[depth].fullTerm)
+            if not term or taxo.terms.count_subtree(term) != len(chain) - depth:
+                break
+            if confirm:
+                children = taxo.getChildren(chain[depth].fullTerm)
+                if [t.term for t in children] != [chain[depth + 1].term]:
+                    break
+            top = depth
+        term = taxo.terms.get_path(chain[top].fullTerm)
+        count = taxo.terms.count_subtree(term)
+        if taxo.remove(term):
+            removed += count
+    return removed
+
+
+def load_snapshot(path) -> dict:
+    """returns: course_key => Course for every Portal course in a JSON file"""
+    with open(path, "r") as file:
+        courses = [Course(**c) for c in json.load(file)]
+    COURSES.set(len(courses), state="parsed")
+    snapshot = {course_key(c): c for c in courses if c.on_portal}
+    COURSES.set(len(snapshot), state="on_portal")
+    return snapshot
+
+
+class CourseDaemon:
+    def __init__(
+        self,
+        path,
+        routes,
+        interval=60,
+        only_course_lists=False,
+        delete=True,
+        workers=0,
+    ):
+        """
+        args:
+            path (str): course JSON file or a glob pattern, the newest
+            matching file is used
+            routes (TaxonomyRoutes)
+            interval (float): seconds between checks for a new snapshot
+            only_course_lists (bool): see add_to_taxos
+            delete (bool): delete the semester from the course lists before
+            applying a semester's first snapshot
+            workers (int): create terms with a TermScheduler of this many
+            workers, 0 adds one course at a time
+        """
+        self.path = path
+        self.routes = routes
+        self.interval = interval
+        self.only_course_lists = only_course_lists
+        self.delete = delete
+        self.workers = workers
+        self.snapshot = {}
+        self.semester = None
+        # (path, mtime, size) of the last file applied
+        self.applied = None
+        self.stopped = threading.Event()
+        self.server = None
+        # status, guarded by the lock
+        self.lock = threading.Lock()
+        self.state = "starting"
+        self.pending = 0
+        self.courses_applied = 0
+        self.snapshots = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_file = None
+        self.last_applied = None
+        self.last_seconds = None
+        self.last_rate = None
+        self.started = time.time()
+
+    def latest(self):
+        """returns: (path, mtime, size) of the newest course file or None"""
+        paths = glob.glob(self.path)
+        if not paths:
+            return None
+        path = max(paths, key=os.path.getmtime)
+        stat = os.stat(path)
+        return (path, stat.st_mtime, stat.st_size)
+
+    def poll(self) -> bool:
+        """apply the newest course file if it changed, True if it did"""
+        latest = self.latest()
+        if latest is None or latest == self.applied:
+            return False
+        try:
+            self.apply(load_snapshot(latest[0]))
+        except Exception as error:
+            # self.applied isn't updated so the next poll tries again
+            logger.exception("Error applying %s", latest[0])
+            with self.lock:
+                self.state = "error"
+                self.errors += 1
+                self.last_error = repr(error)
+            return False
+        self.applied = latest
+        with self.lock:
+            self.last_file = latest[0]
+        return True
+
+    def apply(self, snapshot) -> SnapshotDiff:
+        """
+        Bring the taxonomies in line with a snapshot.
+
+        args:
+            snapshot (dict): course_key => Course, see load_snapshot
+        returns:
+            SnapshotDiff that was applied
+        """
+        if not snapshot:
+            # most likely a partial export, don't delete every course
+            logger.warning("Snapshot has no Portal courses, ignoring it")
+            return SnapshotDiff([], [], [])
+        start = time.perf_counter()
+        # semester is the same for all courses so we just grab it from one
+        semester = next(iter(snapshot.values())).semester
+        # a new taxonomy since the last snapshot can be found by a refresh
+        allow_refresh()
+        self.routes.check(
+            (d for c in snapshot.values() for d in get_depts(c)),
+            self.only_course_lists,
+        )
+        if semester != self.semester:
+            diff = SnapshotDiff(list(snapshot.values()), [], [])
+            logger.info(
+                'Applying all %s courses for semester "%s"', len(snapshot), semester
+            )
+            if self.delete:
+                for taxo in self.routes.taxos:
+                    if "course list" in taxo.name.lower():
+                        taxo.remove(semester)
+        else:
+            diff = diff_snapshots(self.snapshot, snapshot)
+            logger.info(
+                "Applying %s added, %s removed & %s changed courses",
+                len(diff.added),
+                len(diff.removed),
+                len(diff.changed),
+            )
+        removals = diff.removed + [old for old, new in diff.changed]
+        additions = diff.added + [new for old, new in diff.changed]
+        with self.lock:
+            self.state = "applying"
+            self.pending = len(removals) + len(additions)
+        for course in removals:
+            remove_course(course, self.routes, confirm=not self.delete)
+            self.done(1)
+        additions.sort(key=course_sort)
+        if self.workers and additions:
+            scheduler = TermScheduler(workers=self.workers)
+            for course in additions:
+                scheduler.add_course(course, self.routes, self.only_course_lists)
+            scheduler.run()
+            self.done(len(additions))
+        else:
+            for course in additions:
+                add_to_taxos(course, self.routes, self.only_course_lists)
+                self.done(1)
+        # once per snapshot, not once per term
+        self.routes.save_blooms()
+        seconds = time.perf_counter() - start
+        count = len(removals) + len(additions)
+        self.snapshot = snapshot
+        self.semester = semester
+        with self.lock:
+            self.state = "idle"
+            self.snapshots += 1
+            self.last_applied = time.time()
+            self.last_seconds = round(seconds, 3)
+            self.last_rate = round(count / seconds, 2) if seconds else None
+        logger.info("Applied %s course changes in %.1f seconds", count, seconds)
+        return diff
+
+    def done(self, count) -> None:
+        with self.lock:
+            self.pending -= count
+            self.courses_applied += count
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "state": self.state,
+                "path": self.path,
+                "last_file": self.last_file,
+                "semester": self.semester,
+                "courses": len(self.snapshot),
+                "queue": self.pending,
+                "snapshots": self.snapshots,
+                "courses_applied": self.courses_applied,
+                "last_applied": self.last_applied,
+                "last_seconds": self.last_seconds,
+                "last_courses_per_second": self.last_rate,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "uptime": round(time.time() - self.started, 3),
+            }
+
+    def serve_status(self, port, host="127.0.0.1") -> int:
+        """
+        Serve status() as JSON at /status & the Prometheus metrics at
+        /metrics in a background thread.
+
+        returns:
+            port (int): the port used, pass 0 to pick a free one
+        """
+        self.server = ThreadingHTTPServer((host, port), StatusHandler)
+        self.server.course_daemon = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(
+            "Serving status on http://%s:%s/status", host, self.server.server_port
+        )
+        return self.server.server_port
+
+    def run(self) -> None:
+        """poll for new snapshots until stop() is called"""
+        logger.info("Watching %s every %s seconds", self.path, self.interval)
+        while not self.stopped.is_set():
+            self.poll()
+            self.stopped.wait(self.interval)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path in ("/", "/status"):
+            body = json.dumps(self.server.course_daemon.status(), indent=2).encode()
+            content_type = "application/json"
+        elif self.path == "/metrics":
+            body = (registry.expose() + "\n").encode()
+            content_type = "text/plain; version=0.0.4"
+        else:
+            return self.send_error(404)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,105 @@
+"""
+Limit a run of app.py to some departments (`--dept ANIMA,GLASS`) so one
+department's bad data can be fixed without touching every course list. The
+index files each course under the departments get_depts returns & under its
+owner. A code selects:
+
+- the courses filed under that department, which are added to that
+  department's taxonomies only
+- the courses it owns, which are also added to the SYLLABUS & ARCH DIV
+  taxonomies, where they sit under a term for their owner (e.g. Spring
+  2024\\BARCH), if they're filed there
+
+so the semester is deleted from the department's own course list & only
+"Semester\\CODE" from the SYLLABUS & ARCH DIV course lists.
+
+    index = DeptIndex(courses)
+    for taxo, path in index.semester_terms(["ANIMA"], routes, semester):
+        taxo.remove(path)
+    for course, depts in index.select(["ANIMA"]):
+        add_to_taxos(course, routes, depts=depts)
+"""
+
+from .add_to_taxos import DEPT_LAYER_TAXOS, get_depts
+from .utilities import course_sort
+
+
+def parse_depts(value) -> list[str]:
+    """argparse type for a comma-separated list of department codes"""
+    return [code.strip().upper() for code in value.split(",") if code.strip()]
+
+
+class DeptIndex:
+    def __init__(self, courses):
+        """
+        args:
+            courses (list): Course objects, only those on the Portal are indexed
+        """
+        self.by_dept = {}
+        self.by_owner = {}
+        for course in courses:
+            if not course.on_portal:
+                continue
+            for dept in get_depts(course):
+                self.by_dept.setdefault(dept, []).append(course)
+            self.by_owner.setdefault(course.owner, []).append(course)
+
+    def depts_for(self, course, codes) -> frozenset:
+        """the departments (from get_depts) whose taxonomies `codes` cover"""
+        return frozenset(
+            dept
+            for dept in get_depts(course)
+            if dept in codes or (dept in DEPT_LAYER_TAXOS and course.owner in codes)
+        )
+
+    def select(self, codes) -> list[tuple]:
+        """
+        args:
+            codes (iterable): department codes e.g. ["ANIMA", "BARCH"]
+        returns:
+            list of (Course, depts) pairs sorted like a full run, where depts
+            is what to pass to add_to_taxos
+        """
+        codes = set(codes)
+        courses = {}
+        for code in codes:
+            for course in self.by_dept.get(code, []) + self.by_owner.get(code, []):
+                courses[id(course)] = course
+        selected = []
+        for course in sorted(courses.values(), key=course_sort):
+            depts = self.depts_for(course, codes)
+            if depts:
+                selected.append((course, depts))
+        return selected
+
+    def unknown(self, codes) -> list[str]:
+        """codes that select no courses, probably typos"""
+        return [c for c in codes if c not in self.by_dept and c not in self.by_owner]
+
+    def semester_terms(self, codes, routes, semester) -> list[tuple]:
+        """
+        The course list terms to delete before adding the selected courses
+        again: the semester in each department's own course list & the
+        department's term beneath the semester in the SYLLABUS or ARCH DIV
+        course lists.
+
+        args:
+            codes (iterable): department codes
+            routes (TaxonomyRoutes)
+            semester (str): e.g. "Spring 2024"
+        returns:
+            list of (Taxonomy, path) pairs
+        """
+        terms = []
+        for course, depts in self.select(codes):
+            for dept in sorted(depts):
+                taxo = routes.route(dept).course_list
+                if not taxo:
+                    continue
+                if dept in DEPT_LAYER_TAXOS and dept not in codes:
+                    path = "{}\\{}".format(semester, course.owner)
+                else:
+                    path = semester
+                if (taxo, path) not in terms:
+                    terms.append((taxo, path))
+        return terms
@@ -0,0 +1,176 @@
+"""
+Download Workday course files from Google Storage with the `gcloud` CLI
+(using the google-cloud-storage library stopped working, some kind of auth
+problem). Files are stored under data/cache named after their MD5 checksum,
+so we first ask Storage for an object's checksum & only copy it when we don't
+already have that exact content. Composite uploads have no MD5, those are
+always copied & named after the MD5 of what we downloaded. Several terms are
+fetched at once and only the `max_files` most recently used files are kept.
+
+    downloader = CourseDownloader()
+    paths = downloader.fetch_terms(["Fall_2023", "Spring_2024"])
+
+The command runner & `gcloud` executable can both be swapped, e.g. tests
+point `gcloud` at a fake script.
+"""
+
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+
+import config
+
+BUCKET = "gs://int_files_source"
+
+
+class DownloadError(Exception):
+    pass
+
+
+def term_uri(term) -> str:
+    """Google Storage URI of a term's course file, term is like "Fall_2023" """
+    return f"{BUCKET}/course_section_data_AP_{term}.json"
+
+
+def run(args) -> str:
+    """
+    Run a command & return its output, raising DownloadError if it fails.
+
+    args:
+        args (list): command & its arguments
+    returns:
+        stdout (str)
+    """
+    try:
+        proc = subprocess.run(args, capture_output=True, text=True)
+    except OSError as e:
+        raise DownloadError("Unable to run {}: {}".format(args[0], e)) from e
+    if proc.returncode != 0:
+        raise DownloadError(
+            "{} exited with status {}: {}".format(
+                " ".join(args), proc.returncode, proc.stderr.strip()
+            )
+        )
+    return proc.stdout
+
+
+def file_md5(path) -> str:
+    """hex MD5 of a file, read in chunks"""
+    md5 = hashlib.md5()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class CourseDownloader:
+    def __init__(
+        self,
+        directory="data/cache",
+        gcloud=("gcloud",),
+        runner=run,
+        max_files=20,
+        workers=4,
+    ):
+        """
+        args:
+            directory (str): content-addressed cache directory
+            gcloud (tuple): command used for gcloud, e.g. ("python", "fake_gcloud.py")
+            runner (function): takes a list of arguments, returns stdout
+            max_files (int): cached files kept after each download
+            workers (int): files downloaded at the same time
+        """
+        self.directory = directory
+        self.gcloud = list(gcloud)
+        self.runner = runner
+        self.max_files = max_files
+        self.workers = workers
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def remote_md5(self, uri) -> str:
+        """
+        hex MD5 of a Storage object, which gcloud reports in base64, or None
+        for objects without one (composite & parallel uploads)
+        """
+        out = self.runner(
+            self.gcloud
+            + ["storage", "objects", "describe", uri, "--format=value(md5_hash)"]
+        ).strip()
+        if not out:
+            config.logger.info("%s has no MD5 checksum, downloading it", uri)
+            return None
+        return base64.b64decode(out).hex()
+
+    def path_for(self, md5) -> str:
+        return os.path.join(self.directory, "{}.json".format(md5))
+
+    def fetch(self, uri) -> str:
+        """
+        Download a Storage object unless we already have its content.
+
+        returns:
+            path (str): local path of the cached file
+        """
+        md5 = self.remote_md5(uri)
+        path = md5 and self.path_for(md5)
+        if md5 and os.path.exists(path) and file_md5(path) == md5:
+            config.logger.info("%s is unchanged, using %s", uri, path)
+            # mark as recently used so eviction keeps it
+            os.utime(path)
+            return path
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        os.close(fd)
+        try:
+            self.runner(self.gcloud + ["storage", "cp", uri, tmp])
+            downloaded = file_md5(tmp)
+            if md5 and downloaded != md5:
+                raise DownloadError(
+                    "Checksum of downloaded {} does not match".format(uri)
+                )
+            path = self.path_for(downloaded)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        config.logger.info("Downloaded %s to %s", uri, path)
+        self.evict(keep=path)
+        return path
+
+    def fetch_terms(self, terms) -> dict:
+        """
+        args:
+            terms (list): terms like "Fall_2023"
+        returns:
+            paths (dict): term => local path of its course file
+        """
+        terms = list(dict.fromkeys(terms))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            paths = executor.map(lambda t: self.fetch(term_uri(t)), terms)
+            return dict(zip(terms, paths))
+
+    def evict(self, keep=None) -> list[str]:
+        """
+        Remove the least recently used cached files beyond max_files.
+
+        returns:
+            removed (list): paths of deleted files
+        """
+        with self._evict_lock:
+            paths = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".json") and not name.startswith(".")
+            ]
+            paths.sort(key=os.path.getmtime, reverse=True)
+            removed = [p for p in paths[self.max_files :] if p != keep]
+            for path in removed:
+                os.remove(path)
+            return removed
@@ -1,39 +1,81 @@
 """
 If we have a JSON list of groups from VAULT, return it.
 IF we don't, create such a list using the REST API.
-Direct copy of logic from get_taxos.py
+Direct copy of logic from get_taxos.py, including the fetch time & TTL
+(`config.cache_ttl`) and the once-per-run `refresh_groups`, which
+desired_membership calls when it can't find a department's group.
 """
 
-import json
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
+import threading
 
-from .utilities import request_wrapper
+from .paging import CacheFileWriter, iter_results
+from .utilities import read_cache
+from .get_taxos import cache_ttl
 from .group import Group
 import config
 
 groups_file = os.path.join("data", "groups.json")
+_refresh_lock = threading.Lock()
+_refreshed = False
 
 
-def download_groups() -> list[Group]:
-    s = request_wrapper()
-    response = s.get(config.api_root + "/usermanagement/local/group?allParents=true")
-    response.raise_for_status()
-    data = response.json()
-    # create file
-    with open(groups_file, "w") as fh:
-        json.dump(data, fh)
+def iter_groups(page_size=200, workers=4):
+    """page through VAULT's groups, see iter_taxos"""
+    with CacheFileWriter(groups_file) as writer:
+        for g in iter_results(
+            config.api_root + "/usermanagement/local/group",
+            {"allParents": "true"},
+            page_size=page_size,
+            workers=workers,
+        ):
+            writer.write(g)
+            yield Group(g)
+    config.logger.info("Downloaded %s groups from API.", writer.count)
+
 
-    config.logger.info("Downloaded group JSON data from API.")
-    s.close()
-    return [Group(g) for g in data["results"]]
+def download_groups() -> list[Group]:
+    return list(iter_groups())
 
 
 def get_groups() -> list[Group]:
     config.logger.info("Getting group JSON data.")
-    if os.path.exists(groups_file):
-        with open(groups_file, "r") as fh:
-            data = json.load(fh)
-            return [Group(g) for g in data["results"]]
+    data = read_cache(groups_file, cache_ttl())
+    if data:
+        return [Group(g) for g in data["results"]]
     else:
         # get data from API, this fn also writes to file
         return download_groups()
+
+
+def load_groups_in_background(download=False) -> Future:
+    """load groups in a background thread, see load_taxos_in_background"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="groups")
+    future = executor.submit(download_groups if download else get_groups)
+    executor.shutdown(wait=False)
+    return future
+
+
+def refresh_groups(groups) -> list[Group]:
+    """
+    Download the group list again & add groups we didn't know about to
+    `groups` in place, at most once per run. See refresh_taxos.
+
+    returns:
+        new (list): the Group objects that were added
+    """
+    global _refreshed
+    with _refresh_lock:
+        if _refreshed:
+            return []
+        _refreshed = True
+        known = set(g.uuid for g in groups)
+        new = [g for g in download_groups() if g.uuid not in known]
+        groups.extend(new)
+    config.logger.info(
+        "Refreshed group list, found %s new groups: %s",
+        len(new),
+        ", ".join(g.name for g in new),
+    )
+    return new
@@ -1,40 +1,109 @@
 """
 If we have a JSON list of taxonomies from VAULT, return it.
 IF we don't, create such a list using the REST API.
+
+The list carries the time it was fetched and is downloaded again once it is
+older than `config.cache_ttl` seconds (a week by default). If we look for a
+taxonomy that isn't in the list, e.g. because a new program was created,
+`refresh_taxos` downloads it again but only once per run (a long-running
+process calls `allow_refresh` to start a new "run").
 """
 
-import json
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
+import threading
 
-from .utilities import request_wrapper
+from .paging import CacheFileWriter, iter_results
+from .utilities import read_cache
 from .taxonomy import Taxonomy
 import config
 
 taxos_file = os.path.join("data", "taxonomies.json")
+# one refresh per run no matter how many lookups miss
+_refresh_lock = threading.Lock()
+_refreshed = False
 
 
-def download_taxos() -> list[Taxonomy]:
-    s = request_wrapper()
-    # with 2019.2 API defaults to length=10 if you don't specify it, we want
-    # _all_ the taxonomies so just make this a very high number
-    r = s.get(config.api_root + "/taxonomy?length=5000")
-    r.raise_for_status()
-    data = r.json()
-    # create file
-    with open(taxos_file, "w") as fh:
-        json.dump(data, fh)
+def cache_ttl() -> int:
+    return getattr(config, "cache_ttl", 60 * 60 * 24 * 7)
 
-    config.logger.info("Downloaded taxonomy JSON data from API.")
-    s.close()
-    return [Taxonomy(t) for t in data["results"]]
+
+def iter_taxos(page_size=200, workers=4):
+    """
+    Page through VAULT's taxonomies, yielding Taxonomy objects as pages
+    arrive & writing them to the cache file as we go. The cache file is
+    only replaced once the whole listing has been read.
+    """
+    with CacheFileWriter(taxos_file) as writer:
+        for t in iter_results(
+            config.api_root + "/taxonomy", page_size=page_size, workers=workers
+        ):
+            writer.write(t)
+            yield Taxonomy(t)
+    config.logger.info("Downloaded %s taxonomies from API.", writer.count)
+
+
+def download_taxos() -> list[Taxonomy]:
+    # the 2019.2 API defaults to length=10 so a single request would be
+    # truncated, we follow its paging instead
+    return list(iter_taxos())
 
 
 def get_taxos() -> list[Taxonomy]:
     config.logger.info("Getting taxonomy JSON data.")
-    if os.path.exists(taxos_file):
-        with open(taxos_file, "r") as fh:
-            data = json.load(fh)
-            return [Taxonomy(t) for t in data["results"]]
+    data = read_cache(taxos_file, cache_ttl())
+    if data:
+        return [Taxonomy(t) for t in data["results"]]
     else:
         # get data from API, this fn also writes to file
         return download_taxos()
+
+
+def load_taxos_in_background(download=False) -> Future:
+    """
+    Start loading taxonomies (from the cache file or, if it is stale or
+    `download` is True, from VAULT) in a background thread so the download
+    overlaps with other startup work like parsing course JSON.
+
+    returns:
+        Future whose result() is the list of Taxonomy objects
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="taxos")
+    future = executor.submit(download_taxos if download else get_taxos)
+    executor.shutdown(wait=False)
+    return future
+
+
+def refresh_taxos(taxos) -> list[Taxonomy]:
+    """
+    Download the taxonomy list again & add any taxonomies we didn't know
+    about to `taxos` in place. Existing Taxonomy objects are kept since they
+    may hold terms we have already loaded. Only the first call in a run
+    downloads anything, later calls return an empty list.
+
+    args:
+        taxos (list): list of Taxonomy objects to update
+    returns:
+        new (list): the Taxonomy objects that were added
+    """
+    global _refreshed
+    with _refresh_lock:
+        if _refreshed:
+            return []
+        _refreshed = True
+        known = set(t.uuid for t in taxos)
+        new = [t for t in download_taxos() if t.uuid not in known]
+        taxos.extend(new)
+    config.logger.info(
+        "Refreshed taxonomy list, found %s new taxonomies: %s",
+        len(new),
+        ", ".join(t.name for t in new),
+    )
+    return new
+
+
+def allow_refresh() -> None:
+    """let the next refresh_taxos call download the taxonomy list again"""
+    global _refreshed
+    with _refresh_lock:
+        _refreshed = False
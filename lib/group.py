@@ -1,4 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import config
+from .cache import TTLCache
+from .tracing import tracer
 from .utilities import request_wrapper
 
 # five-letter academic unit name => EQUELLA group name, ldap group name
@@ -51,48 +55,142 @@ map = {
 }
 
 
+def reverse_index(map) -> dict:
+    """
+    EQUELLA group name => (academic unit, ldap group name). When several
+    units share a group the first one listed in `map` wins.
+    """
+    index = {}
+    for au, val in map.items():
+        if val["group"]:
+            index.setdefault(val["group"], (au, val["ldap"]))
+    return index
+
+
+group_index = reverse_index(map)
+# group members keyed on (group uuid,), shared by every Group object
+members_cache = TTLCache(maxsize=512, ttl=300)
+
+
+def prefetch_users(groups, workers=8, refresh=False) -> list:
+    """
+    Load the members of many groups concurrently so later add_users,
+    remove_users & write_ldap_file calls don't each block on a GET.
+
+    args:
+        groups (list): Group objects
+        workers (int): groups fetched at the same time
+        refresh (bool): fetch even if members are cached
+    returns:
+        groups (list): the same Groups, with their users loaded
+    """
+    groups = list(groups)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() so any HTTP error is raised here
+        list(executor.map(lambda g: g.get_users(refresh), groups))
+    return groups
+
+
 class Group:
     def __init__(self, group):
         # infuriating inconsistency, group's UUID is named "ID" for some reason
         self.uuid = group["id"]
         self.parentUuid = group.get("parentId", None)
         self.name = group["name"]
+        tracer.label(self.uuid, self.name)
+        # membership as we last read it from EQUELLA, plus changes staged by
+        # add_users/remove_users that commit() hasn't sent yet
+        self._members = set()
+        self._adds = set()
+        self._removes = set()
         # initial as empty to save time, can add later with self.get_users()
-        self.users = []
         self._have_gotten_users = False
-        # calculate these on init so repeat calls don't cost anything
-        self.au = next(
-            (key for key, val in map.items() if val["group"] == self.name), None
-        )
+        # look these up on init so repeat calls don't cost anything
+        self.au, self.ldap = group_index.get(self.name, (None, None))
         self.academic_unit = self.au
-        self.ldap = next(
-            (val["ldap"] for val in map.values() if val["group"] == self.name), None
-        )
         self.ldap_name = self.ldap
 
     def __repr__(self):
         return self.name
 
-    def add_users(self, new_users):
+    @property
+    def users(self) -> set:
+        """set of usernames in the group, including staged changes"""
+        return (self._members | self._adds) - self._removes
+
+    @property
+    def has_changes(self) -> bool:
+        """whether commit() has anything to send"""
+        return bool(self._adds or self._removes)
+
+    def _ensure_users(self):
+        if not self._have_gotten_users:
+            self.get_users()
+
+    def add_users(self, new_users, commit=True):
         """
         add list of users to Group
 
         args: new_users is a single username string or list of username strings
+        commit: send the change now, pass False to stage it for commit()
         returns: Group (self)
         throws: HTTP errors from requests
         """
         # support group.add_users(username) usage
         if type(new_users) == str:
             new_users = [new_users]
-        if not self._have_gotten_users:
-            self.get_users()
-        # deduplicate by casting to a set then back to a list
-        all_users = list(set(self.users + new_users))
+        self._ensure_users()
+        new_users = set(new_users)
+        self._removes -= new_users
+        self._adds |= new_users - self._members
+        return self.commit() if commit else self
+
+    def remove_users(self, banlist, commit=True):
+        """remove list of users from Group
+
+        args: banlist is a single username string or list of username strings
+        commit: send the change now, pass False to stage it for commit()
+        returns: Group (self)
+        throws: HTTP errors from requests
+        """
+        # support group.remove_users(username) usage
+        if type(banlist) == str:
+            banlist = [banlist]
+        self._ensure_users()
+        banlist = set(banlist)
+        self._adds -= banlist
+        self._removes |= banlist & self._members
+        return self.commit() if commit else self
+
+    def set_users(self, users, commit=True):
+        """make the Group's membership exactly this set of usernames
+
+        args: users is an iterable of username strings
+        commit: send the change now, pass False to stage it for commit()
+        returns: Group (self)
+        throws: HTTP errors from requests
+        """
+        self._ensure_users()
+        users = set(users)
+        self._adds = users - self._members
+        self._removes = self._members - users
+        return self.commit() if commit else self
+
+    def commit(self):
+        """send staged changes to EQUELLA as a single PUT, or do nothing if
+        the staged changes cancel out
+
+        returns: Group (self)
+        throws: HTTP errors from requests
+        """
+        if not self.has_changes:
+            return self
+        users = self.users
         data = {
             "id": self.uuid,
             "name": self.name,
             "parentId": self.parentUuid,
-            "users": all_users,
+            "users": sorted(users),
         }
         s = request_wrapper()
         r = s.put(
@@ -101,14 +199,31 @@ class Group:
         )
         r.raise_for_status()
 
-        config.logger.info("added {} to {} group".format(", ".join(new_users), self))
-        self.users = all_users
+        if self._adds:
+            config.logger.info(
+                "added %s to %s group", ", ".join(sorted(self._adds)), self
+            )
+        if self._removes:
+            config.logger.info(
+                "removed %s from %s group", ", ".join(sorted(self._removes)), self
+            )
+        self._members = users
+        self._adds = set()
+        self._removes = set()
+        members_cache.set((self.uuid,), frozenset(users))
         s.close()
         return self
 
-    def get_users(self):
+    def get_users(self, refresh=False):
         """retrieve list of users in group from EQUELLA
-        this method populates the self.users list"""
+        this method populates the self.users set, members fetched in the
+        last few minutes (e.g. by prefetch_users) are reused unless refresh.
+        Staged changes are kept."""
+        cached = None if refresh else members_cache.get((self.uuid,))
+        if cached is not None:
+            self._members = set(cached)
+            self._have_gotten_users = True
+            return list(cached)
         s = request_wrapper()
         r = s.get(
             config.api_root + "/usermanagement/local/group/{}/user".format(self.uuid)
@@ -127,54 +242,18 @@ class Group:
         UUIDs (for internal users)
         """
         users = [p["id"] for p in r.json()["results"]]
-        self.users = users
+        self._members = set(users)
         self._have_gotten_users = True
-        config.logger.debug("Downloaded user list from API for group {}".format(self))
+        members_cache.set((self.uuid,), frozenset(users))
+        config.logger.debug("Downloaded user list from API for group %s", self)
         s.close()
         return users
 
-    def remove_users(self, banlist):
-        """remove list of users from Group
-
-        args: banlist is a single username string or list of username strings
-        returns: Group (self)
-        throws: HTTP errors from requests
-        """
-        # support group.remove_users(username) usage
-        if type(banlist) == str:
-            banlist = [banlist]
-        if not self._have_gotten_users:
-            self.get_users()
-        new_users = [u for u in self.users if u not in banlist]
-        # nothing to do, return
-        if len(new_users) == len(self.users):
-            return self
-
-        data = {
-            "id": self.uuid,
-            "name": self.name,
-            "parentId": self.parentUuid,
-            "users": new_users,
-        }
-        s = request_wrapper()
-        r = s.put(
-            config.api_root + "/usermanagement/local/group/{}".format(self.uuid),
-            json=data,
-        )
-        r.raise_for_status()
-
-        config.logger.info("removed {} from {} group".format(", ".join(banlist), self))
-        self.users = new_users
-        s.close()
-        return self
-
     def write_ldap_file(self, path=None):
         if not path:
             path = "data/{}.txt".format(self.ldap)
         with open(path, "w") as file:
             if not self._have_gotten_users:
                 self.get_users()
-            file.write("\n".join(self.users))
-            config.logger.info(
-                "Wrote LDAP text file {} for group {}".format(self.ldap, self)
-            )
+            file.write("\n".join(sorted(self.users)))
+            config.logger.info("Wrote LDAP text file %s for group %s", self.ldap, self)
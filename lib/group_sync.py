@@ -0,0 +1,117 @@
+"""
+Sync VAULT faculty groups with who is teaching according to Workday. We
+build the membership each group should have from a `teaching` dict of
+department code => set of usernames, routed to groups through `map` (several
+departments share a group, e.g. the Architecture Division). Then we fetch
+every affected group's current members concurrently, diff the two sets and
+send at most one PUT per group that actually changed, also concurrently.
+
+    changes = plan_sync(desired_membership(teaching, get_groups()))
+    print(format_report(changes))
+    apply_sync(changes)
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .get_groups import refresh_groups
+from .group import map, prefetch_users
+import config
+
+GroupChange = namedtuple("GroupChange", ["group", "desired", "adds", "removes"])
+
+
+def desired_membership(teaching, groups) -> dict:
+    """
+    A group we can't find, e.g. one created since groups.json was cached,
+    refreshes the group list (at most once per run, see refresh_groups).
+
+    args:
+        teaching (dict): department code => iterable of usernames
+        groups (list): list of _all_ VAULT Groups, new ones are added to it
+    returns:
+        desired (dict): Group => set of usernames it should contain
+    """
+    by_name = {g.name: g for g in groups}
+    desired = {}
+    for dept, usernames in teaching.items():
+        group_name = map.get(dept, {}).get("group")
+        if not group_name:
+            continue
+        group = by_name.get(group_name)
+        if not group and refresh_groups(groups):
+            by_name = {g.name: g for g in groups}
+            group = by_name.get(group_name)
+        if not group:
+            config.logger.error(
+                'Unable to find group "%s" for department %s.', group_name, dept
+            )
+            continue
+        desired.setdefault(group, set()).update(usernames)
+    return desired
+
+
+def plan_sync(desired, remove=False, workers=8) -> list[GroupChange]:
+    """
+    Fetch the current members of every group concurrently, work out who
+    needs to be added or removed & stage those changes on each Group.
+
+    args:
+        desired (dict): Group => set of usernames, see desired_membership
+        remove (bool): also remove members who aren't in the desired set,
+        by default only additions are planned since groups may have members
+        added by hand
+        workers (int): groups fetched at the same time
+    returns:
+        changes (list): a GroupChange for every group, sorted by name
+    """
+    groups = sorted(desired, key=lambda g: g.name)
+    # always fetch, we're about to overwrite membership with what we read
+    prefetch_users(groups, workers, refresh=True)
+
+    changes = []
+    for group in groups:
+        current = group.users
+        if remove:
+            group.set_users(desired[group], commit=False)
+        else:
+            group.add_users(desired[group], commit=False)
+        want = group.users
+        changes.append(GroupChange(group, want, want - current, current - want))
+    return changes
+
+
+def apply_sync(changes, workers=8) -> list[GroupChange]:
+    """
+    Commit the staged changes, one PUT per changed group, concurrently.
+    Unchanged groups cost nothing.
+
+    returns:
+        applied (list): the GroupChanges that were sent
+    """
+    changed = [c for c in changes if c.group.has_changes]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() so any HTTP error is raised here
+        list(executor.map(lambda c: c.group.commit(), changed))
+    config.logger.info(
+        "Synced %s faculty groups, %s were unchanged.",
+        len(changed),
+        len(changes) - len(changed),
+    )
+    return changed
+
+
+def format_report(changes) -> str:
+    """human-readable list of adds & removes per group"""
+    lines = []
+    for change in changes:
+        if not change.adds and not change.removes:
+            continue
+        lines.append(
+            "{} (+{} -{})".format(change.group, len(change.adds), len(change.removes))
+        )
+        lines.extend("  + " + u for u in sorted(change.adds))
+        lines.extend("  - " + u for u in sorted(change.removes))
+    if not lines:
+        return "No faculty group changes."
+    return "\n".join(lines)
@@ -0,0 +1,220 @@
+"""
+Deadlines & hedged requests for the sessions `request_wrapper` returns.
+
+Every request gets a (connect, read) timeout for its endpoint (see TIMEOUTS,
+`timeouts` in config.py overrides them) so a stuck connection raises a
+Timeout instead of hanging a cron run forever.
+
+GETs are also hedged: once an endpoint has enough recent requests to know
+its p95 latency, a GET that hasn't answered by then is sent a second time &
+whichever copy answers first is used. Only about one request in twenty is
+sent twice but the slowest requests, e.g. a connection stuck behind a slow
+one, no longer set the run's pace. The deadline starts when a request is
+sent & a GET is only hedged if a worker (and, within TermScheduler, a slot
+in the taxonomy's limit) is free, a hedge that would wait in a queue only
+adds load. Hedges sent & won are counted in the
+course_lists_http_hedges_total metric & app.py logs them at exit. Set
+`hedging = False` in config.py to turn it off.
+"""
+
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import threading
+import time
+
+from requests import Session
+
+import config
+from .metrics import HEDGES
+from .tracing import endpoint_template, percentile
+
+# endpoint template (with or without its query parameters) => (connect, read)
+# seconds, whole listings & searches can legitimately take a while
+DEFAULT_TIMEOUT = (5, 60)
+TIMEOUTS = {
+    "GET /taxonomy": (5, 120),
+    "GET /usermanagement/local/group": (5, 120),
+    "GET /taxonomy/{uuid}/term": (5, 120),
+    "GET /taxonomy/{uuid}/search": (5, 30),
+    "GET /usermanagement/local/group/{uuid}/user": (5, 30),
+    "POST /taxonomy/{uuid}/term": (5, 30),
+    "PUT /taxonomy/{uuid}/term/{uuid}/data/{key}/{value}": (5, 30),
+    "DELETE /taxonomy/{uuid}/term/{uuid}": (5, 60),
+}
+# latencies kept per endpoint & how many we need before hedging on their p95
+WINDOW = 200
+MIN_SAMPLES = 20
+# never hedge sooner than this, a fast endpoint's p95 is mostly noise
+MIN_DELAY = 0.05
+
+
+def timeout_for(endpoint) -> tuple:
+    """(connect, read) timeout for an endpoint template"""
+    timeouts = dict(TIMEOUTS, **getattr(config, "timeouts", {}))
+    timeout = timeouts.get(endpoint) or timeouts.get(endpoint.split("?")[0])
+    return timeout or DEFAULT_TIMEOUT
+
+
+class LatencyWindow:
+    """the most recent latencies of each endpoint"""
+
+    def __init__(self, size=WINDOW):
+        self.size = size
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, seconds) -> None:
+        with self._lock:
+            window = self.latencies.get(endpoint)
+            if window is None:
+                window = self.latencies[endpoint] = deque(maxlen=self.size)
+            window.append(seconds)
+
+    def p95(self, endpoint):
+        """p95 latency in seconds or None if we haven't seen enough requests"""
+        with self._lock:
+            window = list(self.latencies.get(endpoint, ()))
+        if len(window) < MIN_SAMPLES:
+            return None
+        return percentile(window, 95)
+
+
+latencies = LatencyWindow()
+# hedged attempts run here so the caller can wait on whichever finishes first,
+# an attempt needs one of _slots so none ever waits in the pool's queue while
+# its deadline runs down
+WORKERS = 16
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="hedge")
+_slots = threading.BoundedSemaphore(WORKERS)
+# a semaphore a hedge must also acquire, TermScheduler sets its per-taxonomy
+# limit here so hedges don't send more requests to a taxonomy than it allows
+request_limit = contextvars.ContextVar("request_limit", default=None)
+_hedges = Counter()
+_hedges_lock = threading.Lock()
+
+
+def count_hedge(endpoint, result) -> None:
+    HEDGES.inc(endpoint=endpoint, result=result)
+    with _hedges_lock:
+        _hedges[(endpoint, result)] += 1
+
+
+def format_hedges() -> str:
+    with _hedges_lock:
+        endpoints = sorted({endpoint for endpoint, _ in _hedges})
+        lines = ["{:>6} {:>6}  {}".format("sent", "won", "endpoint")]
+        for endpoint in endpoints:
+            lines.append(
+                "{:>6} {:>6}  {}".format(
+                    _hedges[(endpoint, "sent")], _hedges[(endpoint, "won")], endpoint
+                )
+            )
+    return "\n".join(lines)
+
+
+def report_hedges() -> None:
+    """log the hedges sent & won, app.py runs this at exit"""
+    if _hedges:
+        config.logger.info("Hedged GET requests:\n%s", format_hedges())
+
+
+class HedgedSession(Session):
+    def request(self, method, url, **kwargs):
+        endpoint = endpoint_template(method, url)
+        kwargs.setdefault("timeout", timeout_for(endpoint))
+        delay = latencies.p95(endpoint)
+        if (
+            method.upper() != "GET"
+            or delay is None
+            or not getattr(config, "hedging", True)
+            # every worker is busy, don't queue, send it from this thread
+            or not _slots.acquire(blocking=False)
+        ):
+            return self.attempt(endpoint, method, url, **kwargs)
+
+        first, started = self.submit(endpoint, method, url, **kwargs)
+        # the deadline runs from when the request is sent, not submitted
+        started.wait()
+        done, _ = wait([first], timeout=max(delay, MIN_DELAY))
+        if done:
+            return first.result()
+        second = self.hedge(first, endpoint, method, url, **kwargs)
+        if second is None:
+            return first.result()
+        count_hedge(endpoint, "sent")
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        count_hedge(endpoint, "won")
+                    # let the slower copy finish in the background
+                    for other in pending:
+                        other.add_done_callback(close_response)
+                    return future.result()
+        # both attempts failed, raise the first one's error
+        return first.result()
+
+    def submit(self, endpoint, method, url, **kwargs):
+        """
+        Run an attempt in the pool, the caller has acquired one of _slots for
+        it. returns: (Future, Event set once the attempt has started)
+        """
+        started = threading.Event()
+
+        def run():
+            started.set()
+            try:
+                return self.attempt(endpoint, method, url, **kwargs)
+            finally:
+                _slots.release()
+
+        # each attempt runs in a copy of our context so tracing spans nest
+        return _executor.submit(contextvars.copy_context().run, run), started
+
+    def hedge(self, first, endpoint, method, url, **kwargs):
+        """
+        Send the second copy of a request if there's a free worker & a slot
+        in request_limit, the slot is held until both copies are done.
+
+        returns: Future or None if the hedge would only wait in a queue
+        """
+        limit = request_limit.get()
+        if not _slots.acquire(blocking=False):
+            return None
+        if limit is not None and not limit.acquire(blocking=False):
+            _slots.release()
+            return None
+        second, _ = self.submit(endpoint, method, url, **kwargs)
+        if limit is not None:
+            release_when_done([first, second], limit)
+        return second
+
+    def attempt(self, endpoint, method, url, **kwargs):
+        start = time.perf_counter()
+        response = super().request(method, url, **kwargs)
+        latencies.observe(endpoint, time.perf_counter() - start)
+        return response
+
+
+def release_when_done(futures, semaphore) -> None:
+    """release a semaphore once every one of the futures has finished"""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def finished(future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            semaphore.release()
+
+    for future in futures:
+        future.add_done_callback(finished)
+
+
+def close_response(future) -> None:
+    if future.exception() is None:
+        future.result().close()
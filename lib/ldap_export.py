@@ -0,0 +1,93 @@
+"""
+Write the LDAP group text files for the Help Desk. Several departments share
+one LDAP group (e.g. fac_ar, fac_de, fac_di, fac_ixd, fac_vi) so we first
+aggregate instructors per LDAP group, then write each data/{ldap}.txt once:
+sorted, deduplicated, newline-terminated & atomically replaced. Each run
+also compares the new files to the previous run's and appends just the
+differences to data/ldap-changes.txt, so rerunning with the same data
+writes identical files & adds nothing. The change list accumulates until
+whoever applies it to LDAP deletes the file.
+
+Only LDAP groups with instructors in this run are written & compared, a
+group missing from the course data is left untouched rather than emptied.
+"""
+
+from collections import namedtuple
+import os
+
+from .group import map
+from .utilities import atomic_write
+import config
+
+LdapChange = namedtuple("LdapChange", ["ldap", "adds", "removes"])
+
+
+def ldap_membership(teaching) -> dict:
+    """
+    args:
+        teaching (dict): department code => iterable of usernames
+    returns:
+        membership (dict): ldap group name => set of usernames
+    """
+    membership = {}
+    for dept, usernames in teaching.items():
+        ldap = map.get(dept, {}).get("ldap")
+        if ldap:
+            membership.setdefault(ldap, set()).update(u for u in usernames if u)
+    return membership
+
+
+def read_ldap_file(path) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r") as fh:
+        return set(line.strip() for line in fh if line.strip())
+
+
+def format_changes(changes) -> str:
+    lines = []
+    for change in changes:
+        lines.append(
+            "{} (+{} -{})".format(change.ldap, len(change.adds), len(change.removes))
+        )
+        lines.extend("+" + u for u in sorted(change.adds))
+        lines.extend("-" + u for u in sorted(change.removes))
+    return "\n".join(lines) + "\n" if lines else "No changes.\n"
+
+
+def export_ldap(membership, directory="data", dry_run=False) -> list[LdapChange]:
+    """
+    Write one file per LDAP group & add the changes since the last run to
+    the change list.
+
+    args:
+        membership (dict): ldap group name => set of usernames
+        directory (str): where to write {ldap}.txt & ldap-changes.txt
+        dry_run (bool): only compare, write nothing
+    returns:
+        changes (list): LdapChange for each group whose members changed
+    """
+    changes = []
+    for ldap, users in sorted(membership.items()):
+        path = os.path.join(directory, "{}.txt".format(ldap))
+        previous = read_ldap_file(path)
+        if not dry_run and (previous != users or not os.path.exists(path)):
+            atomic_write(path, "".join(u + "\n" for u in sorted(users)))
+        if previous != users:
+            changes.append(LdapChange(ldap, users - previous, previous - users))
+    if dry_run:
+        return changes
+    if changes:
+        # keep changes from earlier runs that haven't been applied yet
+        path = os.path.join(directory, "ldap-changes.txt")
+        unapplied = ""
+        if os.path.exists(path):
+            with open(path, "r") as fh:
+                unapplied = fh.read()
+        atomic_write(path, unapplied + format_changes(changes))
+    config.logger.info(
+        "Wrote %s LDAP group files, %s changed since the last run.",
+        len(membership),
+        len(changes),
+    )
+    return changes
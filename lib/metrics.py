@@ -0,0 +1,267 @@
+"""
+Prometheus metrics for scheduled runs, written in the node_exporter textfile
+collector format so we can graph & alert on how long runs take. Scripts pass
+`--metrics PATH` (see `add_metrics_argument`) pointing into the textfile
+collector directory and a `TextfileWriter` rewrites that file periodically
+during the run and once more at the end.
+
+The metric families below are module-level so lib code can update them
+without passing a registry around, e.g. `TERMS.inc(taxonomy=name,
+result="created")`. HTTP request counts & latency are recorded by the
+`observe_response` hook that `request_wrapper` installs on its sessions.
+"""
+
+import os
+import threading
+import time
+
+from .tracing import endpoint_template
+from .utilities import atomic_write
+
+
+def add_metrics_argument(parser):
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="write Prometheus metrics to this node_exporter textfile (e.g. /var/lib/node_exporter/course_lists.prom) during & at the end of the run",
+    )
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append('{}="{}"'.format(key, value))
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if type(value) == float else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                "{} takes labels {}, got {}".format(
+                    self.name, self.labelnames, tuple(labels)
+                )
+            )
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def clear(self):
+        with self._lock:
+            self.values = {}
+
+    def samples(self, const_labels=()):
+        """yield (name, labels, value) tuples for the exposition format"""
+        for key, value in sorted(self.values.items()):
+            yield self.name, tuple(const_labels) + key, value
+
+    def expose(self, const_labels=()) -> str:
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} {}".format(self.name, self.type),
+        ]
+        with self._lock:
+            samples = list(self.samples(const_labels))
+        for name, labels, value in samples:
+            lines.append(
+                "{}{} {}".format(name, format_labels(labels), format_value(value))
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # per label set: [count per bucket..., sum]
+            entry = self.values.setdefault(key, [0] * len(self.buckets) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-1] += value
+
+    def get(self, **labels):
+        """number of observations for a label set"""
+        entry = self.values.get(self._key(labels))
+        return entry[-2] if entry else 0
+
+    def samples(self, const_labels=()):
+        for key, entry in sorted(self.values.items()):
+            labels = tuple(const_labels) + key
+            for bound, count in zip(self.buckets, entry):
+                le = (("le", format_value(bound)),)
+                yield self.name + "_bucket", labels + le, count
+            yield self.name + "_sum", labels, entry[-1]
+            yield self.name + "_count", labels, entry[-2]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # labels added to every sample e.g. the name of the script
+        self.const_labels = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=()) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def expose(self) -> str:
+        const_labels = tuple(sorted(self.const_labels.items()))
+        return "\n".join(m.expose(const_labels) for m in self.metrics) + "\n"
+
+    def write_textfile(self, path):
+        # node_exporter may read the file at any moment so never leave it
+        # half-written
+        atomic_write(path, self.expose())
+
+
+registry = Registry()
+COURSES = registry.gauge(
+    "course_lists_courses",
+    "Courses in the Workday JSON by state (parsed, on_portal)",
+    ["state"],
+)
+TERMS = registry.counter(
+    "course_lists_terms_total",
+    "Taxonomy term operations by result (created, skipped, deduplicated, deleted)",
+    ["taxonomy", "result"],
+)
+BLOOM = registry.counter(
+    "course_lists_bloom_checks_total",
+    "Flat taxonomy Bloom filter checks by result (new, present, false_positive)",
+    ["taxonomy", "result"],
+)
+ROWS = registry.gauge(
+    "course_lists_informer_rows",
+    "Informer CSV rows by result (written, skipped)",
+    ["result"],
+)
+HTTP_REQUESTS = registry.counter(
+    "course_lists_http_requests_total",
+    "HTTP requests to VAULT by endpoint template and status code",
+    ["endpoint", "status"],
+)
+HTTP_LATENCY = registry.histogram(
+    "course_lists_http_request_duration_seconds",
+    "HTTP request latency by endpoint template",
+    ["endpoint"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HEDGES = registry.counter(
+    "course_lists_http_hedges_total",
+    "Hedged GET requests by endpoint template & result (sent, won = the hedge answered first)",
+    ["endpoint", "result"],
+)
+RUN_SECONDS = registry.gauge(
+    "course_lists_run_duration_seconds",
+    "Wall time of the run so far (final once the run has finished)",
+)
+LAST_UPDATE = registry.gauge(
+    "course_lists_last_update_timestamp_seconds",
+    "Unix time this file was last written",
+)
+FINISHED = registry.gauge(
+    "course_lists_run_finished",
+    "1 once the run has finished, 0 while it is in progress",
+)
+
+
+def observe_response(response, *args, **kwargs):
+    """requests response hook, counts the request & its latency"""
+    request = response.request
+    endpoint = endpoint_template(request.method, request.url)
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    HTTP_LATENCY.observe(response.elapsed.total_seconds(), endpoint=endpoint)
+
+
+class TextfileWriter:
+    """
+    Write the registry to a textfile every `interval` seconds in a
+    background thread and once more when stopped.
+    """
+
+    def __init__(self, path, script, interval=30, registry=registry):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.registry.const_labels["script"] = script
+        self.start_time = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.start_time = time.time()
+        FINISHED.set(0)
+        self.write()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        FINISHED.set(1)
+        self.write()
+
+    def write(self):
+        RUN_SECONDS.set(round(time.time() - self.start_time, 3))
+        LAST_UPDATE.set(round(time.time(), 3))
+        self.registry.write_textfile(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
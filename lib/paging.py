@@ -0,0 +1,105 @@
+"""
+Page through openEQUELLA listing endpoints like /taxonomy and
+/usermanagement/local/group. They take `start` & `length` parameters and
+return {"start": 0, "length": 100, "available": 321, "results": [...]}. We
+fetch the first page, which tells us how many results are available, then
+fetch the remaining pages concurrently and yield results in order as the
+pages arrive.
+
+`CacheFileWriter` writes a listing to its JSON cache file item by item as it
+streams in, in the same shape `read_cache` reads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from .utilities import request_wrapper
+import config
+
+
+def get_page(url, params, start, length) -> dict:
+    s = request_wrapper()
+    query = urlencode(dict(params, start=start, length=length))
+    r = s.get("{}?{}".format(url, query))
+    r.raise_for_status()
+    s.close()
+    return r.json()
+
+
+def iter_results(url, params={}, page_size=200, workers=4):
+    """
+    Yield every result of a paged listing endpoint.
+
+    args:
+        url (str): full endpoint URL without a query string
+        params (dict): additional query parameters e.g. {"allParents": "true"}
+        page_size (int): results per request
+        workers (int): pages fetched at the same time once we know how many
+        pages there are
+    yields:
+        result dicts, in the order the API lists them
+    """
+    first = get_page(url, params, 0, page_size)
+    yield from first["results"]
+    available = first.get("available")
+    # endpoints that ignore paging return everything in one response
+    if available is None or "start" not in first:
+        return
+    if len(first["results"]) >= available:
+        return
+    # the server may cap the page length below what we asked for
+    length = len(first["results"]) or page_size
+    starts = range(length, available, length)
+    config.logger.debug(
+        "Fetching %s more pages of %s from %s", len(starts), length, url
+    )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = [executor.submit(get_page, url, params, s, length) for s in starts]
+        for page in pages:
+            yield from page.result()["results"]
+
+
+class CacheFileWriter:
+    """
+    Write {"results": [...], "fetched": TIMESTAMP} to a file one result at a
+    time. The file only replaces the existing one once every result has been
+    written, if anything goes wrong the old cache file is left alone.
+
+        with CacheFileWriter(path) as writer:
+            for result in iter_results(url):
+                writer.write(result)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path) or "."
+        fd, self.tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        self.fh = os.fdopen(fd, "w")
+        self.fh.write('{"results": [')
+        return self
+
+    def write(self, result):
+        if self.count:
+            self.fh.write(", ")
+        self.fh.write(json.dumps(result))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.fh.close()
+            os.remove(self.tmp)
+            return False
+        self.fh.write(
+            '], "available": {}, "fetched": {}}}'.format(self.count, time.time())
+        )
+        self.fh.close()
+        os.chmod(self.tmp, 0o644)
+        os.replace(self.tmp, self.path)
+        return False
@@ -0,0 +1,198 @@
+"""
+Run an entry point under cProfile plus tracemalloc so performance work
+doesn't start with a hand-rolled wrapper. Every script accepts `--profile`
+(see `add_profile_argument`) and, when it is passed, writes to the data dir:
+
+- NAME-TIMESTAMP.prof: cProfile stats, load with `python -m pstats FILE` or
+  a viewer like snakeviz
+- NAME-TIMESTAMP.collapsed: sampled stacks in the "folded" format used by
+  flamegraph.pl, speedscope & inferno
+- NAME-TIMESTAMP-memory.txt: the functions, then the lines, that allocated
+  the most memory
+
+and prints the top functions by cumulative time and by allocated bytes.
+"""
+
+import ast
+import collections
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+def add_profile_argument(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="profile CPU time & memory, write stats and a flamegraph-ready collapsed stack file to the data dir",
+    )
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return "{} ({}:{})".format(
+        code.co_name, os.path.basename(code.co_filename), code.co_firstlineno
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _functions(filename) -> tuple:
+    """(first line, last line, name) of each function defined in a source file"""
+    try:
+        with open(filename) as fh:
+            tree = ast.parse(fh.read())
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        return ()
+    return tuple(
+        (node.lineno, node.end_lineno, node.name)
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    )
+
+
+def function_at(filename, lineno) -> str:
+    """
+    tracemalloc frames only have a file & line, find the innermost function
+    around the line & name it like frame_name does
+    """
+    first, name = 1, "<module>"
+    for start, end, function in _functions(filename):
+        if start <= lineno <= end and start >= first:
+            first, name = start, function
+    return "{} ({}:{})".format(name, os.path.basename(filename), first)
+
+
+def allocations_by_function(snapshot) -> list[tuple]:
+    """
+    args:
+        snapshot (tracemalloc.Snapshot)
+    returns:
+        list of (function, bytes, blocks) sorted by bytes, an allocation
+        counts towards the function that made it
+    """
+    totals = collections.defaultdict(lambda: [0, 0])
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        total = totals[function_at(frame.filename, frame.lineno)]
+        total[0] += stat.size
+        total[1] += stat.count
+    return sorted(
+        ((name, size, count) for name, (size, count) in totals.items()),
+        key=lambda t: t[1],
+        reverse=True,
+    )
+
+
+def format_allocation(name, size, count) -> str:
+    return "{:>10.1f} KiB {:>8} blocks  {}".format(size / 1024, count, name)
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval, counting identical
+    stacks. cProfile only knows caller => callee pairs, we need whole stacks
+    for a flamegraph.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def write(self, path):
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write("{} {}\n".format(stack, count))
+
+
+class Profiler:
+    def __init__(self, name, directory="data", top=25):
+        self.name = name
+        self.top = top
+        stamp = time.strftime("%Y-%m-%d_%H%M%S")
+        self.stem = os.path.join(directory, "{}-{}".format(name, stamp))
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident())
+        self._running = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        # keep deeper tracebacks than the default so allocations can be
+        # attributed to our code rather than json or requests internals
+        tracemalloc.start(10)
+        self.sampler.start()
+        self.profile.enable()
+        self._running = True
+        return self
+
+    def stop(self):
+        """stop profiling, write the stats files & print a report"""
+        if not self._running:
+            return
+        self._running = False
+        self.profile.disable()
+        self.sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ]
+        )
+
+        self.profile.dump_stats(self.stem + ".prof")
+        self.sampler.write(self.stem + ".collapsed")
+        allocations = snapshot.statistics("lineno")
+        functions = allocations_by_function(snapshot)
+        with open(self.stem + "-memory.txt", "w") as fh:
+            fh.write("peak traced memory: {:.1f} KiB\n".format(peak / 1024))
+            fh.write("\nby function:\n")
+            for function in functions:
+                fh.write(format_allocation(*function) + "\n")
+            fh.write("\nby line:\n")
+            for stat in allocations:
+                fh.write(str(stat) + "\n")
+
+        print("\nTop {} functions by cumulative time:".format(self.top))
+        stats = pstats.Stats(self.profile, stream=sys.stdout)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.top)
+        print(
+            "Top {} functions by allocated bytes (current {:.1f} KiB, peak {:.1f} KiB):".format(
+                self.top, current / 1024, peak / 1024
+            )
+        )
+        for function in functions[: self.top]:
+            print(format_allocation(*function))
+        print("\nWrote {0}.prof, {0}.collapsed and {0}-memory.txt".format(self.stem))
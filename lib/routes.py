@@ -0,0 +1,179 @@
+"""
+Map department codes straight to their taxonomies. Every department has the
+same five taxonomies named like "ANIMA - COURSE LIST", "ANIMA - course
+sections", etc. Rather than search the taxonomy list by (lowercased) name
+for each of them for every course, we parse all the taxonomy names once
+after they load into a table of department => Route.
+
+    routes = TaxonomyRoutes(taxos)
+    routes.route("ANIMA").course_list  # Taxonomy "ANIMA - COURSE LIST"
+
+Missing taxonomies are logged once rather than once per course, and looking
+up a department we have no taxonomies for refreshes the taxonomy list (at
+most once per run, see refresh_taxos).
+"""
+
+from .get_taxos import refresh_taxos
+from .taxonomy import bloom_directory
+from config import logger
+
+# Route attribute => taxonomy name suffix
+KINDS = {
+    "course_list": "COURSE LIST",
+    "sections": "course sections",
+    "names": "course names",
+    "titles": "course titles",
+    "faculty": "faculty",
+}
+_suffixes = {suffix.lower(): kind for kind, suffix in KINDS.items()}
+# taxonomies without a hierarchy, they only ever get root terms
+FLAT_KINDS = ("sections", "names", "titles", "faculty")
+
+
+class Route:
+    __slots__ = ["dept"] + list(KINDS)
+
+    def __init__(self, dept):
+        self.dept = dept
+        for kind in KINDS:
+            setattr(self, kind, None)
+
+    def __repr__(self):
+        return "Route({})".format(self.dept)
+
+    def missing(self, only_course_lists=False) -> list[str]:
+        """names of the taxonomies this department should have but doesn't"""
+        kinds = ["course_list"] if only_course_lists else KINDS
+        return [
+            "{} - {}".format(self.dept, KINDS[k])
+            for k in kinds
+            if getattr(self, k) is None
+        ]
+
+
+class TaxonomyRoutes:
+    def __init__(self, taxos):
+        """
+        args:
+            taxos (list): list of _all_ VAULT taxonomies, refreshes add new
+            taxonomies to this list in place
+        """
+        self.taxos = taxos
+        self._reported = set()
+        self.bloom_directory = None
+        self.build()
+
+    def build(self):
+        """(re)build the name and department indexes from self.taxos"""
+        self.size = len(self.taxos)
+        self.by_name = {}
+        self.routes = {}
+        for taxo in self.taxos:
+            self.by_name[taxo.name.lower()] = taxo
+            dept, sep, suffix = taxo.name.partition(" - ")
+            kind = _suffixes.get(suffix.lower())
+            if sep and kind:
+                # names are matched case insensitively, like by_name
+                dept = dept.upper()
+                route = self.routes.setdefault(dept, Route(dept))
+                setattr(route, kind, taxo)
+                if self.bloom_directory and kind in FLAT_KINDS:
+                    taxo.use_bloom(self.bloom_directory)
+
+    def use_bloom(self, directory=bloom_directory):
+        """keep a Bloom filter for every flat taxonomy, see Taxonomy.use_bloom"""
+        self.bloom_directory = directory
+        self.build()
+
+    def save_blooms(self) -> int:
+        """
+        Write every Bloom filter that changed, once at the end of a run
+        rather than after every term. returns: number of filters written
+        """
+        return len([t for t in self.taxos if t.bloom_path and t.saveBloom()])
+
+    def refresh(self) -> bool:
+        """refresh the taxonomy list (once per run), True if anything new"""
+        if refresh_taxos(self.taxos):
+            self.build()
+            return True
+        return False
+
+    def taxonomy(self, name):
+        """
+        args:
+            name (str): full taxonomy name, case insensitive
+        returns:
+            Taxonomy or None if it does not exist even after a refresh
+        """
+        taxo = self.by_name.get(name.lower())
+        if not taxo and self.refresh():
+            taxo = self.by_name.get(name.lower())
+        return taxo
+
+    def route(self, dept) -> Route:
+        """
+        args:
+            dept (str): department code from get_depts e.g. "ANIMA", case
+            insensitive
+        returns:
+            Route with a Taxonomy (or None) for each of KINDS
+        """
+        dept = dept.upper()
+        route = self.routes.get(dept)
+        if route is None:
+            self.refresh()
+            # remember the empty route so we only refresh & log once
+            route = self.routes.setdefault(dept, Route(dept))
+        return route
+
+    def check(self, depts, only_course_lists=False) -> list[str]:
+        """
+        Report every taxonomy the given departments need that doesn't exist,
+        once, refreshing the taxonomy list first if anything is missing.
+        Intended to be run at startup before adding any terms.
+
+        args:
+            depts (iterable): department codes from get_depts
+            only_course_lists (bool): only check COURSE LIST taxonomies
+        returns:
+            missing (list): names of missing taxonomies
+        """
+        depts = sorted(set(depts))
+        if any(self.route(d).missing(only_course_lists) for d in depts):
+            self.refresh()
+        missing = []
+        for dept in depts:
+            missing.extend(self.route(dept).missing(only_course_lists))
+        self.report(missing)
+        return missing
+
+    def report(self, names):
+        """log missing taxonomy names we haven't already logged"""
+        new = [name for name in names if name not in self._reported]
+        if new:
+            logger.error(
+                "Unable to find these taxonomies, terms for them will be skipped: %s",
+                ", ".join(new),
+            )
+            self._reported.update(new)
+
+
+# most recent routing table built for a plain list of taxonomies
+_last_routes = None
+
+
+def routes_for(taxos) -> TaxonomyRoutes:
+    """
+    Return a routing table for taxos, which may already be one. Plain lists
+    reuse the table built for the same list last time.
+    """
+    global _last_routes
+    if isinstance(taxos, TaxonomyRoutes):
+        return taxos
+    if _last_routes is None or _last_routes.taxos is not taxos:
+        _last_routes = TaxonomyRoutes(taxos)
+    elif _last_routes.size != len(taxos):
+        # the list changed since we built the table
+        _last_routes.build()
+    return _last_routes
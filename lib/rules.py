@@ -0,0 +1,76 @@
+"""
+Which departments a course is filed under, in one place for both app.py
+(VAULT taxonomies, via get_depts) and make_informer_csv.py (the Informer CSV
+"department" column). Exceptions are written as a list of declarative RULES
+which are compiled into a dict keyed on (owner, subject), so routing a course
+is a dictionary lookup no matter how many sections we process.
+
+    route_course(course)  # CourseRoute(depts=frozenset({"SYLLABUS", "ANIMA"}), informer="ANIMA")
+
+A CourseRoute with no `depts` means app.py skips the course & an `informer`
+of None means the CSV skips it.
+"""
+
+from collections import namedtuple
+
+# the three architecture programs share one set of division-level taxonomies
+ARCH_DIV = ("ARCHT", "BARCH", "INTER", "MARCH")
+# matches any subject
+ANY = None
+# stands in for the course's own owner in a rule's informer department
+OWNER = "<owner>"
+
+Rule = namedtuple("Rule", ["owners", "subject", "depts", "informer", "note"])
+CourseRoute = namedtuple("CourseRoute", ["depts", "informer"])
+
+# Rules with a subject take precedence over ones that match ANY subject.
+# Owners that match no rule go under SYLLABUS & their own code in both.
+RULES = (
+    Rule(ARCH_DIV, ANY, ("SYLLABUS", "ARCH DIV"), OWNER, "architecture division"),
+    Rule(("TESTS",), ANY, ("TESTS",), OWNER, "don't add tests to syllabus collection"),
+    Rule(("CCA",), ANY, (), None, "international exchange & other exceptions"),
+    Rule(("FA",), "CRITI", ("SYLLABUS", "UDIST"), "CRITI", "file Critique under UDIST"),
+    Rule(("FA",), "FNART", (), None, "Fine Arts internships"),
+    Rule(("FA",), ANY, ("SYLLABUS",), None, "other Fine Arts courses"),
+    Rule(("PRECO",), ANY, ("SYLLABUS", "PRECO"), None, "precollege isn't in Informer"),
+    Rule((None,), ANY, (), None, "no owning academic unit"),
+)
+
+
+def compile_rules(rules) -> dict:
+    """
+    args:
+        rules (iterable): Rule tuples
+    returns:
+        table (dict): (owner, subject|ANY) => CourseRoute
+    """
+    table = {}
+    for rule in rules:
+        for owner in rule.owners:
+            informer = owner if rule.informer == OWNER else rule.informer
+            table[(owner, rule.subject)] = CourseRoute(frozenset(rule.depts), informer)
+    return table
+
+
+_table = compile_rules(RULES)
+
+
+def lookup_route(owner, subject) -> CourseRoute:
+    """
+    Look up where courses with this owner & subject go. Results for pairs
+    not named in a rule are memoized so every lookup after the first is a
+    single dict access.
+    """
+    try:
+        return _table[(owner, subject)]
+    except KeyError:
+        pass
+    result = _table.get((owner, ANY))
+    if result is None:
+        result = CourseRoute(frozenset(("SYLLABUS", owner)), owner)
+    _table[(owner, subject)] = result
+    return result
+
+
+def route_course(course) -> CourseRoute:
+    return lookup_route(course.owner, course.subject)
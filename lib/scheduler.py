@@ -0,0 +1,179 @@
+"""
+Create the taxonomy terms for many courses at once. Every term is a node in
+a graph shared by all the courses: a course list term depends on its parent
+(we need the parent's UUID to POST it) while flat taxonomy terms depend on
+nothing. Identical paths are only created once. A node is started as soon
+as its parent's UUID is known, so independent branches are created at the
+same time & a semester takes about as long as its tree is deep, not as long
+as it has terms. No taxonomy has more than `per_taxonomy` requests running,
+hedged GETs (see lib/hedging.py) take a slot of that limit too.
+
+    scheduler = TermScheduler(workers=8)
+    for course in courses:
+        scheduler.add_course(course, routes)
+    scheduler.run()
+
+The first error stops new terms from starting & is raised once the running
+ones finish, like an error adding terms one course at a time.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import threading
+
+from .add_to_taxos import course_terms, get_depts, has_dept_layer
+from .hedging import request_limit
+from .routes import KINDS, routes_for
+from .taxonomy import PER_TAXONOMY, Term
+from .tracing import tracer
+from config import logger
+
+
+class TermNode:
+    __slots__ = ("taxo", "term", "children")
+
+    def __init__(self, taxo, term):
+        self.taxo = taxo
+        self.term = term
+        self.children = []
+
+    def __repr__(self):
+        return "TermNode({}: {})".format(self.taxo, self.term)
+
+
+class TermScheduler:
+    def __init__(self, workers=8, per_taxonomy=PER_TAXONOMY):
+        """
+        args:
+            workers (int): terms created at the same time overall
+            per_taxonomy (int): terms created at the same time in one taxonomy
+        """
+        self.workers = workers
+        self.per_taxonomy = per_taxonomy
+        # (taxonomy uuid, full path) => TermNode
+        self.nodes = {}
+        self.roots = []
+        self.created = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add_term(self, term, taxo, parent=None) -> TermNode:
+        """
+        add a Term to the graph, if its path is already there the existing
+        node is returned
+
+        args:
+            term (Term): with its parent pointer set if it has one
+            taxo (Taxonomy)
+            parent (TermNode): node of the term's parent
+        returns:
+            TermNode
+        """
+        key = (taxo.uuid, term.fullTerm)
+        node = self.nodes.get(key)
+        if node is None:
+            # the children list is only used by course_list_term
+            term.children = []
+            if parent is not None:
+                # share the parent node's Term rather than our own copy
+                term.parent = parent.term
+            node = self.nodes[key] = TermNode(taxo, term)
+            if parent is None:
+                self.roots.append(node)
+            else:
+                parent.children.append(node)
+        return node
+
+    def add_course(self, course, taxos, only_course_lists=False, depts=None) -> None:
+        """
+        add all the terms for a course to the graph, see add_to_taxos for
+        the args
+        """
+        routes = routes_for(taxos)
+        # sorted so runs are repeatable
+        for dept in sorted(get_depts(course) if depts is None else depts):
+            route = routes.route(dept)
+            taxo = route.course_list
+            if taxo:
+                parent = None
+                for term in course_terms(course, has_dept_layer(taxo)):
+                    parent = self.add_term(term, taxo, parent)
+            else:
+                routes.report(["{} - {}".format(dept, KINDS["course_list"])])
+            if only_course_lists:
+                continue
+            for term, kind in (
+                (course.section_code, "sections"),
+                (course.course_refid, "names"),
+                (course.section_title, "titles"),
+                (course.instructor_names, "faculty"),
+            ):
+                taxo = getattr(route, kind)
+                if not taxo:
+                    routes.report(["{} - {}".format(dept, KINDS[kind])])
+                elif term and not term.isspace():
+                    self.add_term(Term({"term": term}), taxo)
+
+    def create(self, node, limit=None) -> None:
+        # hedges of this term's requests count against its taxonomy's limit
+        request_limit.set(limit)
+        with tracer.span("add_to_taxos", step=node.taxo.name):
+            node.term.uuid = node.taxo.add(node.term)
+
+    def run(self) -> int:
+        """
+        Create every term in the graph.
+
+        returns:
+            created (int): number of terms added (or found to already exist)
+        """
+        logger.info(
+            "Creating %s taxonomy terms, %s at a time & %s per taxonomy",
+            len(self.nodes),
+            self.workers,
+            self.per_taxonomy,
+        )
+        # taxonomy uuid => nodes whose parents exist
+        ready = {}
+        for node in self.roots:
+            ready.setdefault(node.taxo.uuid, deque()).append(node)
+        # taxonomy uuid => requests it has room for, tasks & hedges take one
+        limits = {}
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while running or (error is None and any(ready.values())):
+                if error is None:
+                    for uuid, queue in ready.items():
+                        limit = limits.get(uuid)
+                        if limit is None:
+                            limit = limits[uuid] = threading.BoundedSemaphore(
+                                self.per_taxonomy
+                            )
+                        # only wait when nothing is running, i.e. a hedge that
+                        # outlived its term still holds the slot
+                        while queue and limit.acquire(blocking=not running):
+                            node = queue.popleft()
+                            # each task gets a copy of our context so its
+                            # spans are children of the caller's span
+                            context = contextvars.copy_context()
+                            future = executor.submit(
+                                context.run, self.create, node, limit
+                            )
+                            running[future] = node
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    limits[node.taxo.uuid].release()
+                    if future.exception():
+                        error = error or future.exception()
+                        continue
+                    self.created += 1
+                    for child in node.children:
+                        child.term.parentUuid = node.term.uuid
+                        ready.setdefault(child.taxo.uuid, deque()).append(child)
+        if error:
+            raise error
+        return self.created
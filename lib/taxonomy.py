@@ -1,17 +1,57 @@
+import itertools
+import os
+import sys
+import threading
 from urllib.parse import urlencode, quote
 
-from config import api_root, logger
+import config
+from config import logger
+from .bloom import BloomFilter
+from .cache import TTLCache
+from .metrics import BLOOM, TERMS
+from .term_tree import TermTree
+from .tracing import tracer
 from .utilities import request_wrapper
 
 
+# Taxonomy.search results keyed on (taxonomy uuid, query, options)
+search_cache = TTLCache(maxsize=2048, ttl=600)
+# where flat taxonomies keep their Bloom filters, see Taxonomy.use_bloom
+bloom_directory = os.path.join("data", "bloom")
+# most requests sent to one taxonomy at a time when adding terms in parallel
+PER_TAXONOMY = 2
+# renaming or moving a term whose path has been read moves this on, cached
+# paths from an older generation are rebuilt the next time they're read
+_renames = itertools.count(1)
+_generation = 0
+
+
 class Term:
+    # there are many thousands of terms in a run, slots keep each one small
+    __slots__ = (
+        "children",
+        "data",
+        "_parent",
+        "parentUuid",
+        "_term",
+        "uuid",
+        "index",
+        "readonly",
+        "_fullTerm",
+        "_generation",
+    )
+
     def __init__(self, term):
-        # parents & children are lists of Term objects
+        # children is a list of Term objects, parent is a Term or None
         self.children = term.get("children", [])
         self.data = term.get("data", {})
-        self.parents = term.get("parents", [])
+        self._fullTerm = None
+        self._generation = 0
+        self._parent = term.get("parent", None)
+        if "parents" in term:
+            self.parents = term["parents"]
         self.parentUuid = term.get("parentUuid", None)
-        self.term = term.get("term", None)
+        self._term = term.get("term", None)
         self.uuid = term.get("uuid", None)
         self.index = term.get("index", 0)
         self.readonly = term.get("readonly", False)
@@ -29,12 +69,68 @@ class Term:
         return False
 
     def __hash__(self):
-        return hash((self.uuid, self.fullTerm))
+        # the UUID is assigned after a term is created so we can't hash on it,
+        # terms without a UUID are equal to ones with the same path & so with
+        # the same name. Renaming an ancestor doesn't change the hash.
+        return hash(self._term)
+
+    def _invalidate(self):
+        # only a path that has been read can be cached in descendants
+        global _generation
+        if self._fullTerm is not None:
+            self._fullTerm = None
+            _generation = next(_renames)
+
+    @property
+    def term(self):
+        return self._term
+
+    @term.setter
+    def term(self, value):
+        self._term = value
+        self._invalidate()
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, value):
+        self._parent = value
+        self._invalidate()
+
+    @property
+    def parents(self):
+        # list of ancestors from the root down, walked from the parent pointers
+        parents = []
+        parent = self._parent
+        while parent is not None:
+            parents.append(parent)
+            parent = parent.parent
+        parents.reverse()
+        return parents
+
+    @parents.setter
+    def parents(self, parents):
+        # a list of ancestors from the root down, link any that aren't already
+        for ancestor, child in zip(parents, parents[1:]):
+            if child.parent is None:
+                child.parent = ancestor
+        self.parent = parents[-1] if parents else None
 
     @property
     def fullTerm(self):
         # string form of term's path e.g. Fall 2019\ANIMA\Jane Doe...
-        return "\\".join([p.term for p in self.parents] + [self.term])
+        # paths repeat across many terms so they're interned. The path is
+        # cached until a term is renamed or moved, then rebuilt once
+        if self._fullTerm is None or self._generation != _generation:
+            self._generation = _generation
+            if self._parent is None:
+                path = self._term
+            else:
+                path = self._parent.fullTerm + "\\" + self._term
+            self._fullTerm = sys.intern(path)
+        return self._fullTerm
 
     def asPOSTData(self):
         # used to serialize Terms for POSTing to EQUELLA API
@@ -52,10 +148,15 @@ class Term:
 class Taxonomy:
     def __init__(self, taxo):
         self.name = taxo["name"]
-        # initialize as empty set, populated by getRootTerms() & add() methods
-        self.terms = set()
+        # initialize as empty set-like tree, populated by getRootTerms() & add()
+        self.terms = TermTree()
         # unlike with terms we always know the taxonomy UUID upfront
         self.uuid = taxo["uuid"]
+        # file of the Bloom filter of root terms, None if we don't keep one
+        self.bloom_path = None
+        self._bloom = None
+        self._bloom_lock = threading.Lock()
+        tracer.label(self.uuid, self.name)
 
     def __repr__(self):
         return self.name
@@ -76,37 +177,64 @@ class Taxonomy:
         # don't add a term we already have
         existing_term = self.getTerm(term, "fullTerm")
         if existing_term:
-            logger.debug('Term "{}" is already in taxonomy "{}".'.format(self, term))
+            logger.debug('Term "%s" is already in taxonomy "%s".', self, term)
+            TERMS.inc(taxonomy=self.name, result="skipped")
             return existing_term.uuid
 
+        # a root term the Bloom filter has probably seen is confirmed with a
+        # search, if it isn't there after all we POST it like a new one
+        root = term.parent is None and not term.parentUuid
+        if root and self.bloom_path and term.term in self.bloom:
+            if self.findRootTerm(term.term) is not None:
+                # search results have no UUID, the root listing does & it
+                # answers later lookups of these terms without any requests
+                self.getRootTerms()
+                existing_term = self.getTerm(term, "fullTerm")
+            if existing_term:
+                BLOOM.inc(taxonomy=self.name, result="present")
+                TERMS.inc(taxonomy=self.name, result="skipped")
+                term.uuid = existing_term.uuid
+                return term.uuid
+            BLOOM.inc(taxonomy=self.name, result="false_positive")
+        elif root and self.bloom_path:
+            BLOOM.inc(taxonomy=self.name, result="new")
+
         s = request_wrapper()
         r = s.post(
-            api_root + "/taxonomy/{}/term".format(self.uuid), json=term.asPOSTData()
+            config.api_root + "/taxonomy/{}/term".format(self.uuid),
+            json=term.asPOSTData(),
         )
         # if we successfully created a term, store its UUID
         if r.status_code == 200 or r.status_code == 201:
-            logger.info("added {} term to {} taxonomy".format(term, self))
+            logger.info("added %s term to %s taxonomy", term, self)
+            TERMS.inc(taxonomy=self.name, result="created")
             # EQUELLA puts the UUID in the response's Location header
             # "Location": "https://vault.cca.edu/api/taxonomy/7ef.../term/bc35..."
             term.uuid = r.headers["Location"].split("/term/")[1]
+            # the term tree links it to its parent
             self.terms.add(term)
-            # if it's a child term, add it to the parent's list of children
-            if term.parentUuid:
-                self.getTerm(Term({"uuid": term.parentUuid}), "uuid").children.append(
-                    term
-                )
+            search_cache.invalidate(self.uuid)
+            if root and self.bloom_path:
+                self.addToBloom(term.term)
         # term already exists 406 "duplicate sibling" error, cannot rely on the
         # error message though because it varies if the term being added is a
         # parent or child term...sigh
         elif r.status_code == 406:
-            return self.getTermFromDupe(term).uuid
+            TERMS.inc(taxonomy=self.name, result="deduplicated")
+            term.uuid = self.getTermFromDupe(term).uuid
+            # remember it so adding the same term again doesn't cost requests
+            self.terms.add(term)
+            if root and self.bloom_path:
+                self.addToBloom(term.term)
+            return term.uuid
         else:
             # actual error where we don't know what happened...we end up here if
             # taxonomy is locked by another user
             logger.error(
-                'HTTP error adding term "{}" to taxonomy "{}". Error response JSON: {}'.format(
-                    term, self, r.json()
-                )
+                'HTTP error adding term "%s" to taxonomy "%s". Error response JSON: %s',
+                term,
+                self,
+                r.json(),
             )
             r.raise_for_status()
 
@@ -137,7 +265,7 @@ class Taxonomy:
         for key, value in term.data.items():
             if value:
                 r = s.put(
-                    api_root
+                    config.api_root
                     + "/taxonomy/{uuid}/term/{termUuid}/data/{key}/{value}".format(
                         uuid=self.uuid,
                         termUuid=term.uuid,
@@ -146,7 +274,70 @@ class Taxonomy:
                     )
                 )
                 r.raise_for_status()
-        logger.info("added data to {} term in {} taxonomy".format(term, self))
+        logger.info("added data to %s term in %s taxonomy", term, self)
+
+    def use_bloom(self, directory=None):
+        """
+        Keep a Bloom filter of this taxonomy's root terms, saved in
+        `directory` (bloom_directory by default) so later runs reuse it. Meant
+        for the flat taxonomies which only grow: a term the filter hasn't seen
+        is POSTed straight away & one it probably has is confirmed with a
+        search. Search results have no UUID so a confirmed term also costs a
+        listing of the root terms, which is kept in taxo.terms & answers later
+        lookups. The filter is built from a full listing of the taxonomy the
+        first time it's needed & terms added afterwards are only written to
+        its file by saveBloom.
+        """
+        directory = directory or bloom_directory
+        self.bloom_path = os.path.join(directory, self.uuid + ".json")
+
+    @property
+    def bloom(self) -> BloomFilter:
+        with self._bloom_lock:
+            if self._bloom is None:
+                self._bloom = BloomFilter.load(self.bloom_path)
+                if self._bloom is None or self._bloom.full:
+                    self._bloom = self.buildBloom()
+            return self._bloom
+
+    def buildBloom(self) -> BloomFilter:
+        """
+        List the taxonomy's root terms into a new Bloom filter & save it, the
+        terms themselves aren't kept.
+        """
+        s = request_wrapper()
+        r = s.get(config.api_root + "/taxonomy/{}/term".format(self.uuid))
+        r.raise_for_status()
+        names = [t["term"] for t in r.json()]
+        # room to grow for a few years before it needs rebuilding
+        bloom = BloomFilter(capacity=max(1000, len(names) * 2))
+        bloom.update(names)
+        os.makedirs(os.path.dirname(self.bloom_path), exist_ok=True)
+        bloom.save(self.bloom_path)
+        logger.info("Built Bloom filter of %s terms in %s taxonomy", len(names), self)
+        return bloom
+
+    def addToBloom(self, value):
+        self.bloom.add(value)
+
+    def saveBloom(self) -> bool:
+        """write the Bloom filter if terms were added to it, True if we did"""
+        with self._bloom_lock:
+            bloom = self._bloom
+        if bloom is None or not bloom.dirty:
+            return False
+        bloom.save(self.bloom_path)
+        return True
+
+    def findRootTerm(self, value):
+        """
+        Search for a root term with exactly this text.
+
+        returns:
+            search result dict or None if there's no such term
+        """
+        results = self.search(value, {"restriction": "TOP_LEVEL_ONLY", "limit": 100})
+        return next((r for r in results if r["term"] == value), None)
 
     def clear(self):
         """
@@ -176,6 +367,11 @@ class Taxonomy:
         if type(search_term) == str:
             search_term = Term({"term": search_term})
 
+        # the term tree indexes these two
+        if attr == "uuid":
+            return self.terms.get_uuid(search_term.uuid)
+        if attr == "fullTerm":
+            return self.terms.get_path(search_term.fullTerm)
         for term in self.terms:
             if getattr(term, attr) == getattr(search_term, attr):
                 return term
@@ -195,42 +391,42 @@ class Taxonomy:
         """
         # case 1: not a child term, so it must be top-level
         if not term.parentUuid:
-            if len(self.terms) == 0:
+            sibling = self.getTerm(term.term, "fullTerm")
+            if not sibling:
+                # someone else created it since we last listed the root terms
                 self.getRootTerms()
-            sibling = self.getTerm(term.term, "term")
+                sibling = self.getTerm(term.term, "fullTerm")
+            if not sibling:
+                logger.error(
+                    'Unable to find duplicate of "%s" among the root terms',
+                    term.term,
+                )
+                raise Exception("cannot find identical sibling for root duplicate")
         else:
             # case 2: child term, we have to get its parents' children to find it
             # NOTE: /tax/uuid/term?path=FULL\\TERM\\PATH returns children of PATH
             parent = self.getTerm(Term({"uuid": term.parentUuid}), "uuid")
             if not parent:
                 logger.error(
-                    'Trying to find the parent to duplicate child "{}" in taxonomy "{}" but unable to, will not be able to add this term.'.format(
-                        term, self
-                    )
+                    'Trying to find the parent to duplicate child "%s" in taxonomy "%s" but unable to, will not be able to add this term.',
+                    term,
+                    self,
                 )
                 raise Exception("cannot find parent of duplicate child term")
-            s = request_wrapper()
-            r = s.get(
-                api_root
-                + "/taxonomy/{}/term?{}".format(
-                    self.uuid, urlencode({"path": parent.fullTerm})
-                )
-            )
-            r.raise_for_status()
-            # r.json is a list of sibling term dicts, find the duplicate one
-            sibling = next((Term(t) for t in r.json() if t["term"] == term.term), None)
+            siblings = self.getChildren(parent.fullTerm)
+            sibling = next((t for t in siblings if t.term == term.term), None)
             if not sibling:
                 logger.error(
-                    'Unable to find duplicate of "{}" among parent\'s children'.format(
-                        term.term
-                    )
+                    'Unable to find duplicate of "%s" among parent\'s children',
+                    term.term,
                 )
                 raise Exception("cannot find identical sibling for child duplicate")
 
         logger.info(
-            'Found duplicate sibling term "{}" with UUID "{}" in taxonomy "{}"'.format(
-                sibling.term, sibling.uuid, self
-            )
+            'Found duplicate sibling term "%s" with UUID "%s" in taxonomy "%s"',
+            sibling.term,
+            sibling.uuid,
+            self,
         )
         return sibling
 
@@ -242,21 +438,41 @@ class Taxonomy:
         returns:
             root terms (list): list of Term objects
         """
-        logger.debug("Getting root-level taxonomy terms for {}".format(self))
+        logger.debug("Getting root-level taxonomy terms for %s", self)
         s = request_wrapper()
-        r = s.get(api_root + "/taxonomy/{}/term".format(self.uuid))
+        r = s.get(config.api_root + "/taxonomy/{}/term".format(self.uuid))
         r.raise_for_status()
         terms = [Term(t) for t in r.json()]
         for term in terms:
             self.terms.add(term)
         return terms
 
+    def getChildren(self, path):
+        """
+        Obtains the terms directly beneath a path from openEQUELLA, they
+        aren't added to taxo.terms.
+        args:
+            path (str): full path of the parent e.g. "Fall 2019\\ANIMA"
+        returns:
+            child terms (list): list of Term objects, each one's parent is a
+            Term standing in for the path so its fullTerm is right
+        """
+        s = request_wrapper()
+        r = s.get(
+            config.api_root
+            + "/taxonomy/{}/term?{}".format(self.uuid, urlencode({"path": path}))
+        )
+        r.raise_for_status()
+        parent = Term({"term": path})
+        return [Term(dict(t, parent=parent)) for t in r.json()]
+
     def remove(self, term):
         """
         Remove a term from a taxonomy (primarily used to remove semester
         terms from course lists).
         args:
-            term (str|Term): either a string ("Fall 2019") or Term object
+            term (str|Term): either a string ("Fall 2019", or a full path like
+            "Fall 2019\\ANIMA") or Term object
         returns:
             status (bool): True for successful & False for not
         """
@@ -265,40 +481,41 @@ class Taxonomy:
             if found_term:
                 term = found_term
             else:
-                # We hope the term is in the taxonomy root because otherwise we
-                # have no way of finding it
-                terms = self.getRootTerms()
-                # this does _not_ fail gracefully...
-                term = next((t for t in terms if t.term == term), None)
-                if not term:
+                # list the root terms or, for a path, its parent's children
+                parent, _, name = term.rpartition("\\")
+                terms = self.getChildren(parent) if parent else self.getRootTerms()
+                found_term = next((t for t in terms if t.term == name), None)
+                if not found_term:
                     logger.error(
-                        'Cannot find term "{}" in taxonomy "{}" while deleting.'.format(
-                            term, self
-                        )
+                        'Cannot find term "%s" in taxonomy "%s" while deleting.',
+                        term,
+                        self,
                     )
                     return False
+                term = found_term
 
         # Term objects don't necessarily have UUIDs
         if not term.uuid:
             logger.error(
-                'Cannot delete "{}" from "{}": need to know the UUID of the term.'.format(
-                    term, self
-                )
+                'Cannot delete "%s" from "%s": need to know the UUID of the term.',
+                term,
+                self,
             )
             return False
 
         s = request_wrapper()
-        logger.info('deleting "{}" term from "{}" taxonomy'.format(term, self))
-        r = s.delete(api_root + "/taxonomy/{}/term/{}".format(self.uuid, term.uuid))
-        self.terms.discard(term)
+        logger.info('deleting "%s" term from "%s" taxonomy', term, self)
+        r = s.delete(
+            config.api_root + "/taxonomy/{}/term/{}".format(self.uuid, term.uuid)
+        )
+        # openEQUELLA deletes the term's children too, forget its whole subtree
+        self.terms.remove_subtree(term)
         # will throw a 500 error if the taxonomy is locked by another user
         # r.json() = {'code': 500, 'error': 'Internal Server Error',
         # 'error_description': 'Taxonomy is locked by another user: {username}'}
         r.raise_for_status()
-        # remove term's children (openEQUELLA API does this automatically)
-        if len(term.children) > 0:
-            for child in term.children:
-                self.terms.discard(child)
+        TERMS.inc(taxonomy=self.name, result="deleted")
+        search_cache.invalidate(self.uuid)
         return True
 
     def search(self, query, options={}):
@@ -318,19 +535,31 @@ class Taxonomy:
             "parent\\entry"} note that they lack the Term UUID :( and thus
             are kinda useless
         """
-        logger.debug(
-            'Searching taxonomy "{}" for query "{}" with options "{}"'.format(
-                self, query, options
+        # sort options so equivalent searches share a cache key & a URL
+        params = [("q", query)] + sorted(options.items())
+        key = (self.uuid, query, tuple(params[1:]))
+        results = search_cache.get(key)
+        if results is not None:
+            logger.debug(
+                'Cached search of taxonomy "%s" for query "%s" with options "%s"',
+                self,
+                query,
+                options,
             )
+            return list(results)
+
+        logger.debug(
+            'Searching taxonomy "%s" for query "%s" with options "%s"',
+            self,
+            query,
+            options,
         )
         s = request_wrapper()
         r = s.get(
-            api_root
-            + "/taxonomy/{}/search?q={}&{}".format(
-                self.uuid,
-                query,
-                urlencode(options),
-            )
+            config.api_root
+            + "/taxonomy/{}/search?{}".format(self.uuid, urlencode(params))
         )
         r.raise_for_status()
-        return r.json()["results"]
+        results = r.json()["results"]
+        search_cache.set(key, results)
+        return list(results)
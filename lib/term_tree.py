@@ -0,0 +1,141 @@
+"""
+The in-memory store of a Taxonomy's terms. It acts like the set it replaced
+(add, discard, clear, len, in, iteration) but also indexes terms by UUID & by
+full path and knows each term's children, so a deleted semester can be
+removed along with everything beneath it in time proportional to the size
+of that subtree.
+
+Children are indexed under their parent's full path, which we know even for
+terms whose parent isn't in the store (yet).
+"""
+
+import threading
+
+
+class TermTree:
+    def __init__(self, terms=()):
+        # the same lock guards all the indexes, an RLock so methods can nest
+        self._lock = threading.RLock()
+        # full path => Term, this is the "set"
+        self._by_path = {}
+        self._by_uuid = {}
+        # parent full path => dict of child full path => None (ordered set)
+        self._children = {}
+        for term in terms:
+            self.add(term)
+
+    def __len__(self):
+        return len(self._by_path)
+
+    def __contains__(self, term):
+        # same semantics as a set of Terms, which match on their full path
+        existing = self._by_path.get(term.fullTerm)
+        return existing is not None and existing == term
+
+    def __iter__(self):
+        # iterate over a copy so the tree can change while we loop
+        with self._lock:
+            return iter(list(self._by_path.values()))
+
+    def __repr__(self):
+        return "TermTree({} terms)".format(len(self))
+
+    @staticmethod
+    def parent_path(term):
+        if term.parent is not None:
+            return term.parent.fullTerm
+        return None
+
+    def add(self, term) -> None:
+        """store a Term, a term with a path we already have is ignored"""
+        path = term.fullTerm
+        with self._lock:
+            if path in self._by_path:
+                return
+            self._by_path[path] = term
+            if term.uuid:
+                self._by_uuid[term.uuid] = term
+            parent = self.parent_path(term)
+            if parent is None and term.parentUuid in self._by_uuid:
+                parent = self._by_uuid[term.parentUuid].fullTerm
+            if parent is not None:
+                self._children.setdefault(parent, {})[path] = None
+
+    def discard(self, term) -> None:
+        """remove a single Term if it's present, its children are kept"""
+        with self._lock:
+            if term in self:
+                self._unlink(self._by_path[term.fullTerm])
+
+    def _unlink(self, term) -> None:
+        path = term.fullTerm
+        del self._by_path[path]
+        if term.uuid and self._by_uuid.get(term.uuid) is term:
+            del self._by_uuid[term.uuid]
+        parent = self.parent_path(term)
+        if parent is None and term.parentUuid in self._by_uuid:
+            parent = self._by_uuid[term.parentUuid].fullTerm
+        siblings = self._children.get(parent)
+        if siblings is not None:
+            siblings.pop(path, None)
+            if not siblings:
+                del self._children[parent]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_path.clear()
+            self._by_uuid.clear()
+            self._children.clear()
+
+    def get_uuid(self, uuid):
+        """Term with this UUID or None"""
+        return self._by_uuid.get(uuid)
+
+    def get_path(self, path):
+        """Term with this full path (e.g. "Fall 2023\\ANIMA") or None"""
+        return self._by_path.get(path)
+
+    def children(self, term) -> list:
+        """stored Terms directly beneath a term"""
+        with self._lock:
+            paths = self._children.get(term.fullTerm, {})
+            return [self._by_path[p] for p in paths if p in self._by_path]
+
+    def _subtree_paths(self, path) -> list[str]:
+        # depth-first, parents before their children
+        paths = []
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            paths.append(path)
+            stack.extend(reversed(self._children.get(path, {})))
+        return paths
+
+    def iter_subtree(self, term):
+        """iterate over a term & all the stored terms beneath it"""
+        with self._lock:
+            paths = self._subtree_paths(term.fullTerm)
+            return iter([self._by_path[p] for p in paths if p in self._by_path])
+
+    def count_subtree(self, term) -> int:
+        with self._lock:
+            paths = self._subtree_paths(term.fullTerm)
+            return len([p for p in paths if p in self._by_path])
+
+    def remove_subtree(self, term) -> int:
+        """
+        Remove a term & everything beneath it.
+
+        returns:
+            removed (int): number of Terms removed
+        """
+        with self._lock:
+            removed = 0
+            for path in self._subtree_paths(term.fullTerm):
+                node = self._by_path.get(path)
+                if node is not None:
+                    self._unlink(node)
+                    removed += 1
+                # children of a node are all in the list, drop their index
+                self._children.pop(path, None)
+            return removed
@@ -0,0 +1,289 @@
+"""
+Record a span for every HTTP request made through a `request_wrapper` session
+so we can see where a run spends its time. Spans carry the HTTP method, an
+endpoint template (UUIDs replaced with placeholders so requests group
+together), the taxonomy or group the request touched, status, response size
+and latency. Code further up the stack opens context spans (e.g. one per
+course and one per `add_to_taxos` step) and every request made inside them
+records its parent span, so a slow request can be traced back to what
+triggered it.
+
+Tracing is off by default. `tracer.enable()` turns it on, then at the end of
+a run `tracer.write_jsonl(path)` & `tracer.write_chrome_trace(path)` export
+the spans and `tracer.summary()` gives p50/p95/p99 latency per endpoint. The
+Chrome trace file can be opened in chrome://tracing or https://ui.perfetto.dev
+
+Only the most recent MAX_SPANS spans are kept so a process that never exits
+(app.py --watch) doesn't grow without bound, `tracer.dropped` counts the rest.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+UUID_RE = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I
+)
+# the span a request or child span is opened inside of
+_current_span = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+def endpoint_template(method, url) -> str:
+    """
+    Collapse a request URL into a template we can group requests by, e.g.
+    "PUT /taxonomy/7ef.../term/bc35.../data/CrsName/ANIMA-1000" becomes
+    "PUT /taxonomy/{uuid}/term/{uuid}/data/{key}/{value}". Query parameter
+    names are kept but not their values.
+
+    args:
+        method (str): HTTP method
+        url (str): full request URL
+    returns:
+        template (str)
+    """
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    # drop everything up to and including the "api" root segment
+    if "api" in segments:
+        segments = segments[segments.index("api") + 1 :]
+    template = []
+    for segment in segments:
+        if UUID_RE.match(segment):
+            template.append("{uuid}")
+        else:
+            template.append(segment)
+        # term data nodes are /term/{uuid}/data/{key}/{value} where the value
+        # may itself contain slashes
+        if segment == "data" and "term" in template:
+            template.extend(["{key}", "{value}"])
+            break
+    path = "/" + "/".join(s for s in template if s)
+    params = sorted(set(k for k, v in parse_qsl(parts.query, True)))
+    if params:
+        path += "?" + "&".join(params)
+    return "{} {}".format(method.upper(), path)
+
+
+def resource_uuid(url) -> str | None:
+    """UUID of the taxonomy or group a request URL is about, if any"""
+    segments = urlsplit(url).path.split("/")
+    for i, segment in enumerate(segments[:-1]):
+        if segment in ("taxonomy", "group") and UUID_RE.match(segments[i + 1]):
+            return segments[i + 1]
+    return None
+
+
+def percentile(values, pct) -> float:
+    """nearest-rank percentile of a list of numbers, 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class Span:
+    def __init__(self, name, parent=None, attrs=None):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs or {}
+        self.thread = threading.get_ident()
+        self.start = time.time()
+        self.duration = 0.0
+
+    def __repr__(self):
+        return self.name
+
+    @property
+    def context(self) -> dict:
+        """attributes of this span and all of its ancestors, nearest wins"""
+        context = self.parent.context if self.parent else {}
+        context.update(self.attrs)
+        return context
+
+    def asdict(self) -> dict:
+        return {
+            "id": self.id,
+            "parent": self.parent.id if self.parent else None,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+# tens of MB of spans, several full runs' worth
+MAX_SPANS = 100_000
+
+
+class Tracer:
+    def __init__(self, max_spans=MAX_SPANS):
+        self.enabled = False
+        self.spans = deque(maxlen=max_spans)
+        self.dropped = 0
+        # taxonomy & group UUIDs => names so spans are human readable
+        self.labels = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+        return self
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.dropped = 0
+
+    def _append(self, span):
+        with self._lock:
+            if len(self.spans) == self.spans.maxlen:
+                self.dropped += 1
+            self.spans.append(span)
+
+    def snapshot(self) -> list[Span]:
+        """a copy of the spans, safe to iterate while requests are recorded"""
+        with self._lock:
+            return list(self.spans)
+
+    def label(self, uuid, name):
+        """remember the name of a taxonomy or group so spans can show it"""
+        self.labels[uuid] = name
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Open a context span, every span or request recorded inside the `with`
+        block is its child. Does nothing if tracing is disabled.
+
+        args:
+            name (str): what is happening e.g. "course" or "add_to_taxos"
+            attrs: extra attributes e.g. course="Fall 2024 ANIMA-1000-1"
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, _current_span.get(), attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.duration = time.time() - span.start
+            self._append(span)
+
+    def record_response(self, response, *args, **kwargs):
+        """requests response hook, records a span for a completed request"""
+        if not self.enabled:
+            return
+        request = response.request
+        parent = _current_span.get()
+        uuid = resource_uuid(request.url)
+        elapsed = response.elapsed.total_seconds()
+        span = Span(
+            "http",
+            parent,
+            {
+                "method": request.method,
+                "endpoint": endpoint_template(request.method, request.url),
+                "resource": self.labels.get(uuid, uuid),
+                "status": response.status_code,
+                "bytes": len(response.content or b""),
+            },
+        )
+        # the hook runs once the response is complete, backdate the start
+        span.start = span.start - elapsed
+        span.duration = elapsed
+        self._append(span)
+
+    @property
+    def http_spans(self) -> list[Span]:
+        return [s for s in self.snapshot() if s.name == "http"]
+
+    def summary(self) -> dict:
+        """
+        Latency summary per endpoint template.
+
+        returns:
+            dict of endpoint => {"count", "total", "p50", "p95", "p99"} with
+            times in seconds, sorted by total time descending
+        """
+        latencies = {}
+        for span in self.http_spans:
+            latencies.setdefault(span.attrs["endpoint"], []).append(span.duration)
+        stats = {
+            endpoint: {
+                "count": len(times),
+                "total": sum(times),
+                "p50": percentile(times, 50),
+                "p95": percentile(times, 95),
+                "p99": percentile(times, 99),
+            }
+            for endpoint, times in latencies.items()
+        }
+        return dict(sorted(stats.items(), key=lambda i: i[1]["total"], reverse=True))
+
+    def format_summary(self) -> str:
+        lines = [
+            "{:>6} {:>9} {:>8} {:>8} {:>8}  {}".format(
+                "count", "total(s)", "p50(ms)", "p95(ms)", "p99(ms)", "endpoint"
+            )
+        ]
+        for endpoint, s in self.summary().items():
+            lines.append(
+                "{:>6} {:>9.2f} {:>8.1f} {:>8.1f} {:>8.1f}  {}".format(
+                    s["count"],
+                    s["total"],
+                    s["p50"] * 1000,
+                    s["p95"] * 1000,
+                    s["p99"] * 1000,
+                    endpoint,
+                )
+            )
+        return "\n".join(lines)
+
+    def write_jsonl(self, path):
+        """write one JSON span per line, ordered by start time"""
+        with open(path, "w") as fh:
+            for span in sorted(self.snapshot(), key=lambda s: s.start):
+                fh.write(json.dumps(span.asdict()) + "\n")
+
+    def write_chrome_trace(self, path):
+        """write spans in Chrome trace-event format ("complete" X events)"""
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.snapshot(), key=lambda s: s.start):
+            args = span.context if span.name == "http" else dict(span.attrs)
+            args["span"] = span.id
+            args["parent"] = span.parent.id if span.parent else None
+            events.append(
+                {
+                    "name": args.get("endpoint", span.name),
+                    "cat": span.name,
+                    "ph": "X",
+                    "ts": int(span.start * 1_000_000),
+                    "dur": int(span.duration * 1_000_000),
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": args,
+                }
+            )
+        with open(path, "w") as fh:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh)
+
+
+# one tracer for the whole process, request_wrapper sessions report to it
+tracer = Tracer()
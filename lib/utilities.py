@@ -1,27 +1,55 @@
+import json
+import os
 import re
-
-from requests import Session
+import tempfile
+import time
 
 import config
+from .tracing import tracer
 
 
 PORTAL_STATUSES = ("Closed", "Open", "Waitlist")
 
 
-def request_wrapper() -> Session:
+def request_wrapper() -> "HedgedSession":
+    # requests is only imported once we make a request so scripts that never
+    # do start faster, metrics imports this module so we import it here too
+    from .hedging import HedgedSession
+    from .metrics import observe_response
+
     if not config.token:
         raise Exception("I need an OAuth token in config.py to work.")
 
-    s = Session()
+    # every request has a timeout & slow GETs are hedged, see lib/hedging.py
+    s = HedgedSession()
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
         "X-Authorization": "access_token=" + config.token,
     }
     s.headers.update(headers)
+    s.hooks["response"].extend([tracer.record_response, observe_response])
     return s
 
 
+def atomic_write(path, text) -> None:
+    """
+    Write text to a file by writing a temporary file in the same directory
+    & renaming it, so readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(text)
+        # mkstemp files are only readable by us, other tools need to read it
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
 def strip_prefix(string) -> str:
     """
     A lot of Workday names, which we are unfortunately forced to use as identifiers,
@@ -41,3 +69,25 @@ def course_sort(course):
         course.section_code,
     )
     return s
+
+
+def read_cache(path, ttl) -> dict | None:
+    """
+    Read a JSON cache file written by `CacheFileWriter`, returning None if it
+    doesn't exist or is older than `ttl` seconds. Files from before we stored
+    a fetch time fall back to their modification time.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as fh:
+        data = json.load(fh)
+    fetched = data.get("fetched", os.path.getmtime(path))
+    if time.time() - fetched > ttl:
+        config.logger.info(
+            "Cached %s is %.1f hours old, refreshing it.",
+            path,
+            (time.time() - fetched) / 3600,
+        )
+        return None
+    return data
+
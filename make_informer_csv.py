@@ -2,25 +2,45 @@
 (Informer report) CSV format that the original libraries_course_lists project
 utilizes.
 
-usage: python make_informer_csv.py
+usage: python make_informer_csv.py [-o OUTPUT ...]
 
-automatically names the output file "_informer.csv" per convention used in the
-original libraries_course_lists project
+names the output file "_informer.csv" per convention used in the original
+libraries_course_lists project unless other outputs are given, "-o -" writes
+to stdout so the CSV can be piped into other tools
 """
 
 import argparse
-import csv
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
 from datetime import date, datetime
+from functools import lru_cache
 import json
 import re
-import subprocess
+import sys
 import unicodedata
 
 from lib import Course
+from lib.csv_sink import CsvSink
+from lib.downloads import CourseDownloader
+from lib.metrics import COURSES, ROWS, TextfileWriter, add_metrics_argument
+from lib.profiling import Profiler, add_profile_argument
+from lib.rules import route_course
 
 today: date = datetime.now().date()
 
 
+HEADER: list[str] = [
+    "semester",
+    "department",
+    "title",
+    "faculty",
+    "section",
+    "course",
+    "colocated courses",
+    "faculty usernames",
+]
+
+
 def what_term_is_it(date: date = today) -> str:
     """determine current term (e.g. "Fall 2023", "Spring 2023") from the date"""
     year: int = date.year
@@ -35,14 +55,10 @@ def what_term_is_it(date: date = today) -> str:
     return f"{season}_{year}"
 
 
-def download_courses_file(term: str) -> str:
-    # call out to `gcloud storage` to download the courses file from Google Storage
-    # using the google-cloud-storage library stopped working, some kind of auth problem
-    uri: str = f"gs://int_files_source/course_section_data_AP_{term}.json"
-    path: str = f"data/{today}_{term}.json"
-    cmd: str = f"gcloud storage cp {uri} {path}"
-    subprocess.call(cmd, shell=True)
-    return path
+def download_courses_files(terms: list[str]) -> dict[str, str]:
+    """download the courses files for several terms at once, skipping any we
+    already have an identical copy of in data/cache"""
+    return CourseDownloader().fetch_terms(terms)
 
 
 def to_term_code(semester: str) -> str:
@@ -66,31 +82,51 @@ def to_term_code(semester: str) -> str:
     return f"{year}{postfix}"
 
 
-def asciize(s: str) -> str:
-    # convert unicode string into ascii
-    # we have to do this bc uptaxo script chokes on non-ascii chars
+@lru_cache(maxsize=4096)
+def _asciize(s: str) -> str:
     return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode()
 
 
-def make_course_row(course: Course, courses: list[Course]) -> list[str] | None:
-    """args: course object from Workday json
+def asciize(s: str) -> str:
+    # convert unicode string into ascii
+    # we have to do this bc uptaxo script chokes on non-ascii chars
+    # nearly every value is already ascii, the same names repeat across many
+    # sections so the rest are memoized
+    return s if s.isascii() else _asciize(s)
+
+
+def colocation_index(courses: Iterable[Course]) -> dict[str, str]:
+    """map each section_def_refid to its section code so colocated sections
+    can be looked up without scanning every course"""
+    index: dict[str, str] = {}
+    for course in courses:
+        # first one wins, like Course.find_colocated_sections
+        index.setdefault(course.section_def_refid, course.section_code)
+    return index
+
+
+def make_course_row(
+    course: Course, courses: list[Course], index: dict[str, str] | None = None
+) -> list[str] | None:
+    """args: course object from Workday json, all courses (or their
+    colocation_index) to find colocated sections in
     returns: list of data properties we're interested in
     """
     # skip ones not in Portal course catalog & placeholders
     if not course.on_portal or course.placeholder:
         return None
 
-    dept: str | None = course.owner
-    # skip the weird exceptions
-    if not dept or dept in ["CCA", "PRECO"]:
-        # intl exchg, skip
+    # skip the weird exceptions (intl exchg, FNARTs internships, etc.), see the
+    # RULES in lib/rules.py
+    dept: str | None = route_course(course).informer
+    if not dept:
         return None
-    elif dept == "FA":
-        if course.subject == "CRITI":
-            dept = "CRITI"
-        else:
-            # FNARTs internship, skip
-            return None
+    if index is None:
+        colocated = [c.section_code for c in course.find_colocated_sections(courses)]
+    else:
+        colocated = [
+            index[refid] for refid in course.colocated_sections or [] if refid in index
+        ]
     row: list[str] = [
         to_term_code(course.semester),
         dept,
@@ -99,42 +135,58 @@ def make_course_row(course: Course, courses: list[Course]) -> list[str] | None:
         asciize(course.instructor_names if course.instructor_names else "Staff"),
         course.section_code,
         course.course_code,
-        ", ".join([c.section_code for c in course.find_colocated_sections(courses)]),
+        ", ".join(colocated),
         asciize(course.instructor_usernames),
     ]
     return row
 
 
+def load_courses(files: Iterable[str]) -> Iterator[Course]:
+    """yield courses from each JSON file in turn, in file order"""
+    for file in files:
+        with open(file, "r") as fh:
+            data = json.load(fh)
+        yield from (Course(**d) for d in data)
+
+
+def informer_rows(courses: list[Course]) -> Iterator[list[str]]:
+    """yield a CSV row for every course we route to a department, in order"""
+    index: dict[str, str] = colocation_index(courses)
+    for course in courses:
+        row: list[str] | None = make_course_row(course, courses, index)
+        if row:
+            yield row
+
+
 # dealing with three different forms of semester strings
 # 1. "Fall 2023" (Workday JSON)
 # 2. "2023FA" (EQUELLA taxonomy)
 # 3. "FA_2023" (Google Storage file name)
-def main(file: str | None = None, term: str | None = None) -> None:
-    if not file:
-        file = download_courses_file(term or what_term_is_it())
-
-    with open(file, "r") as fh:
-        data = json.load(fh)
-        courses: list[Course] = [Course(**d) for d in data]
-
-    print("Writing Informer CSV file to _informer.csv")
-    with open("_informer.csv", "w") as outfile:
-        writer = csv.writer(outfile)
-        header: list[str] = [
-            "semester",
-            "department",
-            "title",
-            "faculty",
-            "section",
-            "course",
-            "colocated courses",
-            "faculty usernames",
-        ]
-        writer.writerow(header)
-        for course in courses:
-            row: list[str] | None = make_course_row(course, courses)
-            if row:
-                writer.writerow(row)
+def main(
+    file: str | None = None,
+    terms: list[str] | None = None,
+    outputs: list[str] | None = None,
+) -> None:
+    if file:
+        files: list[str] = [file]
+    else:
+        paths = download_courses_files(terms or [what_term_is_it()])
+        files = list(paths.values())
+    outputs = outputs or ["_informer.csv"]
+
+    # colocated sections can be in any file so we need every course first
+    courses: list[Course] = list(load_courses(files))
+    COURSES.set(len(courses), state="parsed")
+    COURSES.set(len([c for c in courses if c.on_portal]), state="on_portal")
+
+    # stdout may be one of the outputs
+    print(f"Writing Informer CSV file to {', '.join(outputs)}", file=sys.stderr)
+    with CsvSink(outputs) as sink:
+        sink.writerow(HEADER)
+        sink.writerows(informer_rows(courses))
+    written: int = sink.rows - 1
+    ROWS.set(written, result="written")
+    ROWS.set(len(courses) - written, result="skipped")
 
 
 if __name__ == "__main__":
@@ -142,10 +194,32 @@ if __name__ == "__main__":
         description="Create Informer-like CSV from Workday JSON. This script automatically downloads the JSON courses file for the current semester from Google Storage or you can specify a term or file to create a CSV for a semester other than the current one."
     )
     parser.add_argument("-f", "--file", help="path to JSON courses file")
-    parser.add_argument("-t", "--term", help="term code like 'Fall_2023'")
+    parser.add_argument(
+        "-t",
+        "--term",
+        action="append",
+        help="term code like 'Fall_2023', repeat to combine several terms in one CSV",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        action="append",
+        help="where to write the CSV, '-' for stdout, a .gz path is gzipped, repeat to write several files (default: _informer.csv)",
+    )
+    add_metrics_argument(parser)
+    add_profile_argument(parser)
     args = parser.parse_args()
-    if args.term and not re.match(r"(Spring|Summer|Fall)_\d{4}", args.term):
-        raise ValueError(
-            f"Cannot understand '{args.term}', the --term must be in the form of 'Fall_2023' e.g. a valid season, an underscore, and a 4-digit year"
-        )
-    main(args.file, args.term)
+    for term in args.term or []:
+        if not re.match(r"(Spring|Summer|Fall)_\d{4}", term):
+            raise ValueError(
+                f"Cannot understand '{term}', the --term must be in the form of 'Fall_2023' e.g. a valid season, an underscore, and a 4-digit year"
+            )
+    metrics = TextfileWriter(args.metrics, "make_informer_csv") if args.metrics else None
+    if metrics:
+        metrics.start()
+    try:
+        with Profiler("make_informer_csv") if args.profile else nullcontext():
+            main(args.file, args.term, args.output)
+    finally:
+        if metrics:
+            metrics.stop()
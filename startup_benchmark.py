@@ -0,0 +1,76 @@
+""" measure how long each entry point takes to start, i.e. to import everything
+& print its --help, which is most of the time a short cron job or a test run
+spends before doing any work. Each script runs in a fresh interpreter several
+times, the median is reported along with the slowest imports of the last run.
+
+usage: python startup_benchmark.py [-n RUNS] [--imports N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS: list[list[str]] = [
+    ["-c", "import lib"],
+    ["app.py", "--help"],
+    ["make_informer_csv.py", "--help"],
+    ["faculty_groups.py", "--help"],
+]
+
+
+def slowest_imports(importtime: str, count: int) -> list[tuple[int, str]]:
+    """parse `python -X importtime` output into (cumulative µs, module) pairs
+    for the modules the script imports itself, nested imports are indented
+    & `site` is the interpreter's own startup"""
+    imports: list[tuple[int, str]] = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if module.startswith("  ") or module.strip() == "site":
+            continue
+        imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def measure(args: list[str], runs: int) -> tuple[list[float], str]:
+    """returns: wall times in seconds & the importtime output of the last run"""
+    times: list[float] = []
+    stderr: str = ""
+    for _ in range(runs):
+        start: float = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime"] + args,
+            capture_output=True,
+            text=True,
+        )
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(args)} failed:\n{proc.stderr}")
+        stderr = proc.stderr
+    return times, stderr
+
+
+def main(runs: int = 5, imports: int = 5) -> None:
+    for args in ENTRY_POINTS:
+        times, importtime = measure(args, runs)
+        print(
+            f"{' '.join(args)}: median {statistics.median(times) * 1000:.0f} ms, "
+            f"min {min(times) * 1000:.0f} ms over {runs} runs"
+        )
+        for cumulative, module in slowest_imports(importtime, imports):
+            print(f"    {cumulative / 1000:6.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the startup time of each entry point."
+    )
+    parser.add_argument("-n", "--runs", type=int, default=5, help="runs per script")
+    parser.add_argument(
+        "--imports", type=int, default=5, help="slowest imports to list per script"
+    )
+    args = parser.parse_args()
+    main(args.runs, args.imports)
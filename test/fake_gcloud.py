@@ -0,0 +1,40 @@
+"""
+A stand-in for the two `gcloud storage` commands lib/downloads.py runs. The
+"bucket" is the directory in the FAKE_GCS_DIR environment variable, objects
+are files named after the last part of their gs:// URI. Every command run is
+appended to the FAKE_GCS_DIR/calls.log file. Objects whose name ends in
+".composite.json" have no MD5, like composite uploads.
+
+    python test/fake_gcloud.py storage objects describe gs://b/x.json --format=value(md5_hash)
+    python test/fake_gcloud.py storage cp gs://b/x.json local.json
+"""
+
+import base64
+import hashlib
+import os
+import shutil
+import sys
+
+bucket = os.environ["FAKE_GCS_DIR"]
+args = sys.argv[1:]
+with open(os.path.join(bucket, "calls.log"), "a") as fh:
+    fh.write(" ".join(args) + "\n")
+
+if args[:3] == ["storage", "objects", "describe"]:
+    uri, dest = args[3], None
+elif args[:2] == ["storage", "cp"]:
+    uri, dest = args[2], args[3]
+else:
+    sys.exit("fake gcloud does not understand: " + " ".join(args))
+
+path = os.path.join(bucket, uri.rsplit("/", 1)[-1])
+if not os.path.exists(path):
+    sys.exit("ERROR: {} not found: 404".format(uri))
+
+if dest:
+    shutil.copyfile(path, dest)
+elif path.endswith(".composite.json"):
+    print()
+else:
+    with open(path, "rb") as fh:
+        print(base64.b64encode(hashlib.md5(fh.read()).digest()).decode())
@@ -0,0 +1,246 @@
+"""
+A tiny local stand-in for the parts of the VAULT group & taxonomy APIs our
+code uses, so request counts & concurrency can be tested without touching
+real groups or taxonomies. config.api_root points at the fake while it runs.
+
+    with FakeVault({"uuid": {"name": "Animation Faculty", "users": ["a"]}}) as vault:
+        ...
+        vault.requests  # list of (method, path) tuples
+        vault.terms  # list of (taxonomy uuid, term POST body, new term uuid)
+        vault.deleted  # list of deleted term uuids
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import itertools
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import config
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def record(self, taxonomy=None):
+        vault = self.server.vault
+        with vault.lock:
+            vault.requests.append((self.command, self.path))
+            delay = vault.delays.pop(0) if vault.delays else vault.delay
+            if taxonomy:
+                vault.inflight[taxonomy] = vault.inflight.get(taxonomy, 0) + 1
+                vault.max_inflight[taxonomy] = max(
+                    vault.max_inflight.get(taxonomy, 0), vault.inflight[taxonomy]
+                )
+        if delay:
+            time.sleep(delay)
+        if taxonomy:
+            with vault.lock:
+                vault.inflight[taxonomy] -= 1
+
+    def do_GET(self):
+        match = re.match(r"/api/taxonomy/([^/?]+)/", self.path)
+        self.record(match and match.group(1))
+        vault = self.server.vault
+        url = urlparse(self.path)
+        match = re.match(r"/api/taxonomy/([^/]+)/term$", url.path)
+        if match:
+            path = parse_qs(url.query).get("path")
+            if path:
+                return self.send_json(200, vault.children(match.group(1), path[0]))
+            return self.send_json(200, vault.roots(match.group(1)))
+        match = re.match(r"/api/taxonomy/([^/]+)/search$", url.path)
+        if match:
+            # root terms containing the query, search results have no UUID
+            params = parse_qs(url.query)
+            query = params["q"][0].lower()
+            results = [
+                {"term": t["term"], "fullTerm": t["term"]}
+                for t in vault.roots(match.group(1))
+                if query in t["term"].lower()
+            ]
+            limit = int(params.get("limit", [len(results)])[0])
+            return self.send_json(200, {"results": results[:limit]})
+        if url.path == "/api/taxonomy":
+            taxonomies = [
+                {"uuid": uuid, "name": name} for uuid, name in vault.taxonomies.items()
+            ]
+            return self.send_json(
+                200,
+                {
+                    "start": 0,
+                    "length": len(taxonomies),
+                    "available": len(taxonomies),
+                    "results": taxonomies,
+                },
+            )
+        if url.path == "/api/usermanagement/local/group":
+            groups = vault.group_dicts()
+            return self.send_json(
+                200,
+                {
+                    "start": 0,
+                    "length": len(groups),
+                    "available": len(groups),
+                    "results": groups,
+                },
+            )
+        match = re.match(r"/api/usermanagement/local/group/([^/]+)/user$", self.path)
+        group = match and self.server.vault.groups.get(match.group(1))
+        if not group:
+            return self.send_json(404, {"error": "Not Found"})
+        self.send_json(200, {"results": [{"id": u} for u in sorted(group["users"])]})
+
+    def do_POST(self):
+        match = re.match(r"/api/taxonomy/([^/]+)/term$", self.path)
+        self.record(match and match.group(1))
+        if not match:
+            return self.send_json(404, {"error": "Not Found"})
+        vault = self.server.vault
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if vault.fail and vault.fail(body):
+            return self.send_json(500, {"error": "Internal Server Error"})
+        with vault.lock:
+            # VAULT refuses a term with the same text as one of its siblings
+            duplicate = any(
+                taxo == match.group(1)
+                and existing["term"] == body["term"]
+                and existing["parentUuid"] == body["parentUuid"]
+                and uuid not in vault.deleted
+                for taxo, existing, uuid in vault.terms
+            )
+            if not duplicate:
+                uuid = "t{}".format(next(vault.ids))
+                vault.terms.append((match.group(1), body, uuid))
+        if duplicate:
+            return self.send_json(406, {"error": "duplicate sibling"})
+        self.send_response(201)
+        self.send_header(
+            "Location", "/api/taxonomy/{}/term/{}".format(match.group(1), uuid)
+        )
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        self.record()
+        if re.match(r"/api/taxonomy/[^/]+/term/[^/]+/data/", self.path):
+            return self.send_json(200)
+        match = re.match(r"/api/usermanagement/local/group/([^/]+)$", self.path)
+        group = match and self.server.vault.groups.get(match.group(1))
+        if not group:
+            return self.send_json(404, {"error": "Not Found"})
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        group["users"] = set(body["users"])
+        self.send_json(200)
+
+    def do_DELETE(self):
+        self.record()
+        match = re.match(r"/api/taxonomy/[^/]+/term/([^/]+)$", self.path)
+        if not match:
+            return self.send_json(404, {"error": "Not Found"})
+        with self.server.vault.lock:
+            self.server.vault.deleted.append(match.group(1))
+        self.send_json(200)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeVault:
+    def __init__(self, groups={}, delay=0, taxonomies={}):
+        """
+        args:
+            groups (dict): group uuid => {"name": str, "users": iterable}
+            delay (float): seconds every request takes
+            taxonomies (dict): taxonomy uuid => name, for the listing
+        """
+        self.groups = {
+            uuid: {"name": g["name"], "users": set(g["users"])}
+            for uuid, g in groups.items()
+        }
+        self.taxonomies = dict(taxonomies)
+        self.delay = delay
+        # seconds each of the next requests take, instead of delay
+        self.delays = []
+        self.requests = []
+        self.terms = []
+        # uuids of deleted terms
+        self.deleted = []
+        self.ids = itertools.count(1)
+        # taxonomy uuid => requests running at the same time, & the most seen
+        self.inflight = {}
+        self.max_inflight = {}
+        # function of a POSTed term's body, True makes the POST fail
+        self.fail = None
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.vault = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self._api_root = config.api_root
+        config.api_root = "http://127.0.0.1:{}/api".format(self.server.server_port)
+        return self
+
+    def __exit__(self, *exc):
+        config.api_root = self._api_root
+        self.server.shutdown()
+        self.server.server_close()
+
+    def group_dicts(self) -> list[dict]:
+        """group JSON like the /usermanagement/local/group listing returns"""
+        return [{"id": uuid, "name": g["name"]} for uuid, g in self.groups.items()]
+
+    def add_term(self, taxonomy, term, parent=None) -> str:
+        """
+        create a term as if someone else had, beneath the term with uuid
+        `parent` or as a root term, returns its uuid
+        """
+        with self.lock:
+            uuid = "t{}".format(next(self.ids))
+            self.terms.append((taxonomy, {"term": term, "parentUuid": parent}, uuid))
+        return uuid
+
+    def roots(self, taxonomy) -> list[dict]:
+        """root terms of a taxonomy like the /taxonomy/uuid/term listing"""
+        return self.children(taxonomy, None)
+
+    def children(self, taxonomy, path) -> list[dict]:
+        """
+        terms beneath a full path like /taxonomy/uuid/term?path=..., a path
+        of None lists the root terms
+        """
+        parent = None
+        with self.lock:
+            for name in path.split("\\") if path else []:
+                parent = next(
+                    (
+                        uuid
+                        for taxo, body, uuid in self.terms
+                        if taxo == taxonomy
+                        and body["term"] == name
+                        and body["parentUuid"] == parent
+                        and uuid not in self.deleted
+                    ),
+                    None,
+                )
+                if parent is None:
+                    return []
+            return [
+                {"term": body["term"], "uuid": uuid}
+                for taxo, body, uuid in self.terms
+                if taxo == taxonomy
+                and body["parentUuid"] == parent
+                and uuid not in self.deleted
+            ]
+
+    def count(self, method) -> int:
+        return len([r for r in self.requests if r[0] == method])
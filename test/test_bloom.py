@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+from lib import *
+from test.fake_vault import FakeVault
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_membership(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        names = ["Instructor {}".format(i) for i in range(1000)]
+        bloom.update(names)
+        # never a false negative
+        self.assertTrue(all(name in bloom for name in names))
+        false_positives = len(
+            [i for i in range(10000) if "Somebody {}".format(i) in bloom]
+        )
+        self.assertLess(false_positives, 250)
+        self.assertFalse(bloom.full)
+        self.assertTrue(bloom.dirty)
+        self.assertFalse(bloom.add("Instructor 1"))
+
+    def test_save_and_load(self):
+        bloom = BloomFilter(capacity=100)
+        bloom.update(["a", "b"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bloom.json")
+            self.assertIsNone(BloomFilter.load(path))
+            bloom.save(path)
+            self.assertFalse(bloom.dirty)
+            loaded = BloomFilter.load(path)
+        self.assertEqual(loaded.bits, bloom.bits)
+        self.assertEqual(len(loaded), 2)
+        self.assertIn("a", loaded)
+
+
+class TestTaxonomyBloom(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        search_cache.clear()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def taxo(self):
+        taxo = Taxonomy({"name": "ANIMA - faculty", "uuid": "fac"})
+        taxo.use_bloom(self.directory.name)
+        return taxo
+
+    def test_add(self):
+        with FakeVault() as vault:
+            existing = vault.add_term("fac", "Jane Doe")
+            taxo = self.taxo()
+            # the filter is built from one listing, the term is confirmed
+            # with a search & not POSTed, its UUID comes from the root terms
+            self.assertEqual(taxo.add("Jane Doe"), existing)
+            self.assertEqual(vault.count("POST"), 0)
+            self.assertEqual(vault.count("GET"), 3)
+            self.assertEqual(taxo.getTerm("Jane Doe").uuid, existing)
+            # which are kept, so adding it again costs nothing
+            self.assertEqual(taxo.add("Jane Doe"), existing)
+            self.assertEqual(vault.count("GET"), 3)
+
+            # a definitely new term is POSTed without any other requests
+            requests = len(vault.requests)
+            self.assertEqual(taxo.add("John Smith"), vault.terms[-1][2])
+            self.assertEqual(
+                vault.requests[requests:], [("POST", "/api/taxonomy/fac/term")]
+            )
+
+            # the file is only written at the end of the run
+            self.assertNotIn("John Smith", BloomFilter.load(taxo.bloom_path))
+            self.assertTrue(taxo.saveBloom())
+            self.assertFalse(taxo.saveBloom())
+
+            # the next run loads the saved filter & knows John Smith exists
+            taxo = self.taxo()
+            requests = len(vault.requests)
+            self.assertEqual(taxo.add("John Smith"), vault.terms[-1][2])
+            self.assertEqual(vault.count("POST"), 1)
+            self.assertEqual(len(vault.requests), requests + 2)
+            self.assertIn("/search?", vault.requests[-2][1])
+
+            # a term someone else added since the filter was built is a 406
+            other = vault.add_term("fac", "Ann Other")
+            self.assertEqual(taxo.add("Ann Other"), other)
+            self.assertIn("Ann Other", taxo.bloom)
+            self.assertNotEqual(existing, other)
+
+    def test_false_positive(self):
+        with FakeVault() as vault:
+            taxo = self.taxo()
+            taxo.add("Jane Doe")
+            # deleted terms stay in the filter, the search finds nothing
+            vault.deleted.append(vault.terms[0][2])
+            search_cache.clear()
+            taxo.terms.clear()
+            before = BLOOM.get(taxonomy=taxo.name, result="false_positive")
+            taxo.add("Jane Doe")
+            self.assertEqual(vault.count("POST"), 2)
+            after = BLOOM.get(taxonomy=taxo.name, result="false_positive")
+            self.assertEqual(after, before + 1)
+
+    def test_routes(self):
+        taxos = [
+            Taxonomy({"name": "ANIMA - COURSE LIST", "uuid": "1"}),
+            Taxonomy({"name": "ANIMA - faculty", "uuid": "2"}),
+        ]
+        TaxonomyRoutes(taxos).use_bloom(self.directory.name)
+        self.assertIsNone(taxos[0].bloom_path)
+        self.assertEqual(
+            taxos[1].bloom_path, os.path.join(self.directory.name, "2.json")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,57 @@
+import unittest
+
+from lib.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=3, ttl=10, clock=self.clock)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(("taxo", "q")))
+        self.cache.set(("taxo", "q"), [1])
+        self.assertEqual(self.cache.get(("taxo", "q")), [1])
+        self.assertTrue(("taxo", "q") in self.cache)
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+    def test_ttl(self):
+        self.cache.set(("taxo", "q"), [1])
+        self.clock.now = 10
+        self.assertFalse(("taxo", "q") in self.cache)
+        self.assertEqual(self.cache.get(("taxo", "q"), "expired"), "expired")
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        for i in range(3):
+            self.cache.set(("taxo", i), i)
+        # touch the oldest entry so the 2nd one is evicted instead
+        self.cache.get(("taxo", 0))
+        self.cache.set(("taxo", 3), 3)
+        self.assertEqual(len(self.cache), 3)
+        self.assertTrue(("taxo", 0) in self.cache)
+        self.assertFalse(("taxo", 1) in self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_invalidate(self):
+        self.cache.set(("a", "q1"), 1)
+        self.cache.set(("a", "q2"), 2)
+        self.cache.set(("b", "q1"), 3)
+        self.assertEqual(self.cache.invalidate("a"), 2)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get(("b", "q1")), 3)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
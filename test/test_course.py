@@ -1,4 +1,5 @@
 from html import unescape
+import json
 from textwrap import wrap
 import unittest
 
@@ -0,0 +1,74 @@
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from lib.course_db import CourseDB, fts_query
+
+FIXTURE = "test/courses-fixture.json"
+
+
+class TestCourseDB(unittest.TestCase):
+    def setUp(self):
+        self.db = CourseDB(":memory:")
+        self.db.load(FIXTURE)
+
+    def tearDown(self):
+        self.db.close()
+
+    def codes(self, rows) -> list[str]:
+        return [r["section_code"] for r in rows]
+
+    def test_queries(self):
+        self.assertEqual(len(self.db), 14)
+        self.assertEqual(
+            self.codes(self.db.by_instructor("dfortescue")), ["UDIST-3000-3"]
+        )
+        self.assertEqual(
+            self.codes(self.db.by_department("glass", "Spring_2020")), ["GLASS-2320-2"]
+        )
+        self.assertEqual(self.db.by_department("GLASS", "Fall 2020"), [])
+        # colocations are found from either side
+        self.assertEqual(
+            self.codes(self.db.colocated("GLASS-2320-2")), ["INDUS-2320-2"]
+        )
+        self.assertEqual(
+            self.codes(self.db.colocated("INDUS-2320-2")), ["GLASS-2320-2"]
+        )
+        self.assertEqual(self.db.colocated("NOPE-1000-1"), [])
+
+    def test_search(self):
+        self.assertEqual(
+            set(self.codes(self.db.search("glass"))),
+            {"GLASS-2320-2", "INDUS-2320-2", "UDIST-3000-6"},
+        )
+        # prefix match on the last word
+        self.assertEqual(self.codes(self.db.search("post-disc")), ["UDIST-3000-8"])
+        self.assertEqual(fts_query('3-D "Design'), '"3-D" """Design"*')
+
+    def test_incremental_load(self):
+        self.assertEqual(self.db.load(FIXTURE), {"skipped": True})
+        with open(FIXTURE) as fh:
+            courses = json.load(fh)
+        courses = [
+            c for c in copy.deepcopy(courses) if c["section_code"] != "UDIST-3000-3"
+        ]
+        glass = next(c for c in courses if c["section_code"] == "GLASS-2320-2")
+        glass["section_title"] = glass["course_title"] = "Hot Shop"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.json")
+            with open(path, "w") as fh:
+                json.dump(courses, fh)
+            counts = self.db.load(path)
+        self.assertEqual(
+            counts, {"added": 0, "updated": 1, "deleted": 1, "unchanged": 12}
+        )
+        self.assertEqual(self.db.by_instructor("dfortescue"), [])
+        # the title index follows updates
+        self.assertEqual(self.codes(self.db.search("hot shop")), ["GLASS-2320-2"])
+        self.assertNotIn("GLASS-2320-2", self.codes(self.db.search("glass")))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,33 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from lib import *
+
+
+class TestCsvSink(unittest.TestCase):
+    def test_outputs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, n) for n in ("a.csv", "b.csv.gz")]
+            with CsvSink(paths, buffer_rows=2) as sink:
+                sink.writerow(["a", "b"])
+                sink.writerows(["1", "x,y"] for _ in range(3))
+            self.assertEqual(sink.rows, 4)
+            expected = 'a,b\r\n' + '1,"x,y"\r\n' * 3
+            with open(paths[0], newline="") as fh:
+                self.assertEqual(fh.read(), expected)
+            with gzip.open(paths[1], "rt", newline="") as fh:
+                self.assertEqual(fh.read(), expected)
+
+    def test_buffered(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "a.csv")
+            with CsvSink([path], buffer_rows=10) as sink:
+                sink.writerow(["a"])
+                self.assertEqual(os.path.getsize(path), 0)
+            self.assertEqual(os.path.getsize(path), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,151 @@
+import copy
+import importlib
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from lib import *
+from test.fake_vault import FakeVault
+from test.test_scheduler import make_taxos
+
+# lib.get_taxos is shadowed by the get_taxos function so import the module
+get_taxos_module = importlib.import_module("lib.get_taxos")
+
+
+def created_paths(vault, terms=None) -> set:
+    """full paths of the terms POSTed to the fake VAULT, or of some of them"""
+    paths = {}
+    for taxo, body, uuid in vault.terms:
+        parent = paths.get(body["parentUuid"])
+        paths[uuid] = parent + "\\" + body["term"] if parent else body["term"]
+    if terms is None:
+        terms = vault.terms
+    return {paths[uuid] for _, _, uuid in terms}
+
+
+def by_code(courses, code) -> dict:
+    return next(c for c in courses if c["section_code"] == code)
+
+
+class TestCourseDaemon(unittest.TestCase):
+    def setUp(self):
+        with open("test/courses-fixture.json", "r") as file:
+            self.courses = [c for c in json.load(file) if c["term"] == "AP_Spring_2020"]
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "data.json")
+        self.write(self.courses)
+
+    def tearDown(self):
+        get_taxos_module._refreshed = False
+        self.directory.cleanup()
+
+    def write(self, courses):
+        with open(self.path, "w") as file:
+            json.dump(courses, file)
+        # make sure the file looks changed even within the mtime resolution
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + len(courses)))
+
+    def test_diff(self):
+        old = load_snapshot(self.path)
+        courses = copy.deepcopy(self.courses)
+        courses.remove(by_code(courses, "GLASS-2320-2"))
+        by_code(courses, "UDIST-3000-8")["instructors"][0]["last_name"] = "Doe"
+        # doesn't appear in any term
+        by_code(courses, "UDIST-3000-10")["enrollment"] = "99"
+        self.write(courses)
+        diff = diff_snapshots(old, load_snapshot(self.path))
+        self.assertEqual(diff.added, [])
+        self.assertEqual([c.section_code for c in diff.removed], ["GLASS-2320-2"])
+        self.assertEqual(
+            [(o.instructor_names, n.instructor_names) for o, n in diff.changed],
+            [("Gregory Hurcomb", "Gregory Doe")],
+        )
+
+    def test_apply_changes_only(self):
+        with FakeVault() as vault:
+            daemon = CourseDaemon(self.path, TaxonomyRoutes(make_taxos()))
+            self.assertTrue(daemon.poll())
+            self.assertIn("Spring 2020\\GLASS", created_paths(vault))
+
+            # nothing changed, nothing to do
+            requests = len(vault.requests)
+            self.assertFalse(daemon.poll())
+            self.assertEqual(len(vault.requests), requests)
+
+            courses = copy.deepcopy(self.courses)
+            courses.remove(by_code(courses, "GLASS-2320-2"))
+            by_code(courses, "UDIST-3000-8")["instructors"][0]["last_name"] = "Doe"
+            self.write(courses)
+            posted = len(vault.terms)
+            self.assertTrue(daemon.poll())
+            # GLASS-2320-2 was the only GLASS course & UDIST-3000-8 the only
+            # course with its title, from the UDIST & SYLLABUS course lists
+            self.assertEqual(vault.count("DELETE"), 4)
+            paths = created_paths(vault, vault.terms[posted:])
+            self.assertEqual(
+                paths,
+                {
+                    "Spring 2020\\Post-Disciplinary Design",
+                    "Spring 2020\\Post-Disciplinary Design\\Gregory Doe",
+                    "Spring 2020\\Post-Disciplinary Design\\Gregory Doe\\UDIST-3000-8",
+                    "Spring 2020\\UDIST\\Post-Disciplinary Design",
+                    "Spring 2020\\UDIST\\Post-Disciplinary Design\\Gregory Doe",
+                    "Spring 2020\\UDIST\\Post-Disciplinary Design\\Gregory Doe\\UDIST-3000-8",
+                    # in the UDIST & SYLLABUS faculty taxonomies
+                    "Gregory Doe",
+                },
+            )
+            status = daemon.status()
+            self.assertEqual(status["snapshots"], 2)
+            self.assertEqual(status["queue"], 0)
+            self.assertEqual(status["state"], "idle")
+
+    def test_remove_without_delete(self):
+        with FakeVault() as vault:
+            routes = TaxonomyRoutes(make_taxos())
+            glass = routes.route("GLASS").course_list.uuid
+            # an earlier run left a course this process never sees
+            semester = vault.add_term(glass, "Spring 2020")
+            title = vault.add_term(glass, "Glass Product Design", semester)
+            other = vault.add_term(glass, "Someone Else", title)
+            vault.add_term(glass, "GLASS-2320-9", other)
+
+            daemon = CourseDaemon(self.path, routes, delete=False)
+            self.assertTrue(daemon.poll())
+            courses = copy.deepcopy(self.courses)
+            courses.remove(by_code(courses, "GLASS-2320-2"))
+            self.write(courses)
+            self.assertTrue(daemon.poll())
+
+            # the shared title term survives, only the instructor term goes
+            paths = created_paths(vault, [t for t in vault.terms if t[0] == glass])
+            deleted = created_paths(
+                vault, [t for t in vault.terms if t[2] in vault.deleted]
+            )
+            self.assertIn("Spring 2020\\Glass Product Design\\Minami Oya", deleted)
+            self.assertNotIn("Spring 2020\\Glass Product Design", deleted)
+            self.assertIn(
+                "Spring 2020\\Glass Product Design\\Someone Else\\GLASS-2320-9",
+                paths - deleted,
+            )
+
+    def test_status_endpoint(self):
+        daemon = CourseDaemon(self.path, TaxonomyRoutes(make_taxos()))
+        port = daemon.serve_status(0)
+        try:
+            url = "http://127.0.0.1:{}".format(port)
+            with urllib.request.urlopen(url + "/status") as r:
+                status = json.load(r)
+            self.assertEqual(status["state"], "starting")
+            self.assertEqual(status["path"], self.path)
+            with urllib.request.urlopen(url + "/metrics") as r:
+                self.assertIn(b"# TYPE", r.read())
+        finally:
+            daemon.stop()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import importlib
+import json
+import unittest
+
+from lib import *
+from test.fake_vault import FakeVault
+from test.test_scheduler import make_taxos
+
+# lib.get_taxos is shadowed by the get_taxos function so import the module
+get_taxos_module = importlib.import_module("lib.get_taxos")
+
+
+class TestDeptIndex(unittest.TestCase):
+    def setUp(self):
+        # pretend we already refreshed so missing taxonomies don't download
+        get_taxos_module._refreshed = True
+        with open("test/courses-fixture.json", "r") as file:
+            courses = [Course(**c) for c in json.load(file)]
+        self.courses = [c for c in courses if c.semester == "Spring 2020"]
+        self.index = DeptIndex(self.courses)
+
+    def tearDown(self):
+        get_taxos_module._refreshed = False
+
+    def test_parse_depts(self):
+        self.assertEqual(parse_depts("anima, GLASS,"), ["ANIMA", "GLASS"])
+
+    def test_select(self):
+        selected = self.index.select(["GLASS"])
+        self.assertEqual(
+            [(c.section_code, set(d)) for c, d in selected],
+            [("GLASS-2320-2", {"GLASS", "SYLLABUS"})],
+        )
+        # Fine Arts courses filed under UDIST keep their SYLLABUS terms
+        depts = {c.section_code: d for c, d in self.index.select(["UDIST"])}
+        self.assertEqual(depts["UDIST-3000-1"], {"UDIST"})
+        self.assertEqual(depts["UDIST-3000-6"], {"SYLLABUS", "UDIST"})
+        self.assertEqual(self.index.unknown(["GLASS", "NOPE"]), ["NOPE"])
+
+    def test_semester_terms(self):
+        routes = TaxonomyRoutes(make_taxos())
+        terms = self.index.semester_terms(["GLASS"], routes, "Spring 2020")
+        self.assertEqual(
+            [(t.name, path) for t, path in terms],
+            [
+                ("GLASS - COURSE LIST", "Spring 2020"),
+                ("SYLLABUS - COURSE LIST", "Spring 2020\\GLASS"),
+            ],
+        )
+        terms = self.index.semester_terms(["SYLLABUS"], routes, "Spring 2020")
+        self.assertEqual(
+            [(t.name, path) for t, path in terms],
+            [("SYLLABUS - COURSE LIST", "Spring 2020")],
+        )
+
+    def test_partial_run(self):
+        with FakeVault() as vault:
+            routes = TaxonomyRoutes(make_taxos())
+            for course in sorted(self.courses, key=course_sort):
+                if course.on_portal:
+                    add_to_taxos(course, routes)
+            posted = len(vault.terms)
+
+            # a later run with fresh taxonomies fixes GLASS only
+            routes = TaxonomyRoutes(make_taxos())
+            for taxo, path in self.index.semester_terms(
+                ["GLASS"], routes, "Spring 2020"
+            ):
+                self.assertTrue(taxo.remove(path))
+            deleted = {
+                (taxo, body["term"])
+                for taxo, body, uuid in vault.terms
+                if uuid in vault.deleted
+            }
+            glass = routes.route("GLASS").course_list.uuid
+            syllabus = routes.route("SYLLABUS").course_list.uuid
+            self.assertEqual(deleted, {(glass, "Spring 2020"), (syllabus, "GLASS")})
+
+            for course, depts in self.index.select(["GLASS"]):
+                add_to_taxos(course, routes, depts=depts)
+            # only the deleted terms were created again
+            names = {t.uuid: t.name for t in routes.taxos}
+            names = {names[t] for t, _, _ in vault.terms[posted:]}
+            self.assertEqual(names, {"GLASS - COURSE LIST", "SYLLABUS - COURSE LIST"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from lib import *
+
+FAKE_GCLOUD = (
+    sys.executable,
+    os.path.join(os.path.dirname(__file__), "fake_gcloud.py"),
+)
+
+
+class TestCourseDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bucket = os.path.join(self.tmp.name, "bucket")
+        os.mkdir(self.bucket)
+        os.environ["FAKE_GCS_DIR"] = self.bucket
+        self.downloader = CourseDownloader(
+            os.path.join(self.tmp.name, "cache"), gcloud=FAKE_GCLOUD, max_files=2
+        )
+
+    def tearDown(self):
+        del os.environ["FAKE_GCS_DIR"]
+        self.tmp.cleanup()
+
+    def upload(self, term, text):
+        name = "course_section_data_AP_{}.json".format(term)
+        with open(os.path.join(self.bucket, name), "w") as fh:
+            fh.write(text)
+
+    def copies(self) -> int:
+        with open(os.path.join(self.bucket, "calls.log")) as fh:
+            return len([l for l in fh if l.startswith("storage cp")])
+
+    def test_fetch_terms(self):
+        self.upload("Fall_2023", "[1]")
+        self.upload("Spring_2024", "[2]")
+        paths = self.downloader.fetch_terms(["Fall_2023", "Spring_2024"])
+        with open(paths["Spring_2024"]) as fh:
+            self.assertEqual(fh.read(), "[2]")
+        # files are named after their content
+        self.assertEqual(
+            paths["Fall_2023"], self.downloader.path_for(file_md5(paths["Fall_2023"]))
+        )
+        self.assertEqual(self.copies(), 2)
+
+        # unchanged objects aren't copied again
+        path = self.downloader.fetch_terms(["Fall_2023"])["Fall_2023"]
+        self.assertEqual(path, paths["Fall_2023"])
+        self.assertEqual(self.copies(), 2)
+
+        # changed objects are
+        self.upload("Fall_2023", "[3]")
+        path = self.downloader.fetch_terms(["Fall_2023"])["Fall_2023"]
+        self.assertNotEqual(path, paths["Fall_2023"])
+        self.assertEqual(self.copies(), 3)
+
+    def test_evict(self):
+        paths = []
+        for i, term in enumerate(["Fall_2022", "Spring_2023", "Summer_2023"]):
+            self.upload(term, "[{}]".format(i))
+            paths.append(self.downloader.fetch_terms([term])[term])
+            # make the order of use unambiguous
+            os.utime(paths[-1], (i, i))
+        # only the two most recently used files are kept
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+
+    def test_no_md5(self):
+        uri = "gs://int_files_source/upload.composite.json"
+        with open(os.path.join(self.bucket, "upload.composite.json"), "w") as fh:
+            fh.write("[4]")
+        path = self.downloader.fetch(uri)
+        with open(path) as fh:
+            self.assertEqual(fh.read(), "[4]")
+        self.assertEqual(path, self.downloader.path_for(file_md5(path)))
+        # without a checksum to compare we always download
+        self.assertEqual(self.downloader.fetch(uri), path)
+        self.assertEqual(self.copies(), 2)
+
+    def test_missing_object(self):
+        with self.assertRaises(DownloadError):
+            self.downloader.fetch_terms(["Fall_1999"])
+
+    def test_runner(self):
+        calls = []
+
+        def runner(args):
+            calls.append(args)
+            raise DownloadError("offline")
+
+        downloader = CourseDownloader(self.downloader.directory, runner=runner)
+        with self.assertRaises(DownloadError):
+            downloader.fetch_terms(["Fall_2023"])
+        self.assertEqual(calls[0][:4], ["gcloud", "storage", "objects", "describe"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
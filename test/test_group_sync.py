@@ -0,0 +1,99 @@
+import importlib
+import os
+import tempfile
+import unittest
+
+from lib import *
+from test.fake_vault import FakeVault
+
+# lib.get_groups is shadowed by the get_groups function so import the module
+get_groups_module = importlib.import_module("lib.get_groups")
+
+GROUPS = {
+    "arch": {"name": "Architecture Division Faculty", "users": ["archie", "gone"]},
+    "anima": {"name": "Animation Faculty", "users": ["ani"]},
+    "print": {"name": "Printmedia Faculty", "users": ["printy"]},
+}
+TEACHING = {
+    "BARCH": {"archie"},
+    "INTER": {"inter"},
+    "ANIMA": {"ani"},
+    "PRINT": {"printy", "newprint"},
+    "CCA": {"nobody"},
+    "NOTADEPT": {"nobody"},
+}
+
+
+class TestGroupSync(unittest.TestCase):
+    def test_desired_membership(self):
+        groups = [Group({"id": u, "name": g["name"]}) for u, g in GROUPS.items()]
+        desired = desired_membership(TEACHING, groups)
+        by_name = {g.name: users for g, users in desired.items()}
+        # two departments share the architecture group
+        self.assertEqual(by_name["Architecture Division Faculty"], {"archie", "inter"})
+        self.assertEqual(by_name["Printmedia Faculty"], {"printy", "newprint"})
+        self.assertEqual(len(desired), 3)
+
+    def test_sync(self):
+        with FakeVault(GROUPS) as vault:
+            groups = [Group(g) for g in vault.group_dicts()]
+            changes = plan_sync(desired_membership(TEACHING, groups), remove=True)
+            # one GET per group
+            self.assertEqual(vault.count("GET"), 3)
+            by_name = {c.group.name: c for c in changes}
+            arch = by_name["Architecture Division Faculty"]
+            self.assertEqual(arch.adds, {"inter"})
+            self.assertEqual(arch.removes, {"gone"})
+            self.assertFalse(by_name["Animation Faculty"].adds)
+
+            report = format_report(changes)
+            self.assertIn("  - gone", report)
+            self.assertIn("  + newprint", report)
+            self.assertNotIn("Animation Faculty", report)
+
+            # at most one PUT per changed group
+            applied = apply_sync(changes)
+            self.assertEqual(len(applied), 2)
+            self.assertEqual(vault.count("PUT"), 2)
+            self.assertEqual(vault.groups["arch"]["users"], {"archie", "inter"})
+
+            # nothing left to do
+            changes = plan_sync(desired_membership(TEACHING, groups), remove=True)
+            self.assertEqual(format_report(changes), "No faculty group changes.")
+
+    def test_add_only(self):
+        with FakeVault(GROUPS) as vault:
+            groups = [Group(g) for g in vault.group_dicts()]
+            # the default only adds users
+            changes = plan_sync(desired_membership(TEACHING, groups))
+            apply_sync(changes)
+            self.assertEqual(vault.groups["arch"]["users"], {"archie", "gone", "inter"})
+
+    def test_refresh_groups(self):
+        directory = tempfile.TemporaryDirectory()
+        groups_file = get_groups_module.groups_file
+        get_groups_module.groups_file = os.path.join(directory.name, "groups.json")
+        try:
+            with FakeVault(GROUPS) as vault:
+                # Printmedia Faculty was created after groups.json was cached
+                groups = [Group(g) for g in vault.group_dicts() if g["id"] != "print"]
+                desired = desired_membership(TEACHING, groups)
+                self.assertEqual(len(desired), 3)
+                self.assertIn("print", [g.uuid for g in groups])
+                # a group that is still missing doesn't download the list again
+                groups = [g for g in groups if g.uuid != "anima"]
+                self.assertEqual(len(desired_membership(TEACHING, groups)), 2)
+                listings = [
+                    path
+                    for method, path in vault.requests
+                    if path.startswith("/api/usermanagement/local/group?")
+                ]
+                self.assertEqual(len(listings), 1)
+        finally:
+            get_groups_module.groups_file = groups_file
+            get_groups_module._refreshed = False
+            directory.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,8 +1,10 @@
 import filecmp
 import os
+import time
 import unittest
 
 from lib import *
+from test.fake_vault import FakeVault
 
 
 class TestGroupData(unittest.TestCase):
@@ -78,5 +80,75 @@ class TestGroupClass(unittest.TestCase):
         os.remove("data/None.txt")
 
 
+class TestGroupPrefetch(unittest.TestCase):
+    def test_reverse_index(self):
+        # first academic unit listed wins when units share a group
+        self.assertEqual(
+            group_index["Architecture Division Faculty"], ("BARCH", "fac_ar")
+        )
+        self.assertEqual(group_index["Printmedia Faculty"], ("PRINT", "fac_pm"))
+        self.assertFalse(None in group_index)
+        group = Group({"id": "1", "name": "Architecture Division Faculty"})
+        self.assertEqual((group.au, group.ldap), ("BARCH", "fac_ar"))
+        other = Group({"id": "2", "name": "Not a Faculty Group"})
+        self.assertEqual((other.au, other.ldap), (None, None))
+
+    def test_prefetch_users(self):
+        members_cache.clear()
+        groups = {
+            str(i): {"name": "Group {}".format(i), "users": ["user{}".format(i)]}
+            for i in range(6)
+        }
+        # each request takes 0.2s, serially 6 groups would take 1.2s
+        with FakeVault(groups, delay=0.2) as vault:
+            groups = [Group(g) for g in vault.group_dicts()]
+            start = time.time()
+            prefetch_users(groups)
+            self.assertTrue(time.time() - start < 1)
+            self.assertEqual(vault.count("GET"), 6)
+            self.assertEqual(groups[0].users, {"user0"})
+            self.assertTrue(groups[0]._have_gotten_users)
+            # later calls come from the cache
+            fresh = Group(vault.group_dicts()[0])
+            fresh.get_users()
+            prefetch_users(groups)
+            self.assertEqual(vault.count("GET"), 6)
+            self.assertEqual(fresh.users, {"user0"})
+            fresh.get_users(refresh=True)
+            self.assertEqual(vault.count("GET"), 7)
+
+
+class TestGroupStaging(unittest.TestCase):
+    def test_commit(self):
+        members_cache.clear()
+        groups = {"g": {"name": "Animation Faculty", "users": ["a", "b"]}}
+        with FakeVault(groups) as vault:
+            group = Group(vault.group_dicts()[0])
+            group.add_users(["c", "d"], commit=False)
+            group.remove_users("a", commit=False)
+            group.add_users("a", commit=False)  # cancels the removal
+            group.remove_users(["d", "not a member"], commit=False)
+            self.assertEqual(group.users, {"a", "b", "c"})
+            self.assertTrue(group.has_changes)
+            self.assertEqual(vault.count("PUT"), 0)
+            group.commit()
+            self.assertEqual(vault.count("PUT"), 1)
+            self.assertEqual(vault.groups["g"]["users"], {"a", "b", "c"})
+            self.assertFalse(group.has_changes)
+
+            # net change of nothing sends nothing
+            group.add_users("e", commit=False).remove_users("e", commit=False)
+            group.commit()
+            group.remove_users("not a member")
+            group.add_users(["a", "b"])
+            self.assertEqual(vault.count("PUT"), 1)
+
+            # set_users stages the difference
+            group.set_users(["b", "z"])
+            self.assertEqual(vault.count("PUT"), 2)
+            self.assertEqual(vault.groups["g"]["users"], {"b", "z"})
+            self.assertEqual(vault.count("GET"), 1)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
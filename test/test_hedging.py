@@ -0,0 +1,138 @@
+import importlib
+import unittest
+
+from lib import *
+from test.fake_vault import FakeVault
+
+from requests.exceptions import Timeout
+
+import config
+
+# lib.hedging holds the thresholds, import the module itself
+hedging = importlib.import_module("lib.hedging")
+
+UUID = "123a4567-abcd-9876-edcb-4321fedc1234"
+
+
+class TestTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.timeouts = getattr(config, "timeouts", {})
+
+    def tearDown(self):
+        config.timeouts = self.timeouts
+
+    def test_timeout_for(self):
+        self.assertEqual(timeout_for("GET /taxonomy"), TIMEOUTS["GET /taxonomy"])
+        # query parameters fall back to the endpoint without them
+        self.assertEqual(
+            timeout_for("GET /taxonomy/{uuid}/term?path"),
+            TIMEOUTS["GET /taxonomy/{uuid}/term"],
+        )
+        self.assertEqual(timeout_for("GET /nope"), DEFAULT_TIMEOUT)
+        config.timeouts = {"GET /nope": (1, 2)}
+        self.assertEqual(timeout_for("GET /nope"), (1, 2))
+
+    def test_request_timeout(self):
+        config.timeouts = {"GET /taxonomy/{uuid}/term": (1, 0.2)}
+        with FakeVault(delay=0.5):
+            s = request_wrapper()
+            with self.assertRaises(Timeout):
+                s.get("{}/taxonomy/{}/term".format(config.api_root, UUID))
+            s.close()
+
+
+class TestHedging(unittest.TestCase):
+    endpoint = "GET /taxonomy/{uuid}/term"
+
+    def setUp(self):
+        latencies.latencies.clear()
+
+    def url(self):
+        # the FakeVault changes api_root
+        return "{}/taxonomy/{}/term".format(config.api_root, UUID)
+
+    def prime(self, seconds=0.01):
+        for _ in range(hedging.MIN_SAMPLES):
+            latencies.observe(self.endpoint, seconds)
+
+    def hedges(self, result):
+        return HEDGES.get(endpoint=self.endpoint, result=result)
+
+    def test_window(self):
+        window = LatencyWindow(size=30)
+        for i in range(hedging.MIN_SAMPLES - 1):
+            window.observe("GET /x", 1)
+        self.assertIsNone(window.p95("GET /x"))
+        for i in range(100):
+            window.observe("GET /x", i)
+        self.assertEqual(len(window.latencies["GET /x"]), 30)
+        self.assertGreater(window.p95("GET /x"), 90)
+
+    def test_no_hedge_without_samples(self):
+        with FakeVault() as vault:
+            vault.delays = [0.3]
+            s = request_wrapper()
+            sent = self.hedges("sent")
+            s.get(self.url()).raise_for_status()
+            self.assertEqual(vault.count("GET"), 1)
+            self.assertEqual(self.hedges("sent"), sent)
+            # the attempt's latency was recorded
+            self.assertEqual(len(latencies.latencies[self.endpoint]), 1)
+            s.close()
+
+    def test_hedge(self):
+        with FakeVault() as vault:
+            vault.add_term(UUID, "Spring 2020")
+            self.prime()
+            # the first attempt is stuck, the hedge answers
+            vault.delays = [2]
+            s = request_wrapper()
+            sent, won = self.hedges("sent"), self.hedges("won")
+            r = s.get(self.url())
+            self.assertEqual(r.json()[0]["term"], "Spring 2020")
+            self.assertEqual(vault.count("GET"), 2)
+            self.assertEqual(self.hedges("sent"), sent + 1)
+            self.assertEqual(self.hedges("won"), won + 1)
+            self.assertIn(self.endpoint, format_hedges())
+            s.close()
+
+    def test_fast_request_not_hedged(self):
+        with FakeVault() as vault:
+            self.prime(seconds=1)
+            s = request_wrapper()
+            s.get(self.url())
+            self.assertEqual(vault.count("GET"), 1)
+            s.close()
+
+    def test_busy_workers(self):
+        # with every worker busy the GET is sent from this thread, unhedged
+        for _ in range(hedging.WORKERS):
+            hedging._slots.acquire()
+        try:
+            with FakeVault() as vault:
+                self.prime()
+                vault.delays = [0.3]
+                s = request_wrapper()
+                s.get(self.url())
+                self.assertEqual(vault.count("GET"), 1)
+                s.close()
+        finally:
+            for _ in range(hedging.WORKERS):
+                hedging._slots.release()
+
+    def test_hedging_off(self):
+        config.hedging = False
+        try:
+            with FakeVault() as vault:
+                self.prime()
+                vault.delays = [0.3]
+                s = request_wrapper()
+                s.get(self.url())
+                self.assertEqual(vault.count("GET"), 1)
+                s.close()
+        finally:
+            config.hedging = True
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,36 @@
+import unittest
+
+from lib import *
+import make_informer_csv
+
+
+class TestInformerCsv(unittest.TestCase):
+    def setUp(self):
+        files = ["test/courses-fixture.json"]
+        self.courses = list(make_informer_csv.load_courses(files))
+
+    def test_colocation_index(self):
+        index = make_informer_csv.colocation_index(self.courses)
+        for course in self.courses:
+            self.assertEqual(
+                make_informer_csv.make_course_row(course, self.courses, index),
+                make_informer_csv.make_course_row(course, self.courses),
+            )
+
+    def test_asciize(self):
+        self.assertEqual(make_informer_csv.asciize("Staff"), "Staff")
+        self.assertEqual(make_informer_csv.asciize("Zoë Ångström"), "Zoe Angstrom")
+        self.assertEqual(make_informer_csv.asciize("東京"), "")
+
+    def test_informer_rows(self):
+        rows = list(make_informer_csv.informer_rows(self.courses))
+        self.assertTrue(rows)
+        # same order as the courses file
+        sections = [c.section_code for c in self.courses]
+        self.assertEqual(
+            [r[4] for r in rows], sorted((r[4] for r in rows), key=sections.index)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from lib import *
+
+TEACHING = {
+    # all three share fac_ar
+    "BARCH": {"archie", "shared"},
+    "INTER": {"inter", "shared"},
+    "MARCH": {"archie"},
+    "ANIMA": {"ani"},
+    # no LDAP group
+    "CCA": {"nobody"},
+    # not in the map at all
+    "NOTADEPT": {"nobody"},
+    None: {"nobody"},
+}
+
+
+class TestLdapExport(unittest.TestCase):
+    def test_ldap_membership(self):
+        membership = ldap_membership(TEACHING)
+        self.assertEqual(membership["fac_ar"], {"archie", "inter", "shared"})
+        self.assertEqual(membership["fac_an"], {"ani"})
+        self.assertEqual(len(membership), 2)
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            changes = export_ldap(ldap_membership(TEACHING), directory)
+            with open(os.path.join(directory, "fac_ar.txt")) as fh:
+                # written once, sorted, deduplicated & newline-terminated
+                self.assertEqual(fh.read(), "archie\ninter\nshared\n")
+            self.assertEqual(len(changes), 2)
+
+            with open(os.path.join(directory, "ldap-changes.txt")) as fh:
+                first = fh.read()
+            self.assertEqual(first, format_changes(changes))
+
+            # same data => same files & nothing to report, the unapplied
+            # changes are kept
+            self.assertEqual(export_ldap(ldap_membership(TEACHING), directory), [])
+            with open(os.path.join(directory, "ldap-changes.txt")) as fh:
+                self.assertEqual(fh.read(), first)
+
+            # ANIMA has no instructors this run
+            teaching = dict(TEACHING, INTER={"newbie"})
+            del teaching["ANIMA"]
+            # a dry run reports the changes without writing anything
+            changes = export_ldap(ldap_membership(teaching), directory, dry_run=True)
+            self.assertEqual(changes, [LdapChange("fac_ar", {"newbie"}, {"inter"})])
+            with open(os.path.join(directory, "fac_ar.txt")) as fh:
+                self.assertEqual(fh.read(), "archie\ninter\nshared\n")
+            with open(os.path.join(directory, "ldap-changes.txt")) as fh:
+                self.assertEqual(fh.read(), first)
+
+            changes = export_ldap(ldap_membership(teaching), directory)
+            self.assertEqual(changes, [LdapChange("fac_ar", {"newbie"}, {"inter"})])
+            with open(os.path.join(directory, "ldap-changes.txt")) as fh:
+                self.assertEqual(fh.read(), first + "fac_ar (+1 -1)\n+newbie\n-inter\n")
+            # groups with no instructors this run are left alone, not emptied
+            with open(os.path.join(directory, "fac_an.txt")) as fh:
+                self.assertEqual(fh.read(), "ani\n")
+            self.assertNotIn("fac_an", [c.ldap for c in changes])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
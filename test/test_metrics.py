@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+
+from lib.metrics import *
+from test.test_tracing import fake_response, TAXO
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        terms = self.registry.counter("terms_total", "terms", ["taxonomy", "result"])
+        terms.inc(taxonomy="TESTS", result="created")
+        terms.inc(2, taxonomy="TESTS", result="created")
+        self.assertEqual(terms.get(taxonomy="TESTS", result="created"), 3)
+        self.assertEqual(terms.get(taxonomy="TESTS", result="deleted"), 0)
+        with self.assertRaises(ValueError):
+            terms.inc(taxonomy="TESTS")
+
+        gauge = self.registry.gauge("courses", "courses", ["state"])
+        gauge.set(14, state="parsed")
+        gauge.set(11, state="parsed")
+        self.registry.const_labels["script"] = "app"
+        text = self.registry.expose()
+        self.assertIn("# TYPE terms_total counter", text)
+        self.assertIn('terms_total{script="app",taxonomy="TESTS",result="created"} 3', text)
+        self.assertIn('courses{script="app",state="parsed"} 11', text)
+
+    def test_histogram(self):
+        hist = self.registry.histogram("latency", "latency", ["endpoint"], (0.1, 1))
+        for value in (0.05, 0.5, 2):
+            hist.observe(value, endpoint="GET /taxonomy")
+        self.assertEqual(hist.get(endpoint="GET /taxonomy"), 3)
+        text = self.registry.expose()
+        self.assertIn('latency_bucket{endpoint="GET /taxonomy",le="0.1"} 1', text)
+        self.assertIn('latency_bucket{endpoint="GET /taxonomy",le="1"} 2', text)
+        self.assertIn('latency_bucket{endpoint="GET /taxonomy",le="+Inf"} 3', text)
+        self.assertIn('latency_count{endpoint="GET /taxonomy"} 3', text)
+        self.assertIn('latency_sum{endpoint="GET /taxonomy"} 2.55', text)
+
+    def test_label_escaping(self):
+        self.assertEqual(
+            format_labels((("title", 'say "hi"\\'),)), '{title="say \\"hi\\"\\\\"}'
+        )
+
+    def test_textfile(self):
+        self.registry.counter("runs_total", "runs").inc()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = tmp + "/course_lists.prom"
+            self.registry.write_textfile(path)
+            with open(path) as fh:
+                self.assertIn("runs_total 1\n", fh.read())
+            self.assertEqual(os.listdir(tmp), ["course_lists.prom"])
+
+    def test_observe_response(self):
+        url = "https://vault.cca.edu/api/taxonomy/{}/term".format(TAXO)
+        endpoint = "POST /taxonomy/{uuid}/term"
+        before = HTTP_LATENCY.get(endpoint=endpoint)
+        observe_response(fake_response("POST", url, status=201))
+        self.assertEqual(HTTP_LATENCY.get(endpoint=endpoint), before + 1)
+        self.assertTrue(HTTP_REQUESTS.get(endpoint=endpoint, status=201) >= 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
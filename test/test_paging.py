@@ -0,0 +1,79 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import tempfile
+import threading
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+from lib.paging import *
+from lib.utilities import read_cache
+
+RESULTS = [{"name": "taxo {}".format(i), "uuid": str(i)} for i in range(23)]
+
+
+class PagedHandler(BaseHTTPRequestHandler):
+    # like the openEQUELLA API, caps page length at 10
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        start = int(query["start"][0])
+        length = min(int(query["length"][0]), 10)
+        if self.path.startswith("/unpaged"):
+            body = {"results": RESULTS}
+        else:
+            body = {
+                "start": start,
+                "length": length,
+                "available": len(RESULTS),
+                "results": RESULTS[start : start + length],
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPaging(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PagedHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.root = "http://127.0.0.1:{}".format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_iter_results(self):
+        results = list(iter_results(self.root + "/taxonomy", page_size=5))
+        self.assertEqual(results, RESULTS)
+        # server caps length at 10 even though we ask for more
+        results = list(iter_results(self.root + "/taxonomy", page_size=50))
+        self.assertEqual(results, RESULTS)
+        results = list(iter_results(self.root + "/unpaged", page_size=5))
+        self.assertEqual(results, RESULTS)
+
+    def test_cache_file_writer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "taxonomies.json")
+            with CacheFileWriter(path) as writer:
+                for result in iter_results(self.root + "/taxonomy", page_size=7):
+                    writer.write(result)
+            self.assertEqual(writer.count, len(RESULTS))
+            self.assertEqual(read_cache(path, 60)["results"], RESULTS)
+
+            # a failed listing leaves the old file alone
+            with self.assertRaises(RuntimeError):
+                with CacheFileWriter(path) as writer:
+                    writer.write(RESULTS[0])
+                    raise RuntimeError("connection dropped")
+            self.assertEqual(read_cache(path, 60)["results"], RESULTS)
+            self.assertEqual(os.listdir(tmp), ["taxonomies.json"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
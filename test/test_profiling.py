@@ -0,0 +1,63 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from lib import *
+
+
+def allocate():
+    return ["x" * 100 + str(i) for i in range(20000)]
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+class TestProfiler(unittest.TestCase):
+    def test_argument(self):
+        parser = argparse.ArgumentParser()
+        add_profile_argument(parser)
+        self.assertTrue(parser.parse_args(["--profile"]).profile)
+        self.assertFalse(parser.parse_args([]).profile)
+
+    def test_function_at(self):
+        name = function_at(__file__, allocate.__code__.co_firstlineno + 1)
+        self.assertEqual(
+            name,
+            "allocate (test_profiling.py:{})".format(allocate.__code__.co_firstlineno),
+        )
+        self.assertEqual(function_at(__file__, 1), "<module> (test_profiling.py:1)")
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                with Profiler("test", directory=directory):
+                    kept = allocate()
+                    busy(0.1)
+            self.assertEqual(len(kept), 20000)
+            stem = glob.glob(os.path.join(directory, "test-*.prof"))[0][:-5]
+
+            with open(stem + ".collapsed") as fh:
+                stacks = fh.read()
+            self.assertIn("busy (test_profiling.py", stacks)
+            with open(stem + "-memory.txt") as fh:
+                memory = fh.read()
+            functions = memory.split("by function:")[1].split("by line:")[0]
+            # the workload's list is the biggest allocation
+            self.assertIn(
+                "allocate (test_profiling.py", functions.strip().split("\n")[0]
+            )
+            self.assertGreater(os.path.getsize(stem + ".prof"), 0)
+        self.assertIn("functions by allocated bytes", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+import importlib
+import unittest
+
+from lib import *
+
+# lib.get_taxos is shadowed by the get_taxos function so import the module
+get_taxos_module = importlib.import_module("lib.get_taxos")
+
+
+def make_taxos(names):
+    return [Taxonomy({"name": n, "uuid": str(i)}) for i, n in enumerate(names)]
+
+
+class TestTaxonomyRoutes(unittest.TestCase):
+    def setUp(self):
+        # pretend we already refreshed so missing taxonomies don't download
+        get_taxos_module._refreshed = True
+        self.taxos = make_taxos(
+            [
+                "ANIMA - COURSE LIST",
+                "ANIMA - course sections",
+                "ANIMA - course names",
+                "ANIMA - course titles",
+                "ANIMA - faculty",
+                "ARCH DIV - COURSE LIST",
+                "TESTS",
+            ]
+        )
+        self.routes = TaxonomyRoutes(self.taxos)
+
+    def tearDown(self):
+        get_taxos_module._refreshed = False
+
+    def test_case_insensitive(self):
+        taxos = make_taxos(["Glass - course list", "GLASS - Faculty"])
+        route = TaxonomyRoutes(taxos).route("GLASS")
+        self.assertEqual(route.course_list, taxos[0])
+        self.assertEqual(route.faculty, taxos[1])
+        self.assertEqual(TaxonomyRoutes(taxos).route("glass").faculty, taxos[1])
+
+    def test_route(self):
+        route = self.routes.route("ANIMA")
+        self.assertEqual(route.course_list, self.taxos[0])
+        self.assertEqual(route.faculty, self.taxos[4])
+        self.assertEqual(route.missing(), [])
+        arch = self.routes.route("ARCH DIV")
+        self.assertEqual(arch.course_list, self.taxos[5])
+        self.assertEqual(arch.missing(True), [])
+        self.assertEqual(arch.missing()[0], "ARCH DIV - course sections")
+        self.assertEqual(self.routes.route("NOPE").missing(True), ["NOPE - COURSE LIST"])
+
+    def test_taxonomy(self):
+        self.assertEqual(self.routes.taxonomy("anima - course list"), self.taxos[0])
+        self.assertEqual(self.routes.taxonomy("TESTS"), self.taxos[6])
+        self.assertIsNone(self.routes.taxonomy("taxo that doesn't exist"))
+
+    def test_check(self):
+        with self.assertLogs(level="ERROR") as logs:
+            missing = self.routes.check(["ANIMA", "ARCH DIV", "ANIMA"], True)
+            self.assertEqual(missing, [])
+            missing = self.routes.check(["ANIMA", "ARCH DIV"])
+            self.assertEqual(len(missing), 4)
+            # already reported, nothing else is logged
+            self.routes.check(["ARCH DIV"])
+        self.assertEqual(len(logs.output), 1)
+
+    def test_routes_for(self):
+        self.assertIs(routes_for(self.routes), self.routes)
+        routes = routes_for(self.taxos)
+        self.assertIs(routes_for(self.taxos), routes)
+        self.taxos.extend(make_taxos(["CERAM - COURSE LIST"]))
+        self.assertIsNotNone(routes_for(self.taxos).route("CERAM").course_list)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+import json
+import unittest
+
+from lib import *
+
+
+class TestRules(unittest.TestCase):
+    courses = []
+
+    def setUp(self):
+        with open("test/courses-fixture.json", "r") as file:
+            data = json.load(file)
+            self.courses = [Course(**c) for c in data]
+
+    def test_lookup_route(self):
+        self.assertEqual(
+            lookup_route("ANIMA", "ANIMA"),
+            CourseRoute(frozenset(["SYLLABUS", "ANIMA"]), "ANIMA"),
+        )
+        # memoized
+        self.assertIs(lookup_route("ANIMA", "ANIMA"), lookup_route("ANIMA", "ANIMA"))
+        for owner in ARCH_DIV:
+            self.assertEqual(
+                lookup_route(owner, "ARCHT"),
+                CourseRoute(frozenset(["SYLLABUS", "ARCH DIV"]), owner),
+            )
+        self.assertEqual(lookup_route("TESTS", "TESTS").depts, frozenset(["TESTS"]))
+        self.assertEqual(lookup_route("CCA", "EXCHG"), CourseRoute(frozenset(), None))
+        self.assertEqual(lookup_route("FA", "CRITI").informer, "CRITI")
+        self.assertEqual(lookup_route("FA", "FNART"), CourseRoute(frozenset(), None))
+        self.assertEqual(lookup_route("FA", "OTHER").depts, frozenset(["SYLLABUS"]))
+        self.assertIsNone(lookup_route("PRECO", "PRECO").informer)
+        self.assertEqual(lookup_route("PRECO", "PRECO").depts, {"SYLLABUS", "PRECO"})
+        # extension courses route like any other, Course.on_portal skips them
+        self.assertEqual(
+            lookup_route("EXTED", "EXTED"),
+            CourseRoute(frozenset(["SYLLABUS", "EXTED"]), "EXTED"),
+        )
+        self.assertEqual(lookup_route(None, "ANIMA"), CourseRoute(frozenset(), None))
+
+    def test_get_depts(self):
+        # same cases as test_add_taxos.testGetDepts, which needs VAULT
+        inter = next(c for c in self.courses if c.owner == "INTER")
+        self.assertEqual(get_depts(inter), set(["ARCH DIV", "SYLLABUS"]))
+        cca = next(c for c in self.courses if c.owner == "CCA")
+        self.assertEqual(get_depts(cca), set())
+        criti = next(
+            c for c in self.courses if c.owner == "FA" and c.subject == "CRITI"
+        )
+        self.assertEqual(get_depts(criti), set(["UDIST", "SYLLABUS"]))
+        self.assertEqual(route_course(criti).informer, "CRITI")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
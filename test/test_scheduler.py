@@ -0,0 +1,130 @@
+import importlib
+import json
+import tempfile
+import unittest
+
+from lib import *
+from test.fake_vault import FakeVault
+
+# lib.get_taxos is shadowed by the get_taxos function so import the module
+get_taxos_module = importlib.import_module("lib.get_taxos")
+hedging = importlib.import_module("lib.hedging")
+DEPTS = ["CORES", "FINAR", "GLASS", "SYLLABUS", "UDIST"]
+
+
+def make_taxos():
+    names = ["{} - {}".format(d, suffix) for d in DEPTS for suffix in KINDS.values()]
+    return [Taxonomy({"name": n, "uuid": str(i)}) for i, n in enumerate(names)]
+
+
+def created_paths(vault) -> set:
+    """(taxonomy uuid, full path) of every term POSTed to the fake VAULT"""
+    paths = {}
+    for taxo, body, uuid in vault.terms:
+        parent = paths.get(body["parentUuid"])
+        paths[uuid] = (
+            taxo,
+            parent[1] + "\\" + body["term"] if parent else body["term"],
+        )
+    return set(paths.values())
+
+
+class TestTermScheduler(unittest.TestCase):
+    def setUp(self):
+        # pretend we already refreshed so missing taxonomies don't download
+        get_taxos_module._refreshed = True
+        with open("test/courses-fixture.json", "r") as file:
+            courses = [Course(**c) for c in json.load(file)]
+        self.courses = sorted([c for c in courses if c.on_portal], key=course_sort)
+
+    def tearDown(self):
+        get_taxos_module._refreshed = False
+        tracer.disable().reset()
+
+    def test_same_terms_as_one_course_at_a_time(self):
+        with FakeVault() as vault:
+            routes = TaxonomyRoutes(make_taxos())
+            for course in self.courses:
+                add_to_taxos(course, routes)
+            expected = created_paths(vault)
+
+        with FakeVault(delay=0.01) as vault:
+            scheduler = TermScheduler(workers=8)
+            routes = TaxonomyRoutes(make_taxos())
+            for course in self.courses:
+                scheduler.add_course(course, routes)
+            self.assertEqual(scheduler.run(), len(expected))
+            self.assertEqual(created_paths(vault), expected)
+            # every child was POSTed with its parent's UUID
+            uuids = {uuid for _, _, uuid in vault.terms}
+            for _, body, _ in vault.terms:
+                self.assertIn(body["parentUuid"], uuids | {None})
+            # branches ran at the same time, within the per-taxonomy limit
+            self.assertEqual(max(vault.max_inflight.values()), PER_TAXONOMY)
+
+    def test_hedges_within_per_taxonomy_limit(self):
+        directory = tempfile.TemporaryDirectory()
+        search_cache.clear()
+        hedging.latencies.latencies.clear()
+        with FakeVault() as vault:
+            faculty = Taxonomy({"name": "GLASS - faculty", "uuid": "fac"})
+            titles = Taxonomy({"name": "GLASS - course titles", "uuid": "tit"})
+            names = {faculty: ["A", "B", "C", "D", "E"], titles: ["Glass 1"]}
+            scheduler = TermScheduler(workers=8)
+            for taxo, terms in names.items():
+                for term in terms:
+                    vault.add_term(taxo.uuid, term)
+                    scheduler.add_term(Term({"term": term}), taxo)
+                # build the filters now, every term is then confirmed by a
+                # search the hedging has seen be fast
+                taxo.use_bloom(directory.name)
+                taxo.bloom
+                endpoint = "GET /taxonomy/{}/search?limit&q&restriction".format(
+                    taxo.uuid
+                )
+                for _ in range(hedging.MIN_SAMPLES):
+                    hedging.latencies.observe(endpoint, 0.01)
+            vault.delays = [0.3] * 20
+            sent = HEDGES.get(endpoint=endpoint, result="sent")
+            self.assertEqual(scheduler.run(), 6)
+            self.assertEqual(vault.count("POST"), 0)
+            # the lone titles search is hedged, faculty's two slots are full
+            self.assertEqual(HEDGES.get(endpoint=endpoint, result="sent"), sent + 1)
+            self.assertEqual(vault.max_inflight, {"fac": 2, "tit": 2})
+        hedging.latencies.latencies.clear()
+        directory.cleanup()
+
+    def test_course_lists_only(self):
+        scheduler = TermScheduler()
+        routes = TaxonomyRoutes(make_taxos())
+        for course in self.courses:
+            scheduler.add_course(course, routes, only_course_lists=True)
+        names = {node.taxo.name for node in scheduler.nodes.values()}
+        self.assertTrue(all(name.endswith("COURSE LIST") for name in names))
+        # one root per semester in each course list taxonomy
+        semesters = {(r.taxo.name, r.term.term) for r in scheduler.roots}
+        self.assertEqual(len(scheduler.roots), len(semesters))
+        self.assertIn(("SYLLABUS - COURSE LIST", "Spring 2025"), semesters)
+
+    def test_error_and_context(self):
+        tracer.enable()
+        taxos = make_taxos()
+        scheduler = TermScheduler()
+        scheduler.add_course(self.courses[1], TaxonomyRoutes(taxos))
+        with FakeVault() as vault:
+            # only the semester terms can be created
+            vault.fail = lambda body: body["parentUuid"] is not None
+            with tracer.span("schedule") as parent:
+                with self.assertRaises(Exception):
+                    scheduler.run()
+        # the second level failed so nothing below it was started
+        self.assertTrue(vault.terms)
+        self.assertTrue(all(body["parentUuid"] is None for _, body, _ in vault.terms))
+        self.assertLess(vault.count("POST"), len(scheduler))
+        spans = [s for s in tracer.spans if s.name == "add_to_taxos"]
+        self.assertTrue(spans)
+        self.assertTrue(all(s.parent is parent for s in spans))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
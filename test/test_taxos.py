@@ -1,6 +1,99 @@
+import importlib
+import os
+import tempfile
 import unittest
 
 from lib import *
+from test.fake_vault import FakeVault
+
+TAXONOMIES = {
+    "fac": "Fall 2023 - ANIMA - faculty",
+    "tit": "Fall 2023 - ANIMA - course titles",
+    "sec": "Fall 2023 - ANIMA - section",
+}
+
+
+class TestTerm(unittest.TestCase):
+    def test_parent_pointers(self):
+        root = Term({"term": "Fall 2023"})
+        dept = Term({"term": "ANIMA", "parent": root})
+        child = Term({"term": "Animation 1", "parents": [root, dept]})
+        self.assertIs(child.parent, dept)
+        self.assertEqual(child.parents, [root, dept])
+        self.assertEqual(child.fullTerm, "Fall 2023\\ANIMA\\Animation 1")
+        # the path is built once & shared
+        self.assertIs(child.fullTerm, child.fullTerm)
+        # a list of parents without links of their own is linked up
+        parents = [Term({"term": "A"}), Term({"term": "B"})]
+        orphan = Term({"term": "Jane Doe", "parents": parents})
+        self.assertEqual(orphan.fullTerm, "A\\B\\Jane Doe")
+        # no per-instance __dict__
+        self.assertFalse(hasattr(child, "__dict__"))
+
+    def test_rename_ancestor(self):
+        root = Term({"term": "Fall 2023"})
+        dept = Term({"term": "ANIMA", "parent": root})
+        child = Term({"term": "Animation 1", "parent": dept})
+        self.assertEqual(child.fullTerm, "Fall 2023\\ANIMA\\Animation 1")
+        terms = {child}
+        root.term = "Spring 2024"
+        self.assertEqual(child.fullTerm, "Spring 2024\\ANIMA\\Animation 1")
+        dept.parent = Term({"term": "Summer 2024"})
+        self.assertEqual(child.fullTerm, "Summer 2024\\ANIMA\\Animation 1")
+        # hashing & equality follow the new path
+        same = Term(
+            {
+                "term": "Animation 1",
+                "parents": [Term({"term": "Summer 2024"}), Term({"term": "ANIMA"})],
+            }
+        )
+        self.assertEqual(child, same)
+        self.assertEqual(hash(child), hash(same))
+        # a term in a set is still found after its ancestors changed
+        self.assertIn(child, terms)
+        self.assertIn(same, terms)
+
+    def test_hash(self):
+        root = Term({"term": "Fall 2023"})
+        terms = {Term({"term": "ANIMA", "parent": root, "uuid": "1"})}
+        # terms we haven't created yet match ones with the same path
+        self.assertIn(Term({"term": "ANIMA", "parent": root}), terms)
+        self.assertNotIn(Term({"term": "ANIMA"}), terms)
+
+
+class TestRefreshTaxos(unittest.TestCase):
+    def test_refresh_taxos(self):
+        # lib.get_taxos is shadowed by the get_taxos function
+        get_taxos_module = importlib.import_module("lib.get_taxos")
+        directory = tempfile.TemporaryDirectory()
+        taxos_file = get_taxos_module.taxos_file
+        get_taxos_module.taxos_file = os.path.join(directory.name, "taxos.json")
+        try:
+            with FakeVault(taxonomies=TAXONOMIES) as vault:
+                taxos = get_taxos()
+                self.assertEqual([t.uuid for t in taxos], list(TAXONOMIES))
+                missing = taxos.pop()
+                new = refresh_taxos(taxos)
+                self.assertEqual([t.uuid for t in new], [missing.uuid])
+                self.assertTrue(missing.uuid in [t.uuid for t in taxos])
+                # only one refresh per run
+                taxos.pop()
+                self.assertEqual(refresh_taxos(taxos), [])
+                listings = [
+                    path
+                    for method, path in vault.requests
+                    if path.startswith("/api/taxonomy?")
+                ]
+                self.assertEqual(len(listings), 2)
+                # background loading returns the same list
+                self.assertEqual(
+                    [t.uuid for t in load_taxos_in_background().result()],
+                    [t.uuid for t in get_taxos()],
+                )
+        finally:
+            get_taxos_module.taxos_file = taxos_file
+            get_taxos_module._refreshed = False
+            directory.cleanup()
 
 
 class TestTaxoData(unittest.TestCase):
@@ -100,6 +193,12 @@ class TestTaxoData(unittest.TestCase):
         self.assertTrue(len(no_results) == 0)
         one_result = taxo.search("Parent")
         self.assertTrue(len(one_result) == 1)
+        # repeat searches come from the cache until the taxonomy changes
+        hits = search_cache.hits
+        self.assertEqual(one_result, taxo.search("Parent"))
+        self.assertEqual(search_cache.hits, hits + 1)
+        # queries with reserved URL characters are escaped
+        self.assertEqual(type(taxo.search("Parent & Child?")), list)
 
         # Taxonomy::remove (which returns a boolean)
         self.assertFalse(taxo.remove("term that does not exist"))
@@ -0,0 +1,65 @@
+import unittest
+
+from lib import *
+
+
+def chain(*names, uuid_prefix="u"):
+    """Terms for a path like Fall 2023\\ANIMA\\Animation 1, each a child of the last"""
+    terms = []
+    for name in names:
+        parent = terms[-1] if terms else None
+        term = Term({"term": name, "parent": parent, "uuid": uuid_prefix + name})
+        terms.append(term)
+    return terms
+
+
+class TestTermTree(unittest.TestCase):
+    def setUp(self):
+        self.fall = chain("Fall 2023", "ANIMA", "Animation 1", "Jane Doe")
+        self.other = chain("Fall 2023", "PRINT", uuid_prefix="p")[1]
+        self.spring = chain("Spring 2024", "ANIMA", uuid_prefix="s")
+        self.tree = TermTree(self.fall + [self.other] + self.spring)
+
+    def test_set_like(self):
+        self.assertEqual(len(self.tree), 7)
+        self.assertIn(self.fall[2], self.tree)
+        # a term we haven't created yet matches on its path
+        self.assertIn(Term({"term": "ANIMA", "parent": self.fall[0]}), self.tree)
+        self.assertNotIn(Term({"term": "ANIMA"}), self.tree)
+        # adding the same path again does nothing
+        self.tree.add(Term({"term": "Fall 2023"}))
+        self.assertEqual(len(self.tree), 7)
+        self.tree.discard(self.fall[3])
+        self.assertNotIn(self.fall[3], self.tree)
+        self.assertEqual(len(list(self.tree)), 6)
+        self.tree.clear()
+        self.assertEqual(len(self.tree), 0)
+        self.assertIsNone(self.tree.get_uuid("uANIMA"))
+
+    def test_indexes(self):
+        self.assertIs(self.tree.get_uuid("uAnimation 1"), self.fall[2])
+        self.assertIs(self.tree.get_path("Spring 2024\\ANIMA"), self.spring[1])
+        self.assertEqual(self.tree.children(self.fall[0]), [self.fall[1], self.other])
+        # linked through parentUuid when there's no parent pointer
+        orphan = Term({"term": "Staff", "parentUuid": "sANIMA", "uuid": "x"})
+        self.tree.add(orphan)
+        self.assertEqual(self.tree.children(self.spring[1]), [orphan])
+
+    def test_subtree(self):
+        subtree = list(self.tree.iter_subtree(self.fall[0]))
+        self.assertEqual(subtree[:4], self.fall)
+        self.assertEqual(self.tree.count_subtree(self.fall[0]), 5)
+        self.assertEqual(self.tree.count_subtree(self.fall[2]), 2)
+        # removing a semester removes everything beneath it, even grandchildren
+        self.assertEqual(self.tree.remove_subtree(self.fall[0]), 5)
+        self.assertEqual(len(self.tree), 2)
+        for term in self.fall:
+            self.assertIsNone(self.tree.get_uuid(term.uuid))
+        self.assertIn(self.spring[1], self.tree)
+        # nothing left indexed under the removed paths
+        self.assertEqual(self.tree.children(self.fall[0]), [])
+        self.assertEqual(self.tree.remove_subtree(self.fall[0]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,109 @@
+from datetime import timedelta
+import tempfile
+import unittest
+
+from requests import Request, Response
+
+from lib.tracing import *
+
+
+def fake_response(method, url, status=200, content=b"{}", seconds=0.1):
+    r = Response()
+    r.request = Request(method, url).prepare()
+    r.status_code = status
+    r._content = content
+    r.elapsed = timedelta(seconds=seconds)
+    return r
+
+
+TAXO = "7ef2e5a6-4c1e-4b9e-8f0e-1234567890ab"
+TERM = "bc35c8e1-0a2b-4c3d-9e8f-abcdef012345"
+
+
+class TestEndpointTemplate(unittest.TestCase):
+    def test_templates(self):
+        root = "https://vault.cca.edu/api"
+        self.assertEqual(
+            endpoint_template("get", root + "/taxonomy?length=5000"),
+            "GET /taxonomy?length",
+        )
+        self.assertEqual(
+            endpoint_template("post", root + "/taxonomy/{}/term".format(TAXO)),
+            "POST /taxonomy/{uuid}/term",
+        )
+        self.assertEqual(
+            endpoint_template(
+                "PUT",
+                root + "/taxonomy/{}/term/{}/data/CrsName/Art%2FDesign/1".format(
+                    TAXO, TERM
+                ),
+            ),
+            "PUT /taxonomy/{uuid}/term/{uuid}/data/{key}/{value}",
+        )
+        self.assertEqual(resource_uuid(root + "/taxonomy/{}/term".format(TAXO)), TAXO)
+        self.assertEqual(resource_uuid(root + "/taxonomy?length=10"), None)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+        self.url = "https://vault.cca.edu/api/taxonomy/{}/term".format(TAXO)
+
+    def test_disabled(self):
+        with self.tracer.span("course") as span:
+            self.assertIsNone(span)
+            self.tracer.record_response(fake_response("POST", self.url))
+        self.assertEqual(self.tracer.snapshot(), [])
+
+    def test_max_spans(self):
+        tracer = Tracer(max_spans=3).enable()
+        for i in range(5):
+            with tracer.span("course", n=i):
+                pass
+        # only the most recent spans are kept
+        self.assertEqual([s.attrs["n"] for s in tracer.snapshot()], [2, 3, 4])
+        self.assertEqual(tracer.dropped, 2)
+
+    def test_spans(self):
+        self.tracer.enable()
+        self.tracer.label(TAXO, "TESTS - COURSE LIST")
+        with self.tracer.span("course", course="Spring 2020 TESTS-100-1") as course:
+            with self.tracer.span("add_to_taxos", step="TESTS - COURSE LIST") as step:
+                self.tracer.record_response(fake_response("POST", self.url))
+                self.tracer.record_response(
+                    fake_response("POST", self.url, status=406, seconds=0.3)
+                )
+        http = self.tracer.http_spans
+        self.assertEqual(len(http), 2)
+        self.assertEqual(http[0].parent, step)
+        self.assertEqual(step.parent, course)
+        self.assertEqual(http[0].attrs["resource"], "TESTS - COURSE LIST")
+        self.assertEqual(http[0].attrs["bytes"], 2)
+        self.assertEqual(http[1].attrs["status"], 406)
+        self.assertEqual(http[0].context["course"], "Spring 2020 TESTS-100-1")
+
+        summary = self.tracer.summary()["POST /taxonomy/{uuid}/term"]
+        self.assertEqual(summary["count"], 2)
+        self.assertAlmostEqual(summary["p99"], 0.3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.tracer.write_jsonl(tmp + "/trace.jsonl")
+            self.tracer.write_chrome_trace(tmp + "/trace.json")
+            with open(tmp + "/trace.jsonl") as fh:
+                self.assertEqual(len(fh.readlines()), 4)
+            with open(tmp + "/trace.json") as fh:
+                events = json.load(fh)["traceEvents"]
+        self.assertEqual(len(events), 4)
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,5 +1,10 @@
+import json
+import os
+import tempfile
+import time
 import unittest
 
+import config
 from lib import *
 
 
@@ -45,6 +50,26 @@ class TestCourseSort(unittest.TestCase):
         self.assertEqual(correct_sort, sorted_courses)
 
 
+class TestCache(unittest.TestCase):
+    def test_read_write_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "taxonomies.json")
+            self.assertIsNone(read_cache(path, 60))
+            with CacheFileWriter(path) as writer:
+                writer.write({"name": "TESTS"})
+            data = read_cache(path, 60)
+            self.assertTrue(data["fetched"] <= time.time())
+            self.assertEqual(data["results"], [{"name": "TESTS"}])
+            # stale file
+            self.assertIsNone(read_cache(path, -1))
+            # files from before we stored a fetch time use their mtime
+            with open(path, "w") as fh:
+                json.dump({"results": []}, fh)
+            self.assertEqual(read_cache(path, 60)["results"], [])
+            os.utime(path, (0, 0))
+            self.assertIsNone(read_cache(path, 60))
+
+
 class TestRequestWrapper(unittest.TestCase):
     def test_request_wrapper(self):
         global config